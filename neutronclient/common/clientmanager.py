@@ -17,9 +17,11 @@
 """Manage access to the clients, including authenticating when needed.
 """
 
+import copy
 import logging
 
 from neutronclient import client
+from neutronclient.common import exceptions
 from neutronclient.neutron import client as neutron_client
 
 
@@ -114,3 +116,16 @@ class ClientManager(object):
             # Populate other password flow attributes
             self._token = httpclient.auth_token
             self._url = httpclient.endpoint_url
+
+    def make_region_client(self, region_name):
+        """Return a new neutron client of the same user in another region.
+
+        The endpoint of the region is looked up in the service catalog,
+        which requires an authentication URL or session.
+        """
+        if not self._auth_url and not self._session:
+            raise exceptions.NoAuthURLProvided()
+        manager = copy.copy(self)
+        manager._region_name = region_name
+        manager._url = None
+        return neutron_client.make_client(manager)
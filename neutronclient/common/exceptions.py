@@ -209,6 +209,32 @@ class InvalidContentType(NeutronClientException):
     message = _("Invalid content type %(content_type)s.")
 
 
+class ResourceInErrorState(NeutronClientException):
+    message = _("%(resource)s %(id)s went into status %(status)s.")
+
+
+class WaitTimeout(NeutronClientException):
+    message = _("Timed out after %(timeout)s seconds waiting for "
+                "%(resource)s.")
+
+
+class NoFreeCidr(NeutronClientException):
+    message = _("No free /%(prefixlen)s block left in %(supernet)s.")
+
+
+class InvalidSnapshot(NeutronClientException):
+    message = _("%(path)s is not an inventory snapshot.")
+
+
+class SnapshotTooOld(NeutronClientException):
+    message = _("The %(collection)s of snapshot %(path)s are %(age)d seconds "
+                "old, more than the allowed %(max_age)d seconds.")
+
+
+class InvalidProjectDocument(NeutronClientException):
+    message = _("Unsupported project network document version %(version)s.")
+
+
 # Command line exceptions
 
 class NeutronCLIError(NeutronException):
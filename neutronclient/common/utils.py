@@ -19,6 +19,8 @@
 
 import logging
 import os
+import sys
+import threading
 
 from oslo.utils import encodeutils
 from oslo.utils import importutils
@@ -28,6 +30,10 @@ from neutronclient.common import exceptions
 from neutronclient.i18n import _
 
 
+# Number of requests issued in parallel when fanning out over resources
+DEFAULT_CONCURRENCY = 16
+
+
 def env(*vars, **kwargs):
     """Returns the first environment variable set.
 
@@ -158,3 +164,50 @@ def safe_encode_dict(data):
         return (k, _safe_encode_without_obj(v))
 
     return dict(list(map(_encode_item, data.items())))
+
+
+def concurrent_map(func, items, max_workers=None):
+    """Apply func to each of items using a bounded pool of threads.
+
+    Results are returned in the same order as items. If any call raises,
+    no new calls are started and the first exception is re-raised once
+    the running ones have finished.
+
+    :param func: callable taking a single item
+    :param items: iterable of items to process
+    :param max_workers: maximum number of concurrent calls, defaults to
+       DEFAULT_CONCURRENCY
+    """
+    items = list(items)
+    if max_workers is None:
+        max_workers = DEFAULT_CONCURRENCY
+    workers = min(max_workers, len(items))
+    if workers <= 1:
+        return [func(item) for item in items]
+
+    results = [None] * len(items)
+    errors = []
+    pending = six.moves.queue.Queue()
+    for index, item in enumerate(items):
+        pending.put((index, item))
+
+    def _worker():
+        while not errors:
+            try:
+                index, item = pending.get_nowait()
+            except six.moves.queue.Empty:
+                return
+            try:
+                results[index] = func(item)
+            except Exception:
+                errors.append(sys.exc_info())
+
+    threads = [threading.Thread(target=_worker) for i in range(workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        six.reraise(*errors[0])
+    return results
@@ -18,19 +18,28 @@ from __future__ import print_function
 
 import abc
 import argparse
+import copy
+import itertools
 import logging
 import re
+import time
 
 from cliff.formatters import table
 from cliff import lister
 from cliff import show
 from oslo.serialization import jsonutils
+from oslo.utils import timeutils
 import six
 
 from neutronclient.common import command
 from neutronclient.common import exceptions
 from neutronclient.common import utils
 from neutronclient.i18n import _
+from neutronclient.v2_0 import aggregate
+from neutronclient.v2_0 import changefeed
+from neutronclient.v2_0 import expand
+from neutronclient.v2_0 import sorting
+from neutronclient.v2_0 import where
 
 HEX_ELEM = '[0-9A-Fa-f]'
 UUID_PATTERN = '-'.join([HEX_ELEM + '{8}', HEX_ELEM + '{4}',
@@ -136,6 +145,50 @@ def add_show_list_common_argument(parser):
         default=[])
 
 
+def add_snapshot_argument(parser):
+    parser.add_argument(
+        '--from-snapshot',
+        metavar='FILE',
+        help=_('Answer from an inventory snapshot file, as written by '
+               'inventory-snapshot, instead of querying the server.'))
+    parser.add_argument(
+        '--max-age',
+        metavar='SECONDS', type=int,
+        help=_('Fail when the snapshot is older than SECONDS.'))
+
+
+def use_snapshot(neutron_client, parsed_args):
+    """Make neutron_client read from the snapshot given on command line."""
+    if getattr(parsed_args, 'from_snapshot', None):
+        neutron_client.use_snapshot(parsed_args.from_snapshot,
+                                    parsed_args.max_age)
+
+
+def add_watch_argument(parser):
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help=_('Poll the resources and print their creations, updates and '
+               'deletions as JSON lines instead of listing them. Unless '
+               'fields or columns are specified, only the default columns '
+               'are watched.'))
+    parser.add_argument(
+        '--watch-interval',
+        metavar='SECONDS', type=int, default=5,
+        help=_('Seconds between two polls while changes are seen '
+               '(default: 5).'))
+    parser.add_argument(
+        '--watch-max-interval',
+        metavar='SECONDS', type=int, default=60,
+        help=_('Maximum seconds between two polls, the interval doubling '
+               'while nothing changes (default: 60).'))
+    parser.add_argument(
+        '--watch-count',
+        metavar='N', type=int, default=0,
+        help=_('Number of polls, 0 meaning until interrupted '
+               '(default: 0).'))
+
+
 def add_pagination_argument(parser):
     parser.add_argument(
         '-P', '--page-size',
@@ -145,6 +198,26 @@ def add_pagination_argument(parser):
         default=None)
 
 
+def add_concurrency_argument(parser):
+    parser.add_argument(
+        '--concurrency',
+        metavar='N', type=int,
+        help=_("Maximum number of requests sent to the server in parallel "
+               "(default: %d).") % utils.DEFAULT_CONCURRENCY,
+        default=None)
+
+
+def add_wait_argument(parser):
+    parser.add_argument(
+        '--wait',
+        action='store_true',
+        help=_('Wait until the resource leaves its PENDING_* status.'))
+    parser.add_argument(
+        '--wait-timeout',
+        metavar='SECONDS', type=int, default=300,
+        help=_('Seconds to wait when --wait is given (default: 300).'))
+
+
 def add_sorting_argument(parser):
     parser.add_argument(
         '--sort-key',
@@ -438,6 +511,7 @@ class CreateCommand(NeutronCommand, show.ShowOne):
 
     api = 'network'
     log = None
+    wait_support = False
 
     def get_parser(self, prog_name):
         parser = super(CreateCommand, self).get_parser(prog_name)
@@ -447,6 +521,8 @@ class CreateCommand(NeutronCommand, show.ShowOne):
         parser.add_argument(
             '--tenant_id',
             help=argparse.SUPPRESS)
+        if self.wait_support:
+            add_wait_argument(parser)
         self.add_known_arguments(parser)
         return parser
 
@@ -465,6 +541,13 @@ class CreateCommand(NeutronCommand, show.ShowOne):
             data = obj_creator(self.parent_id, body)
         else:
             data = obj_creator(body)
+        if self.wait_support and parsed_args.wait and self.resource in data:
+            _id = data[self.resource]['id']
+            statuses = neutron_client.wait_for(
+                [(self.cmd_resource, _id)],
+                timeout=parsed_args.wait_timeout)
+            data[self.resource]['status'] = statuses[(self.cmd_resource,
+                                                      _id)]
         self.format_output_data(data)
         info = self.resource in data and data[self.resource] or None
         if info:
@@ -481,12 +564,15 @@ class UpdateCommand(NeutronCommand):
     api = 'network'
     log = None
     allow_names = True
+    wait_support = False
 
     def get_parser(self, prog_name):
         parser = super(UpdateCommand, self).get_parser(prog_name)
         parser.add_argument(
             'id', metavar=self.resource.upper(),
             help=_('ID or name of %s to update.') % self.resource)
+        if self.wait_support:
+            add_wait_argument(parser)
         self.add_known_arguments(parser)
         return parser
 
@@ -523,6 +609,14 @@ class UpdateCommand(NeutronCommand):
         print((_('Updated %(resource)s: %(id)s') %
                {'id': parsed_args.id, 'resource': self.resource}),
               file=self.app.stdout)
+        if self.wait_support and parsed_args.wait:
+            statuses = neutron_client.wait_for(
+                [(self.cmd_resource, _id)],
+                timeout=parsed_args.wait_timeout)
+            print((_('%(resource)s %(id)s is %(status)s') %
+                   {'id': parsed_args.id, 'resource': self.resource,
+                    'status': statuses[(self.cmd_resource, _id)]}),
+                  file=self.app.stdout)
         return
 
 
@@ -571,6 +665,11 @@ class DeleteCommand(NeutronCommand):
         return
 
 
+def _with_fields(fields, extra):
+    """Return fields followed by those of extra not in fields."""
+    return list(fields) + [field for field in extra if field not in fields]
+
+
 class ListCommand(NeutronCommand, lister.Lister):
     """List resources that belong to a given tenant."""
 
@@ -581,17 +680,64 @@ class ListCommand(NeutronCommand, lister.Lister):
     unknown_parts_flag = True
     pagination_support = False
     sorting_support = False
+    watch_support = True
+    _where = None
 
     def get_parser(self, prog_name):
         parser = super(ListCommand, self).get_parser(prog_name)
         add_show_list_common_argument(parser)
+        add_snapshot_argument(parser)
+        parser.add_argument(
+            '--count',
+            action='store_true',
+            help=_('Only print the number of resources, counted page by '
+                   'page on their IDs.'))
+        parser.add_argument(
+            '--group-by',
+            metavar='FIELD', action='append', default=[],
+            help=_('Print one row per value of FIELD, possibly dotted as in '
+                   'fixed_ips.subnet_id, with the aggregates of the '
+                   'resources having it. You can repeat this option.'))
+        parser.add_argument(
+            '--aggregate',
+            metavar='FUNCTION[:FIELD]', action='append', default=[],
+            help=_('Aggregate computed for each group: count, count:FIELD, '
+                   'distinct:FIELD, min:FIELD or max:FIELD (default: '
+                   'count). You can repeat this option.'))
+        parser.add_argument(
+            '--where',
+            metavar='EXPRESSION',
+            help=_('Only list the resources matching EXPRESSION, made of '
+                   'FIELD OPERATOR VALUE terms with the =, !=, ~ (regular '
+                   'expression), !~, <, <=, >, >=, in (VALUE, ...) and '
+                   'within CIDR operators, combined with and, or, not and '
+                   'parentheses. Equality terms are sent as filters to '
+                   'the server, the others evaluated on each page.'))
+        parser.add_argument(
+            '--expand',
+            metavar='FIELD[:ATTRIBUTE,...]', action='append', default=[],
+            help=_('Add the ATTRIBUTEs (default: name) of the resources '
+                   'referred to by FIELD, e.g. network_id:name,status, as '
+                   'FIELD:ATTRIBUTE columns. You can repeat this option.'))
+        if self.watch_support:
+            add_watch_argument(parser)
         if self.pagination_support:
             add_pagination_argument(parser)
+        add_sorting_argument(parser)
         if self.sorting_support:
-            add_sorting_argument(parser)
+            parser.add_argument(
+                '--sort-locally',
+                action='store_true',
+                help=_('Sort on the client rather than on the server, for '
+                       'instance on fields the server cannot sort.'))
         return parser
 
     def args2search_opts(self, parsed_args):
+        """Return the list request parameters of the parsed arguments.
+
+        Listing, counting, grouping and watching all build their requests
+        from it, so commands always listing with a filter add it here.
+        """
         search_opts = {}
         fields = parsed_args.fields
         if parsed_args.fields:
@@ -610,10 +756,8 @@ class ListCommand(NeutronCommand, lister.Lister):
             data = obj_lister(**search_opts)
         return data
 
-    def retrieve_list(self, parsed_args):
-        """Retrieve a list of resources from Neutron server."""
-        neutron_client = self.get_client()
-        neutron_client.format = parsed_args.request_format
+    def build_search_opts(self, parsed_args):
+        """Return the list request parameters given on command line."""
         _extra_values = parse_args_to_dict(self.values_specs)
         _merge_args(self, parsed_args, _extra_values,
                     self.values_specs)
@@ -623,7 +767,7 @@ class ListCommand(NeutronCommand, lister.Lister):
             page_size = parsed_args.page_size
             if page_size:
                 search_opts.update({'limit': page_size})
-        if self.sorting_support:
+        if self.sorting_support and not self.sorts_locally(parsed_args):
             keys = parsed_args.sort_key
             if keys:
                 search_opts.update({'sort_key': keys})
@@ -635,10 +779,254 @@ class ListCommand(NeutronCommand, lister.Lister):
                 dirs = dirs[:len(keys)]
             if dirs:
                 search_opts.update({'sort_dir': dirs})
+        expression = self.where_expression(parsed_args)
+        if expression:
+            for key, values in six.iteritems(expression.server_filters):
+                search_opts.setdefault(key, values)
+        if search_opts.get('fields'):
+            search_opts['fields'] = _with_fields(
+                search_opts['fields'],
+                [field.split('.')[0]
+                 for field, _attributes in self._expansions(parsed_args)])
+        return search_opts
+
+    def _expansions(self, parsed_args):
+        try:
+            return [expand.parse_expansion(spec)
+                    for spec in getattr(parsed_args, 'expand', None) or []]
+        except ValueError as e:
+            raise exceptions.CommandError(str(e))
+
+    def _expanded_columns(self, parsed_args):
+        return [expand.column_name(field, attribute)
+                for field, attributes in self._expansions(parsed_args)
+                for attribute in attributes]
+
+    def expander(self, parsed_args):
+        """Return an Expander of the --expand options, None without any."""
+        expansions = self._expansions(parsed_args)
+        if not expansions:
+            return None
+        try:
+            return expand.Expander(self.get_client(), expansions)
+        except ValueError as e:
+            raise exceptions.CommandError(str(e))
+
+    def where_expression(self, parsed_args):
+        """Return the compiled --where expression, None without one."""
+        text = getattr(parsed_args, 'where', None)
+        if not text:
+            return None
+        if self._where is None or self._where.text != text:
+            try:
+                self._where = where.Expression(text)
+            except ValueError as e:
+                raise exceptions.CommandError(str(e))
+        return self._where
+
+    def sorts_locally(self, parsed_args):
+        """Tell whether the --sort-key options are applied by the client.
+
+        The client sorts when asked to, for commands without sorting
+        support and on dotted fields, which the server cannot sort.
+        """
+        keys = getattr(parsed_args, 'sort_key', None)
+        expanded = self._expanded_columns(parsed_args)
+        return bool(keys) and (not self.sorting_support or
+                               getattr(parsed_args, 'sort_locally', False) or
+                               any('.' in key or key in expanded
+                                   for key in keys))
+
+    def _extra_fields(self, parsed_args):
+        """Return the fields read by the client but not requested."""
+        fields = []
+        expression = self.where_expression(parsed_args)
+        if expression:
+            fields.extend(expression.fields)
+        if self.sorts_locally(parsed_args):
+            fields.extend(key.split('.')[0] for key in parsed_args.sort_key)
+        # the expanded columns are not resource fields
+        excluded = (parsed_args.fields or []) + self._expanded_columns(
+            parsed_args)
+        extra = []
+        for field in fields:
+            if field not in excluded and field not in extra:
+                extra.append(field)
+        return extra
+
+    def _drop_extra_fields(self, items, parsed_args):
+        extra = parsed_args.fields and self._extra_fields(parsed_args)
+        for item in items:
+            for field in extra or []:
+                item.pop(field, None)
+            yield item
+
+    def iter_list(self, parsed_args):
+        """Yield the resources matching the command line page by page.
+
+        When fields are requested, the fields needed to evaluate --where
+        and to sort on the client are requested as well.
+        """
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        use_snapshot(neutron_client, parsed_args)
+        search_opts = self.build_search_opts(parsed_args)
+        if search_opts.get('fields'):
+            search_opts['fields'] = _with_fields(
+                search_opts['fields'], self._extra_fields(parsed_args))
+        expression = self.where_expression(parsed_args)
+        for items in self.iter_pages(neutron_client, search_opts,
+                                     parsed_args):
+            for item in items:
+                if expression is None or expression.matches(item):
+                    yield item
+
+    def retrieve_list(self, parsed_args):
+        """Retrieve a list of resources from Neutron server."""
+        sorts_locally = self.sorts_locally(parsed_args)
+        if self.where_expression(parsed_args) or sorts_locally:
+            data = self.iter_list(parsed_args)
+            if not sorts_locally:
+                # else sorted_list drops them once the list is sorted
+                data = self._drop_extra_fields(data, parsed_args)
+            return list(data)
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        use_snapshot(neutron_client, parsed_args)
+        search_opts = self.build_search_opts(parsed_args)
         data = self.call_server(neutron_client, search_opts, parsed_args)
         collection = _get_resource_plural(self.resource, neutron_client)
         return data.get(collection, [])
 
+    def _overrides(self, method):
+        # methods are compared as plain functions so that overrides are
+        # detected on both Python 2 and 3
+        return (six.get_unbound_function(getattr(type(self), method)) is not
+                six.get_unbound_function(getattr(ListCommand, method)))
+
+    def _lists_itself(self):
+        return self.parent_id or self._overrides('call_server')
+
+    def count_server(self, neutron_client, search_opts, parsed_args):
+        """Return the number of resources matching search_opts.
+
+        Resources are counted page by page without being kept, unless the
+        command lists them in its own way, in which case the resources
+        returned by call_server are counted.
+        """
+        if self._lists_itself():
+            data = self.call_server(neutron_client, search_opts, parsed_args)
+            collection = _get_resource_plural(self.resource, neutron_client)
+            return len(data.get(collection, []))
+        resource_plural = _get_resource_plural(self.cmd_resource,
+                                               neutron_client)
+        return neutron_client.count(resource_plural, **search_opts)
+
+    def iter_pages(self, neutron_client, search_opts, parsed_args):
+        """Yield the lists of resources matching search_opts page by page.
+
+        Commands listing resources in their own way yield the whole list
+        returned by call_server as a single page.
+        """
+        collection = _get_resource_plural(self.resource, neutron_client)
+        resource_plural = _get_resource_plural(self.cmd_resource,
+                                               neutron_client)
+        path = getattr(neutron_client, '%s_path' % resource_plural, None)
+        if self._lists_itself() or path is None:
+            pages = [self.call_server(neutron_client, search_opts,
+                                      parsed_args)]
+        else:
+            pages = neutron_client.list(resource_plural, path, False,
+                                        **search_opts)
+        for page in pages:
+            yield page.get(collection, [])
+
+    def count(self, parsed_args):
+        """Return the count of the resources as a single row table."""
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        use_snapshot(neutron_client, parsed_args)
+        search_opts = self.build_search_opts(parsed_args)
+        for key in ('verbose', 'sort_key', 'sort_dir'):
+            search_opts.pop(key, None)
+        search_opts['fields'] = ['id']
+        # the -c columns select resource fields, not the count column
+        parsed_args.columns = []
+        expression = self.where_expression(parsed_args)
+        if expression is None:
+            count = self.count_server(neutron_client, search_opts,
+                                      parsed_args)
+        else:
+            search_opts['fields'] = _with_fields(['id'], expression.fields)
+            count = sum(len(expression.filter(items))
+                        for items in self.iter_pages(
+                            neutron_client, search_opts, parsed_args))
+        return (['count'], [(count,)])
+
+    def group(self, parsed_args):
+        """Return the aggregates of the resources grouped by some fields.
+
+        Only the grouping and aggregated fields are requested, and the
+        pages are aggregated as they are received.
+        """
+        try:
+            grouping = aggregate.GroupBy(
+                parsed_args.group_by,
+                [aggregate.parse_aggregate(spec)
+                 for spec in parsed_args.aggregate or ['count']])
+        except ValueError as e:
+            raise exceptions.CommandError(str(e))
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        use_snapshot(neutron_client, parsed_args)
+        search_opts = self.build_search_opts(parsed_args)
+        for key in ('verbose', 'sort_key', 'sort_dir'):
+            search_opts.pop(key, None)
+        search_opts['fields'] = grouping.fields
+        expression = self.where_expression(parsed_args)
+        if expression:
+            search_opts['fields'] = _with_fields(grouping.fields,
+                                                 expression.fields)
+        for items in self.iter_pages(neutron_client, search_opts,
+                                     parsed_args):
+            grouping.add(expression.filter(items) if expression else items)
+        return (grouping.columns, grouping.rows())
+
+    def sorted_list(self, parsed_args, expander=None):
+        """Return the columns and rows of the resources sorted locally.
+
+        Commands retrieving, extending or showing the list in their own
+        way sort it in memory once extended, on joined fields as well.
+        The others sort the resources as they are received, spilling
+        large lists to disk, and render them as they are merged. The
+        resources are expanded before being sorted, so that they can be
+        sorted on the expanded columns.
+        """
+        keys = parsed_args.sort_key
+        dirs = parsed_args.sort_dir
+        if (self._overrides('retrieve_list') or
+                self._overrides('extend_list') or
+                self._overrides('setup_columns')):
+            data = self.retrieve_list(parsed_args)
+            self.extend_list(data, parsed_args)
+            if expander:
+                expander.expand(data)
+            data = sorting.sort_items(data, keys, dirs, chunk_size=None)
+            return self.setup_columns(
+                list(self._drop_extra_fields(data, parsed_args)), parsed_args)
+        data = self.iter_list(parsed_args)
+        if expander:
+            data = expander.expand_stream(data)
+        data = self._drop_extra_fields(
+            sorting.sort_items(data, keys, dirs, sorting.SORT_CHUNK_SIZE),
+            parsed_args)
+        first = next(data, None)
+        head = [first] if first is not None else []
+        columns = self.setup_columns(head, parsed_args)[0]
+        return (columns, (utils.get_item_properties(
+            s, columns, formatters=self._formatters)
+            for s in itertools.chain(head, data)))
+
     def extend_list(self, data, parsed_args):
         """Update a retrieved list.
 
@@ -659,7 +1047,9 @@ class ListCommand(NeutronCommand, lister.Lister):
             # if no -c(s) by user and list_columns, we use columns in
             # both list_columns and returned resource.
             # Also Keep their order the same as in list_columns
-            _columns = [x for x in self.list_columns if x in _columns]
+            _columns = [x for x in (self.list_columns +
+                                    self._expanded_columns(parsed_args))
+                        if x in _columns]
         return (_columns, (utils.get_item_properties(
             s, _columns, formatters=self._formatters, )
             for s in info), )
@@ -674,10 +1064,63 @@ class ListCommand(NeutronCommand, lister.Lister):
 
     def get_data(self, parsed_args):
         self.log.debug('get_data(%s)', parsed_args)
+        # a syntax error is reported before any request
+        self.where_expression(parsed_args)
+        if getattr(parsed_args, 'count', False):
+            return self.count(parsed_args)
+        if getattr(parsed_args, 'group_by', None):
+            return self.group(parsed_args)
+        expander = self.expander(parsed_args)
+        if self.sorts_locally(parsed_args):
+            return self.sorted_list(parsed_args, expander)
         data = self.retrieve_list(parsed_args)
         self.extend_list(data, parsed_args)
+        if expander:
+            expander.expand(data)
         return self.setup_columns(data, parsed_args)
 
+    def run(self, parsed_args):
+        if getattr(parsed_args, 'watch', False):
+            self.log.debug('run(%s)', parsed_args)
+            return self.watch(parsed_args)
+        return super(ListCommand, self).run(parsed_args)
+
+    def watch(self, parsed_args):
+        """Print the changes of the listed resources until interrupted.
+
+        Each poll only requests the watched fields, and only hashes of the
+        resources are kept between polls, so that watching a large
+        collection costs one list request and no rendering when nothing
+        changed.
+        """
+        if not parsed_args.fields:
+            parsed_args.fields = list(parsed_args.columns or
+                                      self.list_columns)
+        if parsed_args.fields and 'id' not in parsed_args.fields:
+            parsed_args.fields.insert(0, 'id')
+        tracker = changefeed.ChangeTracker()
+        delay = parsed_args.watch_interval
+        polls = 0
+        while not parsed_args.watch_count or polls < parsed_args.watch_count:
+            if polls:
+                time.sleep(delay)
+            # retrieve_list merges the extra arguments into the parsed
+            # arguments, so each poll works on a copy of them
+            poll_args = copy.deepcopy(parsed_args)
+            data = self.retrieve_list(poll_args)
+            self.extend_list(data, poll_args)
+            events = tracker.update(data)
+            timestamp = timeutils.isotime()
+            for event in events:
+                event['timestamp'] = timestamp
+                print(jsonutils.dumps(event), file=self.app.stdout)
+            if polls:
+                delay = changefeed.next_interval(
+                    delay, events, parsed_args.watch_interval,
+                    parsed_args.watch_max_interval)
+            polls += 1
+        return 0
+
 
 class ShowCommand(NeutronCommand, show.ShowOne):
     """Show information of a given resource."""
@@ -689,6 +1132,7 @@ class ShowCommand(NeutronCommand, show.ShowOne):
     def get_parser(self, prog_name):
         parser = super(ShowCommand, self).get_parser(prog_name)
         add_show_list_common_argument(parser)
+        add_snapshot_argument(parser)
         if self.allow_names:
             help_str = _('ID or name of %s to look up.')
         else:
@@ -702,6 +1146,7 @@ class ShowCommand(NeutronCommand, show.ShowOne):
         self.log.debug('get_data(%s)', parsed_args)
         neutron_client = self.get_client()
         neutron_client.format = parsed_args.request_format
+        use_snapshot(neutron_client, parsed_args)
 
         params = {}
         if parsed_args.show_details:
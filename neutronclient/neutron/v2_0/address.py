@@ -0,0 +1,90 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+import sys
+
+from cliff import lister
+
+from neutronclient.common import exceptions
+from neutronclient.common import utils
+from neutronclient.i18n import _
+from neutronclient.neutron import v2_0 as neutronV20
+from neutronclient.v2_0 import addresses
+
+
+class LookupAddress(neutronV20.NeutronCommand, lister.Lister):
+    """Find the ports and subnets of a batch of IP or MAC addresses.
+
+    All the ports and subnets are listed once, then every address is
+    resolved locally: an IP to the ports having it or else to the subnets
+    containing it, a MAC to the ports having it. Unresolved addresses are
+    listed with empty columns.
+    """
+
+    list_columns = addresses.COLUMNS
+
+    def get_parser(self, prog_name):
+        parser = super(LookupAddress, self).get_parser(prog_name)
+        parser.add_argument(
+            '--file', metavar='FILE',
+            help=_('Read addresses from FILE, one per line, "-" meaning the '
+                   'standard input.'))
+        parser.add_argument(
+            '--tenant-id', metavar='TENANT_ID',
+            help=_('Only consider the ports and subnets of this tenant.'))
+        neutronV20.add_snapshot_argument(parser)
+        neutronV20.add_concurrency_argument(parser)
+        parser.add_argument(
+            'addresses', metavar='ADDRESS', nargs='*',
+            help=_('IP or MAC address to look up.'))
+        return parser
+
+    def _read_addresses(self, parsed_args):
+        found = list(parsed_args.addresses)
+        if parsed_args.file == '-':
+            found.extend(sys.stdin.read().split())
+        elif parsed_args.file:
+            with open(parsed_args.file) as f:
+                found.extend(f.read().split())
+        if not found:
+            raise exceptions.CommandError(
+                _("Must specify addresses or --file"))
+        return found
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)', parsed_args)
+        to_resolve = self._read_addresses(parsed_args)
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        neutronV20.use_snapshot(neutron_client, parsed_args)
+        filters = {}
+        if parsed_args.tenant_id:
+            filters['tenant_id'] = parsed_args.tenant_id
+        index = addresses.load_address_index(
+            neutron_client, max_workers=parsed_args.concurrency, **filters)
+        rows = []
+        for address in to_resolve:
+            try:
+                found = index.lookup(address)
+            except ValueError as e:
+                raise exceptions.CommandError(str(e))
+            if not found:
+                found = [dict.fromkeys(self.list_columns, '')]
+                found[0]['address'] = address
+            rows.extend(found)
+        return (self.list_columns,
+                (utils.get_item_properties(s, self.list_columns)
+                 for s in rows))
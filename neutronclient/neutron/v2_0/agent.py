@@ -14,8 +14,19 @@
 #    under the License.
 #
 
+from __future__ import print_function
+
+import time
+
+from cliff import lister
+from oslo.serialization import jsonutils
+from oslo.utils import timeutils
+
+from neutronclient.common import exceptions
+from neutronclient.common import utils
 from neutronclient.i18n import _
 from neutronclient.neutron import v2_0 as neutronV20
+from neutronclient.v2_0 import agents
 
 
 def _format_timestamp(component):
@@ -40,6 +51,40 @@ class ListAgent(neutronV20.ListCommand):
                 agent['alive'] = ":-)" if agent['alive'] else 'xxx'
 
 
+class ListAgentLoad(neutronV20.ListCommand):
+    """List the networks, routers and pools hosted by each agent."""
+
+    resource = 'agent'
+    list_columns = ['id', 'agent_type', 'host', 'agents', 'alive',
+                    'admin_state_up', 'heartbeat_age', 'networks', 'routers',
+                    'pools']
+
+    def get_parser(self, prog_name):
+        parser = super(ListAgentLoad, self).get_parser(prog_name)
+        parser.add_argument(
+            '--by-host',
+            action='store_true',
+            help=_('Summarize the load per host instead of per agent.'))
+        neutronV20.add_concurrency_argument(parser)
+        return parser
+
+    def call_server(self, neutron_client, search_opts, parsed_args):
+        search_opts.pop('fields', None)
+        load = agents.get_agent_load(neutron_client,
+                                     max_workers=parsed_args.concurrency,
+                                     **search_opts)
+        if parsed_args.by_host:
+            load = agents.summarize_load_by_host(load)
+        return {'agents': load}
+
+    def extend_list(self, data, parsed_args):
+        if parsed_args.by_host:
+            return
+        for agent in data:
+            if 'alive' in agent:
+                agent['alive'] = ":-)" if agent['alive'] else 'xxx'
+
+
 class ShowAgent(neutronV20.ShowCommand):
     """Show information of a given agent."""
 
@@ -78,3 +123,161 @@ class UpdateAgent(neutronV20.UpdateCommand):
         neutronV20.update_dict(parsed_args, body[self.resource],
                                ['description'])
         return body
+
+
+class StartAgentMaintenance(neutronV20.NeutronCommand, lister.Lister):
+    """Set admin state down on all agents of a host, binary or type."""
+
+    resource = 'agent'
+    admin_state_up = False
+    list_columns = ['id', 'agent_type', 'host', 'binary', 'admin_state_up']
+    wait_help = _('Wait until all the selected agents are listed '
+                  'administratively down, from which point the schedulers '
+                  'no longer assign them networks, routers or pools.')
+
+    def wait(self, neutron_client, parsed_args, filters):
+        agents.wait_for_agents_admin_state(
+            neutron_client, self.admin_state_up,
+            timeout=parsed_args.timeout, **filters)
+        if getattr(parsed_args, 'wait_drained', False):
+            agents.wait_for_agents_drained(
+                neutron_client, timeout=parsed_args.timeout,
+                max_workers=parsed_args.concurrency, **filters)
+
+    def get_parser(self, prog_name):
+        parser = super(StartAgentMaintenance, self).get_parser(prog_name)
+        parser.add_argument(
+            '--host',
+            help=_('Select the agents running on this host.'))
+        parser.add_argument(
+            '--binary',
+            help=_('Select the agents running this binary, e.g. '
+                   'neutron-l3-agent.'))
+        parser.add_argument(
+            '--agent-type',
+            help=_('Select the agents of this type, e.g. "L3 agent".'))
+        parser.add_argument(
+            '--wait',
+            action='store_true',
+            help=self.wait_help)
+        if not self.admin_state_up:
+            parser.add_argument(
+                '--wait-drained',
+                action='store_true',
+                help=_('With --wait, also wait until the selected agents '
+                       'host no more networks, routers or pools. Neutron '
+                       'does not move them by itself: they have to be '
+                       'rescheduled to other agents meanwhile.'))
+        parser.add_argument(
+            '--timeout',
+            type=int, default=60,
+            help=_('Seconds to wait for each condition when --wait is '
+                   'given (default: 60).'))
+        neutronV20.add_concurrency_argument(parser)
+        return parser
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)', parsed_args)
+        filters = {}
+        neutronV20.update_dict(parsed_args, filters,
+                               ['host', 'binary', 'agent_type'])
+        if not filters:
+            raise exceptions.CommandError(
+                _("Must specify at least one of --host, --binary or "
+                  "--agent-type"))
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        data = agents.set_agents_admin_state(
+            neutron_client, self.admin_state_up,
+            max_workers=parsed_args.concurrency, **filters)
+        if parsed_args.wait and data:
+            self.wait(neutron_client, parsed_args, filters)
+        return (self.list_columns,
+                (utils.get_item_properties(s, self.list_columns)
+                 for s in data))
+
+
+class StopAgentMaintenance(StartAgentMaintenance):
+    """Set admin state up on all agents of a host, binary or type."""
+
+    admin_state_up = True
+    wait_help = _('Wait until all the selected agents are reported alive, '
+                  'e.g. once restarted after the maintenance.')
+
+    def wait(self, neutron_client, parsed_args, filters):
+        agents.wait_for_agents_alive(
+            neutron_client, timeout=parsed_args.timeout, **filters)
+
+
+class MonitorAgents(neutronV20.NeutronCommand):
+    """Poll agent heartbeats and report liveness changes."""
+
+    resource = 'agent'
+
+    def get_parser(self, prog_name):
+        parser = super(MonitorAgents, self).get_parser(prog_name)
+        parser.add_argument(
+            '--interval',
+            metavar='SECONDS', type=int, default=10,
+            help=_('Seconds between two polls (default: 10).'))
+        parser.add_argument(
+            '--count',
+            metavar='N', type=int, default=0,
+            help=_('Number of polls, 0 meaning until interrupted '
+                   '(default: 0).'))
+        parser.add_argument(
+            '--lag-warning',
+            metavar='SECONDS', type=int,
+            help=_('Heartbeat age from which an alive agent is reported as '
+                   'lagging.'))
+        parser.add_argument(
+            '--lag-critical',
+            metavar='SECONDS', type=int,
+            help=_('Heartbeat age from which --nagios reports CRITICAL.'))
+        parser.add_argument(
+            '--flap-window',
+            metavar='POLLS', type=int, default=10,
+            help=_('Number of polls considered to detect flapping '
+                   '(default: 10).'))
+        parser.add_argument(
+            '--flap-threshold',
+            metavar='CHANGES', type=int, default=3,
+            help=_('Number of state changes within the flap window from '
+                   'which an agent is reported as flapping (default: 3).'))
+        parser.add_argument(
+            '--nagios',
+            action='store_true',
+            help=_('Poll once, print a Nagios status line and exit with the '
+                   'matching Nagios exit code.'))
+        return parser
+
+    def run(self, parsed_args):
+        self.log.debug('run(%s)', parsed_args)
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        _extra_values = neutronV20.parse_args_to_dict(self.values_specs)
+        if parsed_args.nagios:
+            _extra_values['fields'] = agents.MONITOR_FIELDS
+            try:
+                data = neutron_client.list_agents(**_extra_values)['agents']
+            except exceptions.NeutronClientException as e:
+                # the state of the agents is unknown, not degraded
+                print('AGENTS UNKNOWN - %s' % e, file=self.app.stdout)
+                return agents.NAGIOS_UNKNOWN
+            code, status = agents.nagios_check(
+                data, parsed_args.lag_warning, parsed_args.lag_critical)
+            print(status, file=self.app.stdout)
+            return code
+        monitor = agents.AgentMonitor(
+            neutron_client, lag_warning=parsed_args.lag_warning,
+            flap_window=parsed_args.flap_window,
+            flap_threshold=parsed_args.flap_threshold, **_extra_values)
+        polls = 0
+        while not parsed_args.count or polls < parsed_args.count:
+            if polls:
+                time.sleep(parsed_args.interval)
+            timestamp = timeutils.isotime()
+            for event in monitor.poll():
+                event['timestamp'] = timestamp
+                print(jsonutils.dumps(event), file=self.app.stdout)
+            polls += 1
@@ -0,0 +1,94 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+import sys
+
+from cliff import lister
+
+from neutronclient.common import exceptions
+from neutronclient.common import utils
+from neutronclient.i18n import _
+from neutronclient.neutron import v2_0 as neutronV20
+from neutronclient.v2_0 import audit
+
+
+class AuditOrphans(neutronV20.NeutronCommand, lister.Lister):
+    """Report orphaned and leaked resources.
+
+    Ports whose router or floating IP no longer exists, unassociated
+    floating IPs, security groups used by no port nor rule, routers without
+    interfaces and pools without members are looked for in a single
+    concurrent fetch of the collections involved.
+    """
+
+    def get_parser(self, prog_name):
+        parser = super(AuditOrphans, self).get_parser(prog_name)
+        parser.add_argument(
+            '--kind', action='append', choices=sorted(audit.KINDS),
+            help=_('Kind of orphans to look for, all by default. Can be '
+                   'repeated.'))
+        parser.add_argument(
+            '--tenant-id', metavar='TENANT_ID',
+            help=_('Only audit the resources of this tenant.'))
+        parser.add_argument(
+            '--live-devices', metavar='FILE',
+            help=_('File listing the ids of the existing instances, one per '
+                   'line, "-" meaning the standard input. Ports of other '
+                   'compute devices are then reported as dead.'))
+        parser.add_argument(
+            '--summary', action='store_true',
+            help=_('Only report the number of orphans of each kind.'))
+        parser.add_argument(
+            '--delete', action='store_true',
+            help=_('Delete the orphans found, concurrently, and report the '
+                   'result of each deletion.'))
+        neutronV20.add_snapshot_argument(parser)
+        neutronV20.add_concurrency_argument(parser)
+        return parser
+
+    def _read_live_devices(self, parsed_args):
+        if parsed_args.live_devices == '-':
+            return sys.stdin.read().split()
+        if parsed_args.live_devices:
+            with open(parsed_args.live_devices) as f:
+                return f.read().split()
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)', parsed_args)
+        if parsed_args.delete and parsed_args.from_snapshot:
+            # a snapshot may report as orphans resources now in use
+            raise exceptions.CommandError(
+                _("--delete cannot be used with --from-snapshot"))
+        live_devices = self._read_live_devices(parsed_args)
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        neutronV20.use_snapshot(neutron_client, parsed_args)
+        filters = {}
+        if parsed_args.tenant_id:
+            filters['tenant_id'] = parsed_args.tenant_id
+        rows = audit.audit(neutron_client, kinds=parsed_args.kind,
+                           live_devices=live_devices,
+                           max_workers=parsed_args.concurrency, **filters)
+        columns = list(audit.COLUMNS)
+        if parsed_args.delete:
+            audit.delete_orphans(neutron_client, rows,
+                                 max_workers=parsed_args.concurrency)
+            columns.append('result')
+        if parsed_args.summary:
+            rows = audit.count_orphans(rows, parsed_args.kind)
+            columns = ['kind', 'count']
+        return (columns,
+                (utils.get_item_properties(s, columns) for s in rows))
@@ -42,6 +42,7 @@ class CreateFirewall(neutronv20.CreateCommand):
     """Create a firewall."""
 
     resource = 'firewall'
+    wait_support = True
 
     def add_known_arguments(self, parser):
         parser.add_argument(
@@ -82,6 +83,7 @@ class UpdateFirewall(neutronv20.UpdateCommand):
     """Update a given firewall."""
 
     resource = 'firewall'
+    wait_support = True
 
     def add_known_arguments(self, parser):
         parser.add_argument(
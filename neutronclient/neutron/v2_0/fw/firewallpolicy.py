@@ -20,8 +20,12 @@ from __future__ import print_function
 
 import argparse
 
+from cliff import lister
+
+from neutronclient.common import utils
 from neutronclient.i18n import _
 from neutronclient.neutron import v2_0 as neutronv20
+from neutronclient.v2_0 import fwanalysis
 
 
 def _format_firewall_rules(firewall_policy):
@@ -221,3 +225,35 @@ class FirewallPolicyRemoveRule(neutronv20.UpdateCommand):
         self.call_api(neutron_client, _id, body)
         print((_('Removed firewall rule from firewall policy %(id)s') %
                {'id': parsed_args.id}), file=self.app.stdout)
+
+
+class AnalyzeFirewallPolicy(neutronv20.NeutronCommand, lister.Lister):
+    """Report the shadowed, redundant and conflicting rules of a policy.
+
+    A shadowed or redundant rule is matched by an earlier rule in all
+    cases, with another or the same action, and never takes effect. A
+    conflicting rule partly overlaps an earlier rule having another
+    action.
+    """
+
+    resource = 'firewall_policy'
+    list_columns = fwanalysis.COLUMNS
+
+    def get_parser(self, prog_name):
+        parser = super(AnalyzeFirewallPolicy, self).get_parser(prog_name)
+        parser.add_argument(
+            'firewall_policy_id', metavar='FIREWALL_POLICY',
+            help=_('ID or name of the firewall policy to analyze.'))
+        return parser
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)', parsed_args)
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        _id = neutronv20.find_resourceid_by_name_or_id(
+            neutron_client, self.resource, parsed_args.firewall_policy_id)
+        rules = fwanalysis.load_policy_rules(neutron_client, _id)
+        anomalies = fwanalysis.analyze_rules(rules)
+        return (self.list_columns,
+                (utils.get_item_properties(s, self.list_columns)
+                 for s in anomalies))
@@ -0,0 +1,135 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+from cliff import lister
+
+from neutronclient.common import exceptions
+from neutronclient.common import utils
+from neutronclient.i18n import _
+from neutronclient.neutron import v2_0 as neutronV20
+from neutronclient.v2_0 import diff
+from neutronclient.v2_0 import inventory
+
+
+class CreateInventorySnapshot(neutronV20.NeutronCommand, lister.Lister):
+    """Save networks, subnets, ports, routers and floating IPs locally.
+
+    The snapshot is an indexed SQLite file which list and show commands
+    can then read with --from-snapshot instead of querying the server.
+    """
+
+    list_columns = ['collection', 'count']
+
+    def get_parser(self, prog_name):
+        parser = super(CreateInventorySnapshot, self).get_parser(prog_name)
+        parser.add_argument(
+            '--collection',
+            dest='collections', metavar='COLLECTION',
+            action='append', default=[],
+            help=_('Collection to save, e.g. security_groups. You can repeat '
+                   'this option (default: %s).') %
+            ', '.join(inventory.DEFAULT_COLLECTIONS))
+        neutronV20.add_concurrency_argument(parser)
+        parser.add_argument(
+            'path', metavar='FILE',
+            help=_('The snapshot file to write.'))
+        return parser
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)', parsed_args)
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        counts = inventory.take_snapshot(
+            neutron_client, parsed_args.path,
+            collections=parsed_args.collections,
+            max_workers=parsed_args.concurrency)
+        return (self.list_columns,
+                ((collection, counts[collection])
+                 for collection in sorted(counts)))
+
+
+class DiffInventory(neutronV20.NeutronCommand, lister.Lister):
+    """Compare the resources of two regions, snapshots or the live cloud.
+
+    Each side is "live" for the resources of the current region,
+    "region:NAME" for those of another region, or an inventory snapshot
+    file. Resources are matched by key fields, e.g. the name and tenant
+    of networks or the CIDR and tenant of subnets, and one row is
+    listed per added or removed resource and per changed field. Fields
+    referring to other resources, e.g. network_id, are compared through
+    the keys of the resources they refer to rather than their ids.
+    """
+
+    list_columns = diff.COLUMNS
+
+    def get_parser(self, prog_name):
+        parser = super(DiffInventory, self).get_parser(prog_name)
+        parser.add_argument(
+            '--collection',
+            dest='collections', metavar='COLLECTION',
+            action='append', default=[],
+            help=_('Collection to compare. You can repeat this option '
+                   '(default: %s).') % ', '.join(diff.DEFAULT_COLLECTIONS))
+        parser.add_argument(
+            '--key',
+            dest='keys', metavar='COLLECTION=FIELD[,FIELD...]',
+            action='append', default=[],
+            help=_('Fields matching the resources of a collection, e.g. '
+                   'subnets=cidr. You can repeat this option (default: '
+                   'name and tenant_id for networks, routers and security '
+                   'groups, cidr and tenant_id for subnets, id for the '
+                   'other collections).'))
+        parser.add_argument(
+            '--ignore',
+            dest='ignored', metavar='FIELD',
+            action='append', default=[],
+            help=_('Field not to compare, besides id, e.g. status. You can '
+                   'repeat this option.'))
+        neutronV20.add_concurrency_argument(parser)
+        parser.add_argument(
+            'left', metavar='LEFT',
+            help=_('"live", "region:NAME" or a snapshot file.'))
+        parser.add_argument(
+            'right', metavar='RIGHT',
+            help=_('"live", "region:NAME" or a snapshot file.'))
+        return parser
+
+    def _source(self, source, parsed_args):
+        if source == 'live':
+            client = self.get_client()
+        elif source.startswith('region:'):
+            client = self.app.client_manager.make_region_client(
+                source[len('region:'):])
+        else:
+            return source
+        client.format = parsed_args.request_format
+        return client
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)', parsed_args)
+        try:
+            keys = dict(diff.parse_key(spec) for spec in parsed_args.keys)
+        except ValueError as e:
+            raise exceptions.CommandError(str(e))
+        rows = diff.diff(
+            self._source(parsed_args.left, parsed_args),
+            self._source(parsed_args.right, parsed_args),
+            collections=parsed_args.collections, keys=keys,
+            ignored=diff.DEFAULT_IGNORED + parsed_args.ignored,
+            max_workers=parsed_args.concurrency)
+        return (self.list_columns,
+                (utils.get_item_properties(s, self.list_columns)
+                 for s in rows))
@@ -42,6 +42,7 @@ class CreateMember(neutronV20.CreateCommand):
     """Create a member."""
 
     resource = 'member'
+    wait_support = True
 
     def add_known_arguments(self, parser):
         parser.add_argument(
@@ -85,6 +86,7 @@ class UpdateMember(neutronV20.UpdateCommand):
     """Update a given member."""
 
     resource = 'member'
+    wait_support = True
 
 
 class DeleteMember(neutronV20.DeleteCommand):
@@ -21,6 +21,7 @@ import six
 
 from neutronclient.i18n import _
 from neutronclient.neutron import v2_0 as neutronV20
+from neutronclient.v2_0 import lbstats
 
 
 def _format_provider(pool):
@@ -48,6 +49,7 @@ class CreatePool(neutronV20.CreateCommand):
     """Create a pool."""
 
     resource = 'pool'
+    wait_support = True
 
     def add_known_arguments(self, parser):
         parser.add_argument(
@@ -100,6 +102,7 @@ class UpdatePool(neutronV20.UpdateCommand):
     """Update a given pool."""
 
     resource = 'pool'
+    wait_support = True
 
 
 class DeletePool(neutronV20.DeleteCommand):
@@ -130,3 +133,46 @@ class RetrievePoolStats(neutronV20.ShowCommand):
             return zip(*sorted(six.iteritems(stats)))
         else:
             return None
+
+
+class CollectPoolStats(neutronV20.NeutronCommand):
+    """Collect stats of all pools, optionally sampling them periodically."""
+
+    resource = 'pool'
+
+    def get_parser(self, prog_name):
+        parser = super(CollectPoolStats, self).get_parser(prog_name)
+        parser.add_argument(
+            '--output-format',
+            choices=sorted(lbstats.WRITERS), default='csv',
+            help=_('Output format of the samples (default: csv).'))
+        parser.add_argument(
+            '--interval',
+            metavar='SECONDS', type=int, default=60,
+            help=_('Seconds between two samples (default: 60).'))
+        parser.add_argument(
+            '--count',
+            metavar='N', type=int, default=1,
+            help=_('Number of samples to take, 0 meaning until interrupted '
+                   '(default: 1). Counter deltas are reported from the '
+                   'second sample on.'))
+        neutronV20.add_concurrency_argument(parser)
+        return parser
+
+    def run(self, parsed_args):
+        self.log.debug('run(%s)', parsed_args)
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        _extra_values = neutronV20.parse_args_to_dict(self.values_specs)
+        writer = lbstats.WRITERS[parsed_args.output_format]
+        samples = lbstats.sample_pool_stats(
+            neutron_client, parsed_args.interval,
+            count=parsed_args.count or None,
+            max_workers=parsed_args.concurrency, **_extra_values)
+        for index, rows in enumerate(samples):
+            if parsed_args.output_format == 'csv':
+                writer(rows, self.app.stdout, header=not index)
+            else:
+                writer(rows, self.app.stdout)
+            if hasattr(self.app.stdout, 'flush'):
+                self.app.stdout.flush()
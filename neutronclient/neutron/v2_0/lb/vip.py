@@ -40,6 +40,7 @@ class CreateVip(neutronV20.CreateCommand):
     """Create a vip."""
 
     resource = 'vip'
+    wait_support = True
 
     def add_known_arguments(self, parser):
         parser.add_argument(
@@ -101,6 +102,7 @@ class UpdateVip(neutronV20.UpdateCommand):
     """Update a given vip."""
 
     resource = 'vip'
+    wait_support = True
 
 
 class DeleteVip(neutronV20.DeleteCommand):
@@ -87,11 +87,12 @@ class ListExternalNetwork(ListNetwork):
     pagination_support = True
     sorting_support = True
 
-    def retrieve_list(self, parsed_args):
-        external = '--router:external=True'
-        if external not in self.values_specs:
-            self.values_specs.append('--router:external=True')
-        return super(ListExternalNetwork, self).retrieve_list(parsed_args)
+    def args2search_opts(self, parsed_args):
+        # every list, count, group and watch request goes through here
+        search_opts = super(ListExternalNetwork, self).args2search_opts(
+            parsed_args)
+        search_opts['router:external'] = True
+        return search_opts
 
 
 class ShowNetwork(neutronV20.ShowCommand):
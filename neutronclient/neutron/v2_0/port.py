@@ -65,13 +65,16 @@ class ListRouterPort(neutronV20.ListCommand):
             help=_('ID or name of router to look up.'))
         return parser
 
-    def get_data(self, parsed_args):
-        neutron_client = self.get_client()
-        neutron_client.format = parsed_args.request_format
-        _id = neutronV20.find_resourceid_by_name_or_id(
-            neutron_client, 'router', parsed_args.id)
-        self.values_specs.append('--device_id=%s' % _id)
-        return super(ListRouterPort, self).get_data(parsed_args)
+    def args2search_opts(self, parsed_args):
+        # every list, count, group and watch request goes through here,
+        # the router being looked up once
+        search_opts = super(ListRouterPort, self).args2search_opts(
+            parsed_args)
+        if getattr(self, '_device_id', None) is None:
+            self._device_id = neutronV20.find_resourceid_by_name_or_id(
+                self.get_client(), 'router', parsed_args.id)
+        search_opts['device_id'] = self._device_id
+        return search_opts
 
 
 class ShowPort(neutronV20.ShowCommand):
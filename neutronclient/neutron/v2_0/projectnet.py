@@ -0,0 +1,120 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+from __future__ import print_function
+
+from cliff import lister
+from oslo.serialization import jsonutils
+
+from neutronclient.common import utils
+from neutronclient.i18n import _
+from neutronclient.neutron import v2_0 as neutronV20
+from neutronclient.v2_0 import projectnet
+
+
+class ExportProjectNetwork(neutronV20.NeutronCommand, lister.Lister):
+    """Export the network configuration of a project to a file.
+
+    Networks, subnets, routers and their interfaces, security groups and
+    rules, LBaaS, FWaaS and VPN resources are listed concurrently and
+    written as a JSON document referring to resources by position rather
+    than by id, which project-network-import can recreate elsewhere.
+    External networks and shared networks of other tenants are left out.
+    """
+
+    list_columns = projectnet.SUMMARY_COLUMNS
+
+    def get_parser(self, prog_name):
+        parser = super(ExportProjectNetwork, self).get_parser(prog_name)
+        parser.add_argument(
+            '--tenant-id', metavar='TENANT_ID',
+            help=_('Export the resources of this tenant (default: the '
+                   'current tenant).'))
+        neutronV20.add_concurrency_argument(parser)
+        parser.add_argument(
+            'path', metavar='FILE',
+            help=_('The document file to write.'))
+        return parser
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)', parsed_args)
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        document, skipped = projectnet.export_project(
+            neutron_client, tenant_id=parsed_args.tenant_id,
+            max_workers=parsed_args.concurrency)
+        with open(parsed_args.path, 'w') as f:
+            f.write(jsonutils.dumps(document, indent=2, sort_keys=True))
+        resources = document['resources']
+        return (self.list_columns,
+                ((collection, len(resources[collection]),
+                  skipped[collection])
+                 for collection, _fields, _references in projectnet.SCHEMA))
+
+
+class ImportProjectNetwork(neutronV20.NeutronCommand, lister.Lister):
+    """Recreate the network configuration exported to a file.
+
+    The resources are created level by level in dependency order, the
+    independent ones concurrently and in bulk where Neutron allows it,
+    and the ids of the created resources replace their references in
+    the document. The default security group and its existing rules are
+    reused, and router gateways are set on the external network of the
+    same name.
+    """
+
+    list_columns = projectnet.COLUMNS
+
+    def get_parser(self, prog_name):
+        parser = super(ImportProjectNetwork, self).get_parser(prog_name)
+        parser.add_argument(
+            '--tenant-id', metavar='TENANT_ID',
+            help=_('Create the resources for this tenant, which requires '
+                   'admin rights (default: the current tenant).'))
+        parser.add_argument(
+            '--target-region', metavar='REGION',
+            help=_('Create the resources in this region rather than in '
+                   'the current one.'))
+        neutronV20.add_concurrency_argument(parser)
+        parser.add_argument(
+            'path', metavar='FILE',
+            help=_('The document file written by project-network-export.'))
+        return parser
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)', parsed_args)
+        with open(parsed_args.path) as f:
+            document = jsonutils.loads(f.read())
+        if parsed_args.target_region:
+            neutron_client = self.app.client_manager.make_region_client(
+                parsed_args.target_region)
+        else:
+            neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        try:
+            rows = projectnet.import_project(
+                neutron_client, document, tenant_id=parsed_args.tenant_id,
+                max_workers=parsed_args.concurrency)
+        except Exception as e:
+            # list what was created before the failure, which a second
+            # import of the document would otherwise duplicate
+            for row in getattr(e, 'imported_rows', []):
+                print(_('Created %(ref)s: %(id)s') % row,
+                      file=self.app.stdout)
+            raise
+        return (self.list_columns,
+                (utils.get_item_properties(s, self.list_columns)
+                 for s in rows))
@@ -27,6 +27,7 @@ from neutronclient.common import exceptions
 from neutronclient.common import utils
 from neutronclient.i18n import _
 from neutronclient.neutron import v2_0 as neutronV20
+from neutronclient.v2_0 import quotausage
 
 
 def get_tenant_id(tenant_id, client):
@@ -94,6 +95,50 @@ class ListQuota(neutronV20.NeutronCommand, lister.Lister):
                 for s in info))
 
 
+class ListQuotaUsage(neutronV20.NeutronCommand, lister.Lister):
+    """List the quota usage of all tenants.
+
+    Each quota-governed collection is scanned once for all tenants, and
+    the counts are compared to the quotas of each tenant, or to the
+    default quotas.
+    """
+
+    api = 'network'
+    resource = 'quota'
+    list_columns = quotausage.COLUMNS
+
+    def get_parser(self, prog_name):
+        parser = super(ListQuotaUsage, self).get_parser(prog_name)
+        parser.add_argument(
+            '--tenant-id', metavar='tenant-id',
+            help=_('Only report the usage of this tenant.'))
+        parser.add_argument(
+            '--resource', action='append',
+            choices=sorted(quotausage.QUOTA_COLLECTIONS),
+            help=_('Quota resource to report, all by default. Can be '
+                   'repeated.'))
+        parser.add_argument(
+            '--threshold', metavar='PERCENT', type=int,
+            help=_('Only list the quotas used at PERCENT or more.'))
+        neutronV20.add_concurrency_argument(parser)
+        return parser
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)', parsed_args)
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        rows = quotausage.quota_usage(neutron_client,
+                                      resources=parsed_args.resource,
+                                      max_workers=parsed_args.concurrency,
+                                      tenant_id=parsed_args.tenant_id)
+        if parsed_args.threshold is not None:
+            rows = [row for row in rows if row['percent'] is not None and
+                    row['percent'] >= parsed_args.threshold]
+        return (self.list_columns,
+                (utils.get_item_properties(s, self.list_columns)
+                 for s in rows))
+
+
 class ShowQuota(neutronV20.NeutronCommand, show.ShowOne):
     """Show quotas of a given tenant.
 
@@ -0,0 +1,57 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+from cliff import lister
+
+from neutronclient.common import utils
+from neutronclient.i18n import _
+from neutronclient.neutron import v2_0 as neutronV20
+from neutronclient.v2_0 import search
+
+
+class FindResource(neutronV20.NeutronCommand, lister.Lister):
+    """Find the resources of any type matching an id, name or address.
+
+    A UUID is searched as an id, any other term as a name, and also as
+    an address when it is an IP, a CIDR or a MAC address. All the
+    collections are searched concurrently.
+    """
+
+    list_columns = search.COLUMNS
+
+    def get_parser(self, prog_name):
+        parser = super(FindResource, self).get_parser(prog_name)
+        parser.add_argument(
+            '--tenant-id', metavar='TENANT_ID',
+            help=_('Only search the resources of this tenant.'))
+        neutronV20.add_concurrency_argument(parser)
+        parser.add_argument(
+            'term', metavar='TERM',
+            help=_('ID, name, IP, CIDR or MAC address to search.'))
+        return parser
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)', parsed_args)
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        filters = {}
+        if parsed_args.tenant_id:
+            filters['tenant_id'] = parsed_args.tenant_id
+        rows = search.find(neutron_client, parsed_args.term,
+                           max_workers=parsed_args.concurrency, **filters)
+        return (self.list_columns,
+                (utils.get_item_properties(s, self.list_columns)
+                 for s in rows))
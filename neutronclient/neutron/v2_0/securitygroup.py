@@ -15,10 +15,17 @@
 #
 
 import argparse
+import sys
+
+from cliff import lister
 
 from neutronclient.common import exceptions
+from neutronclient.common import utils
 from neutronclient.i18n import _
 from neutronclient.neutron import v2_0 as neutronV20
+from neutronclient.v2_0 import sgcompact
+from neutronclient.v2_0 import sgfanout
+from neutronclient.v2_0 import sgpolicy
 
 
 class ListSecurityGroup(neutronV20.ListCommand):
@@ -270,3 +277,151 @@ class DeleteSecurityGroupRule(neutronV20.DeleteCommand):
 
     resource = 'security_group_rule'
     allow_names = False
+
+
+class CheckPortSecurityPolicy(neutronV20.NeutronCommand, lister.Lister):
+    """Check flows against the security groups of a port.
+
+    The rules of all the security groups of the port are loaded at once
+    and compiled, so that thousands of flows can be checked in a single
+    run. A flow is DIRECTION,PROTOCOL,REMOTE_IP[,PORT], e.g.
+    ingress,tcp,10.0.0.5,22 or egress,icmp,10.0.0.1,8/0, an ingress flow
+    going from REMOTE_IP to the port.
+    """
+
+    def get_parser(self, prog_name):
+        parser = super(CheckPortSecurityPolicy, self).get_parser(prog_name)
+        parser.add_argument(
+            '--file', metavar='FILE',
+            help=_('Read flows from FILE, one per line, "-" meaning the '
+                   'standard input.'))
+        parser.add_argument(
+            '--explain', action='store_true',
+            help=_('Also list the IDs of the rules allowing each flow.'))
+        parser.add_argument(
+            'port', metavar='PORT',
+            help=_('ID or name of the port.'))
+        parser.add_argument(
+            'flows', metavar='FLOW', nargs='*',
+            help=_('Flow to check, as DIRECTION,PROTOCOL,REMOTE_IP[,PORT]. '
+                   'PORT is required for tcp, udp and icmp.'))
+        return parser
+
+    def _read_flows(self, parsed_args):
+        flows = list(parsed_args.flows)
+        if parsed_args.file == '-':
+            flows.extend(sys.stdin.read().split())
+        elif parsed_args.file:
+            with open(parsed_args.file) as f:
+                flows.extend(f.read().split())
+        if not flows:
+            raise exceptions.CommandError(_("Must specify flows or --file"))
+        try:
+            return [sgpolicy.parse_flow(flow) for flow in flows]
+        except ValueError as e:
+            raise exceptions.CommandError(str(e))
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)', parsed_args)
+        flows = self._read_flows(parsed_args)
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        port_id = neutronV20.find_resourceid_by_name_or_id(
+            neutron_client, 'port', parsed_args.port)
+        policy = sgpolicy.load_port_policy(neutron_client, port_id)
+        columns = list(sgpolicy.COLUMNS)
+        if parsed_args.explain:
+            columns.append('rules')
+        rows = []
+        for kwargs in flows:
+            port = '' if kwargs['port'] is None else str(kwargs['port'])
+            if kwargs['icmp_code'] is not None:
+                port += '/%s' % kwargs['icmp_code']
+            row = {'direction': kwargs['direction'],
+                   'protocol': kwargs['protocol'] or 'any',
+                   'remote_ip': kwargs['remote_ip'],
+                   'port': port,
+                   'allowed': policy.allows(**kwargs)}
+            if parsed_args.explain:
+                row['rules'] = '\n'.join(
+                    rule['id'] for rule in policy.matching_rules(**kwargs))
+            rows.append(row)
+        return (columns,
+                (utils.get_item_properties(s, columns) for s in rows))
+
+
+class CompactSecurityGroup(neutronV20.NeutronCommand, lister.Lister):
+    """Merge the remote IP prefixes of the rules of a security group.
+
+    Rules differing only in their remote IP prefix are replaced by the
+    fewest rules whose CIDRs cover exactly the same addresses. The new
+    rules are created in one bulk request before the old ones are
+    deleted, and the rules created and deleted are listed.
+    """
+
+    resource = 'security_group'
+    list_columns = sgcompact.COLUMNS
+
+    def get_parser(self, prog_name):
+        parser = super(CompactSecurityGroup, self).get_parser(prog_name)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help=_('Only list the rules which would be created and '
+                   'deleted.'))
+        neutronV20.add_concurrency_argument(parser)
+        parser.add_argument(
+            'security_group_id', metavar='SECURITY_GROUP',
+            help=_('ID or name of the security group to compact.'))
+        return parser
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)', parsed_args)
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        _id = neutronV20.find_resourceid_by_name_or_id(
+            neutron_client, self.resource, parsed_args.security_group_id)
+        rows = sgcompact.compact_security_group(
+            neutron_client, _id, dry_run=parsed_args.dry_run,
+            max_workers=parsed_args.concurrency)
+        return (self.list_columns,
+                (utils.get_item_properties(s, self.list_columns)
+                 for s in rows))
+
+
+class ListRemoteGroupFanOut(neutronV20.NeutronCommand, lister.Lister):
+    """Rank the remote group rules by the port pairs they expand to.
+
+    Each port of a group having a rule with a remote group tracks every
+    port of the remote group. When the current IPs of the remote group
+    fit in fewer CIDRs than it has ports, the CIDRs are suggested as a
+    cheaper replacement.
+    """
+
+    list_columns = sgfanout.COLUMNS
+
+    def get_parser(self, prog_name):
+        parser = super(ListRemoteGroupFanOut, self).get_parser(prog_name)
+        parser.add_argument(
+            '--tenant-id', metavar='TENANT_ID',
+            help=_('Only consider the ports and rules of this tenant.'))
+        parser.add_argument(
+            '--top', metavar='N', type=int,
+            help=_('Only list the N most expensive rules.'))
+        neutronV20.add_concurrency_argument(parser)
+        return parser
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)', parsed_args)
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        filters = {}
+        if parsed_args.tenant_id:
+            filters['tenant_id'] = parsed_args.tenant_id
+        rows = sgfanout.load_fanout(neutron_client,
+                                    max_workers=parsed_args.concurrency,
+                                    **filters).costs()
+        if parsed_args.top:
+            rows = rows[:parsed_args.top]
+        return (self.list_columns,
+                (utils.get_item_properties(s, self.list_columns)
+                 for s in rows))
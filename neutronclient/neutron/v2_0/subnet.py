@@ -16,12 +16,16 @@
 
 import argparse
 
+from cliff import lister
+import netaddr
 from oslo.serialization import jsonutils
 
 from neutronclient.common import exceptions
 from neutronclient.common import utils
 from neutronclient.i18n import _
 from neutronclient.neutron import v2_0 as neutronV20
+from neutronclient.v2_0 import cidrs
+from neutronclient.v2_0 import utilization
 
 
 def _format_allocation_pools(subnet):
@@ -151,6 +155,58 @@ class ListSubnet(neutronV20.ListCommand):
     sorting_support = True
 
 
+class ListSubnetUtilization(neutronV20.NeutronCommand, lister.Lister):
+    """List the allocation pool usage of subnets, fullest first.
+
+    Subnets are listed once, then ports are streamed with their fixed IPs
+    only, so that no per-port or per-subnet request is made.
+    """
+
+    resource = 'subnet'
+
+    def get_parser(self, prog_name):
+        parser = super(ListSubnetUtilization, self).get_parser(prog_name)
+        parser.add_argument(
+            '--by-network',
+            action='store_true',
+            help=_('Sum up the usage of the subnets of each network.'))
+        parser.add_argument(
+            '--threshold',
+            metavar='PERCENT', type=float,
+            help=_('Only list the subnets or networks at least PERCENT '
+                   'used.'))
+        parser.add_argument(
+            '--tenant-id', metavar='TENANT_ID',
+            help=_('Only report the subnets of this tenant.'))
+        parser.add_argument(
+            '--network', metavar='NETWORK',
+            help=_('Only report the subnets of this network ID or name.'))
+        neutronV20.add_snapshot_argument(parser)
+        return parser
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)', parsed_args)
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        neutronV20.use_snapshot(neutron_client, parsed_args)
+        filters = neutronV20.parse_args_to_dict(self.values_specs)
+        if parsed_args.tenant_id:
+            filters['tenant_id'] = parsed_args.tenant_id
+        if parsed_args.network:
+            filters['network_id'] = neutronV20.find_resourceid_by_name_or_id(
+                neutron_client, 'network', parsed_args.network)
+        usage = utilization.load_utilization(neutron_client, **filters)
+        if parsed_args.by_network:
+            columns = utilization.NETWORK_COLUMNS
+            rows = usage.by_network()
+        else:
+            columns = utilization.SUBNET_COLUMNS
+            rows = usage.by_subnet()
+        rows = utilization.sort_rows(rows, parsed_args.threshold)
+        return (columns,
+                (utils.get_item_properties(s, columns) for s in rows))
+
+
 class ShowSubnet(neutronV20.ShowCommand):
     """Show information of a given subnet."""
 
@@ -178,8 +234,23 @@ class CreateSubnet(neutronV20.CreateCommand):
             'network_id', metavar='NETWORK',
             help=_('Network ID or name this subnet belongs to.'))
         parser.add_argument(
-            'cidr', metavar='CIDR',
+            'cidr', metavar='CIDR', nargs='?',
             help=_('CIDR of subnet to create.'))
+        parser.add_argument(
+            '--auto-cidr', metavar='SUPERNET/PREFIXLEN',
+            help=_('Instead of a CIDR, use the first free block of the given '
+                   'prefix length within a supernet, e.g. 10.0.0.0/16/24.'))
+        parser.add_argument(
+            '--auto-cidr-fit',
+            choices=['first', 'best'], default='first',
+            help=_('Use the lowest free block (first, the default) or the '
+                   'lowest of the smallest free blocks (best).'))
+        parser.add_argument(
+            '--auto-cidr-scope',
+            choices=['all', 'tenant', 'network'], default='all',
+            help=_('The existing subnets to avoid: all the visible ones (the '
+                   'default), those of the subnet tenant or those of its '
+                   'network.'))
         parser.add_argument(
             '--ipv6-ra-mode',
             choices=['dhcpv6-stateful', 'dhcpv6-stateless', 'slaac'],
@@ -189,14 +260,46 @@ class CreateSubnet(neutronV20.CreateCommand):
             choices=['dhcpv6-stateful', 'dhcpv6-stateless', 'slaac'],
             help=_('IPv6 address mode.'))
 
+    def _auto_cidr(self, parsed_args, network_id):
+        try:
+            supernet, prefixlen = parsed_args.auto_cidr.rsplit('/', 1)
+            if '/' not in supernet:
+                raise ValueError()
+            supernet = netaddr.IPNetwork(supernet)
+            prefixlen = int(prefixlen)
+        except (ValueError, netaddr.AddrFormatError):
+            raise exceptions.CommandError(
+                _("Invalid --auto-cidr %s, expected SUPERNET/PREFIXLEN such "
+                  "as 10.0.0.0/16/24") % parsed_args.auto_cidr)
+        neutron_client = self.get_client()
+        filters = {}
+        if parsed_args.auto_cidr_scope == 'network':
+            filters['network_id'] = network_id
+        elif parsed_args.auto_cidr_scope == 'tenant':
+            # A token/endpoint client carries no tenant id of its own, so
+            # ask the server which tenant the token belongs to.
+            filters['tenant_id'] = (
+                parsed_args.tenant_id or
+                neutron_client.httpclient.get_auth_info()['auth_tenant_id'] or
+                neutron_client.get_quotas_tenant()['tenant']['tenant_id'])
+        parsed_args.ip_version = supernet.version
+        return cidrs.allocate_cidrs(
+            neutron_client, supernet, [prefixlen],
+            best_fit=parsed_args.auto_cidr_fit == 'best', **filters)[0]
+
     def args2body(self, parsed_args):
+        if bool(parsed_args.cidr) == bool(parsed_args.auto_cidr):
+            raise exceptions.CommandError(
+                _("Must specify either CIDR or --auto-cidr"))
+        _network_id = neutronV20.find_resourceid_by_name_or_id(
+            self.get_client(), 'network', parsed_args.network_id)
+        if parsed_args.auto_cidr:
+            parsed_args.cidr = self._auto_cidr(parsed_args, _network_id)
         if parsed_args.ip_version == 4 and parsed_args.cidr.endswith('/32'):
             self.log.warning(_("An IPv4 subnet with a /32 CIDR will have "
                                "only one usable IP address so the device "
                                "attached to it will not have any IP "
                                "connectivity."))
-        _network_id = neutronV20.find_resourceid_by_name_or_id(
-            self.get_client(), 'network', parsed_args.network_id)
         body = {'subnet': {'cidr': parsed_args.cidr,
                            'network_id': _network_id,
                            'ip_version': parsed_args.ip_version, }, }
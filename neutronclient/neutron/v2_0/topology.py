@@ -0,0 +1,128 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+from __future__ import print_function
+
+from cliff import lister
+
+from neutronclient.common import utils
+from neutronclient.i18n import _
+from neutronclient.neutron import v2_0 as neutronV20
+from neutronclient.neutron.v2_0 import port
+from neutronclient.v2_0 import topology
+
+
+class TopologyCommand(neutronV20.NeutronCommand):
+    """Base class of the commands working on the topology graph."""
+
+    def get_parser(self, prog_name):
+        parser = super(TopologyCommand, self).get_parser(prog_name)
+        parser.add_argument(
+            '--tenant-id', metavar='TENANT_ID',
+            help=_('Only load the resources of this tenant.'))
+        neutronV20.add_snapshot_argument(parser)
+        neutronV20.add_concurrency_argument(parser)
+        return parser
+
+    def load_topology(self, parsed_args):
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        neutronV20.use_snapshot(neutron_client, parsed_args)
+        filters = {}
+        if parsed_args.tenant_id:
+            filters['tenant_id'] = parsed_args.tenant_id
+        return topology.load_topology(neutron_client,
+                                      max_workers=parsed_args.concurrency,
+                                      **filters)
+
+
+class ExportTopology(TopologyCommand):
+    """Export the topology graph in DOT or JSON format."""
+
+    def get_parser(self, prog_name):
+        parser = super(ExportTopology, self).get_parser(prog_name)
+        parser.add_argument(
+            '--output-format',
+            choices=['dot', 'json'], default='dot',
+            help=_('The format of the graph (default: dot).'))
+        return parser
+
+    def run(self, parsed_args):
+        self.log.debug('run(%s)', parsed_args)
+        graph = self.load_topology(parsed_args)
+        if parsed_args.output_format == 'json':
+            print(graph.to_json(), file=self.app.stdout)
+        else:
+            self.app.stdout.write(graph.to_dot())
+
+
+class ListPortsBehindRouter(TopologyCommand, lister.Lister):
+    """List the ports on the subnets a router has an interface on."""
+
+    list_columns = ['id', 'name', 'network_id', 'device_id', 'device_owner',
+                    'fixed_ips']
+    _formatters = {'fixed_ips': port._format_fixed_ips}
+
+    def get_parser(self, prog_name):
+        parser = super(ListPortsBehindRouter, self).get_parser(prog_name)
+        parser.add_argument(
+            'router', metavar='ROUTER',
+            help=_('ID or name of the router.'))
+        return parser
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)', parsed_args)
+        graph = self.load_topology(parsed_args)
+        router = graph.find('router', parsed_args.router)
+        ports = graph.ports_behind_router(router['id'])
+        return (self.list_columns,
+                (utils.get_item_properties(s, self.list_columns,
+                                           formatters=self._formatters)
+                 for s in ports))
+
+
+class TraceFloatingIP(TopologyCommand, lister.Lister):
+    """Show what a floating IP reaches: router, port, subnets, network."""
+
+    list_columns = ['type', 'id', 'name', 'detail']
+
+    def get_parser(self, prog_name):
+        parser = super(TraceFloatingIP, self).get_parser(prog_name)
+        parser.add_argument(
+            'floatingip', metavar='FLOATINGIP_ID',
+            help=_('ID of the floating IP.'))
+        return parser
+
+    @staticmethod
+    def _detail(rtype, item):
+        if rtype == 'floatingip':
+            return '%s -> %s' % (item.get('floating_ip_address'),
+                                 item.get('fixed_ip_address'))
+        if rtype == 'port':
+            return '%s %s' % (item.get('device_owner') or '',
+                              item.get('device_id') or '')
+        if rtype == 'subnet':
+            return item.get('cidr')
+        return ''
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)', parsed_args)
+        graph = self.load_topology(parsed_args)
+        fip = graph.find('floatingip', parsed_args.floatingip)
+        return (self.list_columns,
+                ((rtype, item['id'], item.get('name', ''),
+                  self._detail(rtype, item).strip())
+                 for rtype, item in graph.trace_floatingip(fip['id'])))
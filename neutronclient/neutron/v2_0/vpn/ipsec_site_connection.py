@@ -54,6 +54,7 @@ class ShowIPsecSiteConnection(neutronv20.ShowCommand):
 class CreateIPsecSiteConnection(neutronv20.CreateCommand):
     """Create an IPsec site connection."""
     resource = 'ipsec_site_connection'
+    wait_support = True
 
     def add_known_arguments(self, parser):
         parser.add_argument(
@@ -162,6 +163,7 @@ class UpdateIPsecSiteConnection(neutronv20.UpdateCommand):
     """Update a given IPsec site connection."""
 
     resource = 'ipsec_site_connection'
+    wait_support = True
 
     def add_known_arguments(self, parser):
 
@@ -41,6 +41,7 @@ class ShowVPNService(neutronv20.ShowCommand):
 class CreateVPNService(neutronv20.CreateCommand):
     """Create a VPN service."""
     resource = 'vpnservice'
+    wait_support = True
 
     def add_known_arguments(self, parser):
         parser.add_argument(
@@ -82,6 +83,7 @@ class UpdateVPNService(neutronv20.UpdateCommand):
     """Update a given VPN service."""
 
     resource = 'vpnservice'
+    wait_support = True
 
 
 class DeleteVPNService(neutronv20.DeleteCommand):
@@ -41,14 +41,17 @@ from neutronclient.common import clientmanager
 from neutronclient.common import exceptions as exc
 from neutronclient.common import utils
 from neutronclient.i18n import _
+from neutronclient.neutron.v2_0 import address
 from neutronclient.neutron.v2_0 import agent
 from neutronclient.neutron.v2_0 import agentscheduler
+from neutronclient.neutron.v2_0 import audit
 from neutronclient.neutron.v2_0 import credential
 from neutronclient.neutron.v2_0 import extension
 from neutronclient.neutron.v2_0 import floatingip
 from neutronclient.neutron.v2_0.fw import firewall
 from neutronclient.neutron.v2_0.fw import firewallpolicy
 from neutronclient.neutron.v2_0.fw import firewallrule
+from neutronclient.neutron.v2_0 import inventory
 from neutronclient.neutron.v2_0.lb import healthmonitor as lb_healthmonitor
 from neutronclient.neutron.v2_0.lb import member as lb_member
 from neutronclient.neutron.v2_0.lb import pool as lb_pool
@@ -62,11 +65,14 @@ from neutronclient.neutron.v2_0.nsx import networkgateway
 from neutronclient.neutron.v2_0.nsx import qos_queue
 from neutronclient.neutron.v2_0 import policyprofile
 from neutronclient.neutron.v2_0 import port
+from neutronclient.neutron.v2_0 import projectnet
 from neutronclient.neutron.v2_0 import quota
 from neutronclient.neutron.v2_0 import router
+from neutronclient.neutron.v2_0 import search
 from neutronclient.neutron.v2_0 import securitygroup
 from neutronclient.neutron.v2_0 import servicetype
 from neutronclient.neutron.v2_0 import subnet
+from neutronclient.neutron.v2_0 import topology
 from neutronclient.neutron.v2_0.vpn import ikepolicy
 from neutronclient.neutron.v2_0.vpn import ipsec_site_connection
 from neutronclient.neutron.v2_0.vpn import ipsecpolicy
@@ -125,6 +131,7 @@ COMMAND_V2 = {
     'net-update': network.UpdateNetwork,
     'subnet-list': subnet.ListSubnet,
     'subnet-show': subnet.ShowSubnet,
+    'subnet-utilization': subnet.ListSubnetUtilization,
     'subnet-create': subnet.CreateSubnet,
     'subnet-delete': subnet.DeleteSubnet,
     'subnet-update': subnet.UpdateSubnet,
@@ -137,6 +144,7 @@ COMMAND_V2 = {
     'quota-show': quota.ShowQuota,
     'quota-delete': quota.DeleteQuota,
     'quota-update': quota.UpdateQuota,
+    'quota-usage': quota.ListQuotaUsage,
     'ext-list': extension.ListExt,
     'ext-show': extension.ShowExt,
     'router-list': router.ListRouter,
@@ -175,6 +183,7 @@ COMMAND_V2 = {
     'lb-pool-update': lb_pool.UpdatePool,
     'lb-pool-delete': lb_pool.DeletePool,
     'lb-pool-stats': lb_pool.RetrievePoolStats,
+    'lb-pool-stats-collect': lb_pool.CollectPoolStats,
     'lb-member-list': lb_member.ListMember,
     'lb-member-show': lb_member.ShowMember,
     'lb-member-create': lb_member.CreateMember,
@@ -197,6 +206,23 @@ COMMAND_V2 = {
     'agent-show': agent.ShowAgent,
     'agent-delete': agent.DeleteAgent,
     'agent-update': agent.UpdateAgent,
+    'agent-load': agent.ListAgentLoad,
+    'agent-maintenance-start': agent.StartAgentMaintenance,
+    'agent-maintenance-stop': agent.StopAgentMaintenance,
+    'agent-monitor': agent.MonitorAgents,
+    'inventory-snapshot': inventory.CreateInventorySnapshot,
+    'inventory-diff': inventory.DiffInventory,
+    'project-network-export': projectnet.ExportProjectNetwork,
+    'project-network-import': projectnet.ImportProjectNetwork,
+    'topology-export': topology.ExportTopology,
+    'topology-router-ports': topology.ListPortsBehindRouter,
+    'topology-floatingip-trace': topology.TraceFloatingIP,
+    'address-lookup': address.LookupAddress,
+    'find': search.FindResource,
+    'audit-orphans': audit.AuditOrphans,
+    'security-group-check': securitygroup.CheckPortSecurityPolicy,
+    'security-group-compact': securitygroup.CompactSecurityGroup,
+    'security-group-fanout': securitygroup.ListRemoteGroupFanOut,
     'net-gateway-create': networkgateway.CreateNetworkGateway,
     'net-gateway-update': networkgateway.UpdateNetworkGateway,
     'net-gateway-delete': networkgateway.DeleteNetworkGateway,
@@ -232,6 +258,7 @@ COMMAND_V2 = {
     'firewall-policy-delete': firewallpolicy.DeleteFirewallPolicy,
     'firewall-policy-insert-rule': firewallpolicy.FirewallPolicyInsertRule,
     'firewall-policy-remove-rule': firewallpolicy.FirewallPolicyRemoveRule,
+    'firewall-policy-analyze': firewallpolicy.AnalyzeFirewallPolicy,
     'firewall-list': firewall.ListFirewall,
     'firewall-show': firewall.ShowFirewall,
     'firewall-create': firewall.CreateFirewall,
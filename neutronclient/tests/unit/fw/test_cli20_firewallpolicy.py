@@ -16,13 +16,41 @@
 # @author: KC Wang, Big Switch Networks Inc.
 #
 
+import random
 import sys
 
 from mox3 import mox
+from oslo.serialization import jsonutils
+import testtools
 
 from neutronclient.neutron.v2_0.fw import firewallpolicy
 from neutronclient import shell
 from neutronclient.tests.unit import test_cli20
+from neutronclient.v2_0 import fwanalysis
+
+
+def _fw_rule(_id, action, protocol='tcp', source=None, destination=None,
+             destination_port=None, enabled=True, ip_version=4):
+    return {'id': _id, 'name': 'name-%s' % _id, 'action': action,
+            'protocol': protocol, 'ip_version': ip_version,
+            'source_ip_address': source, 'destination_ip_address': destination,
+            'source_port': None, 'destination_port': destination_port,
+            'enabled': enabled}
+
+
+POLICY_RULES = [
+    _fw_rule('r1', 'allow', source='10.0.0.0/8', destination_port='80'),
+    _fw_rule('r2', 'deny', source='10.1.0.0/16', destination_port='80'),
+    _fw_rule('r3', 'allow', source='10.2.0.0/16', destination_port='80'),
+    _fw_rule('r4', 'deny', source='192.168.0.0/16',
+             destination_port='1:1024'),
+    _fw_rule('r5', 'allow', source='192.168.1.0/24',
+             destination_port='22:2000'),
+    _fw_rule('r6', 'deny', protocol=None, destination='172.16.0.0/12'),
+    _fw_rule('r7', 'deny', source='10.0.0.0/8', enabled=False),
+    _fw_rule('r8', 'allow', protocol='icmp', destination_port='80'),
+    _fw_rule('r9', 'deny', source='2001:db8::/32', ip_version=6),
+]
 
 
 class CLITestV20FirewallPolicyJSON(test_cli20.CLITestV20Base):
@@ -222,6 +250,90 @@ class CLITestV20FirewallPolicyJSON(test_cli20.CLITestV20Base):
         self.mox.VerifyAll()
         self.mox.UnsetStubs()
 
+    def test_analyze_firewall_policy(self):
+        """firewall-policy-analyze myid."""
+        cmd = firewallpolicy.AnalyzeFirewallPolicy(
+            test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self._expect_request(
+            'GET', self.client.firewall_policy_path % 'myid',
+            'fields=id&fields=firewall_rules',
+            {'firewall_policy': {'id': 'myid',
+                                 'firewall_rules': ['r1', 'r2', 'r9']}})
+        self._expect_request(
+            'GET', self.client.firewall_rules_path, 'id=r1&id=r2&id=r9',
+            {'firewall_rules': [POLICY_RULES[8], POLICY_RULES[1],
+                                POLICY_RULES[0]]})
+        _str = self._run_command(cmd, ['-f', 'json', 'myid'])
+        self.assertEqual(
+            [{'position': 2, 'id': 'r2', 'name': 'name-r2',
+              'anomaly': 'shadowed', 'related_position': 1,
+              'related_id': 'r1'}],
+            jsonutils.loads(_str))
+
 
 class CLITestV20FirewallPolicyXML(CLITestV20FirewallPolicyJSON):
     format = 'xml'
+
+
+class AnalyzeRulesTest(testtools.TestCase):
+    def _anomalies(self, rules):
+        return [(a['position'], a['anomaly'], a['related_position'])
+                for a in fwanalysis.analyze_rules(rules)]
+
+    def test_analyze_rules(self):
+        self.assertEqual([(2, 'shadowed', 1), (3, 'redundant', 1),
+                          (5, 'conflict', 4), (6, 'conflict', 1),
+                          (6, 'conflict', 5), (8, 'conflict', 6)],
+                         self._anomalies(POLICY_RULES))
+
+    def test_port_ranges(self):
+        rules = [_fw_rule('r1', 'allow', destination_port='1000:2000'),
+                 _fw_rule('r2', 'deny', destination_port='1500'),
+                 _fw_rule('r3', 'deny', destination_port='2000:3000'),
+                 _fw_rule('r4', 'deny', destination_port='3001:4000')]
+        self.assertEqual([(2, 'shadowed', 1), (3, 'conflict', 1)],
+                         self._anomalies(rules))
+
+    def test_many_rules(self):
+        rules = [_fw_rule('r%d' % i, 'allow',
+                          source='10.%d.%d.0/24' % (i // 256, i % 256))
+                 for i in range(5000)]
+        rules.append(_fw_rule('last', 'deny', source='10.3.7.0/24'))
+        self.assertEqual([(5001, 'shadowed', 776)], self._anomalies(rules))
+
+    def test_agrees_with_pairwise_comparison(self):
+        rand = random.Random(7)
+        rules = []
+        for i in range(300):
+            port = rand.randint(1, 60)
+            rules.append(_fw_rule(
+                'r%d' % i, rand.choice(['allow', 'deny']),
+                protocol=rand.choice([None, 'tcp', 'udp']),
+                source=rand.choice([None, '10.0.0.0/8', '10.%d.0.0/16' %
+                                    rand.randint(0, 3), '10.%d.%d.0/24' % (
+                                        rand.randint(0, 3),
+                                        rand.randint(0, 3))]),
+                destination=rand.choice([None, '172.16.%d.0/24' %
+                                         rand.randint(0, 3)]),
+                destination_port=rand.choice([None, str(port), '%d:%d' % (
+                    port, port + rand.randint(0, 20))])))
+        expected = []
+        boxes = []
+        for position, rule in enumerate(rules, 1):
+            box = fwanalysis._Rule(position, rule)
+            covering = [other for other in boxes if other.contains(box)]
+            if covering:
+                expected.append((position,
+                                 'redundant' if covering[0].action ==
+                                 box.action else 'shadowed',
+                                 covering[0].position))
+                continue
+            expected.extend((position, 'conflict', other.position)
+                            for other in boxes
+                            if other.action != box.action and
+                            other.overlaps(box))
+            boxes.append(box)
+        self.assertEqual(expected, self._anomalies(rules))
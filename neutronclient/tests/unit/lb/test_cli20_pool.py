@@ -19,6 +19,7 @@
 import sys
 
 from mox3 import mox
+from oslo.serialization import jsonutils
 
 from neutronclient.neutron.v2_0.lb import pool
 from neutronclient.tests.unit import test_cli20
@@ -167,6 +168,66 @@ class CLITestV20LbPoolJSON(test_cli20.CLITestV20Base):
         self.assertIn('bytes_in', _str)
         self.assertIn('bytes_out', _str)
 
+    def _test_collect_pool_stats(self, args, samples):
+        cmd = pool.CollectPoolStats(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self._expect_request(
+            'GET', self.client.pools_path,
+            'tenant_id=tid&fields=id&fields=name',
+            {'pools': [{'id': 'p1', 'name': 'web'},
+                       {'id': 'p2', 'name': 'db'}]})
+        for stats in samples:
+            for pool_id in ('p1', 'p2'):
+                self._expect_request(
+                    'GET', self.client.pool_path_stats % pool_id, None,
+                    {'stats': stats[pool_id]})
+        return self._run_command(cmd, ['--concurrency', '1'] + args +
+                                 ['--', '--tenant_id', 'tid'])
+
+    def test_collect_pool_stats_jsonl_deltas(self):
+        """lb-pool-stats-collect --count 2 --interval 0."""
+        first = {'bytes_in': 100, 'bytes_out': 10,
+                 'active_connections': 1, 'total_connections': 5}
+        second = {'bytes_in': 250, 'bytes_out': 10,
+                  'active_connections': 3, 'total_connections': 2}
+        _str = self._test_collect_pool_stats(
+            ['--output-format', 'jsonl', '--count', '2', '--interval', '0'],
+            [{'p1': first, 'p2': first}, {'p1': second, 'p2': second}])
+        rows = [jsonutils.loads(line) for line in _str.splitlines()]
+        self.assertEqual(4, len(rows))
+        self.assertIsNone(rows[0]['bytes_in_delta'])
+        self.assertEqual('p1', rows[2]['id'])
+        self.assertEqual(150, rows[2]['bytes_in_delta'])
+        self.assertEqual(0, rows[2]['bytes_out_delta'])
+        # counter reset
+        self.assertEqual(2, rows[2]['total_connections_delta'])
+
+    def test_collect_pool_stats_prometheus(self):
+        """lb-pool-stats-collect --output-format prometheus."""
+        stats = {'bytes_in': 100, 'bytes_out': 10,
+                 'active_connections': 1, 'total_connections': 5}
+        _str = self._test_collect_pool_stats(
+            ['--output-format', 'prometheus'], [{'p1': stats, 'p2': stats}])
+        self.assertIn('# TYPE neutron_lb_pool_bytes_in_total counter', _str)
+        self.assertIn('# TYPE neutron_lb_pool_active_connections gauge', _str)
+        self.assertIn('neutron_lb_pool_bytes_in_total{pool_id="p1",'
+                      'pool_name="web"} 100', _str)
+        self.assertIn('# TYPE neutron_lb_pool_connections_total counter',
+                      _str)
+        self.assertNotIn('total_connections', _str)
+
+    def test_collect_pool_stats_csv(self):
+        """lb-pool-stats-collect."""
+        stats = {'bytes_in': 100, 'bytes_out': 10,
+                 'active_connections': 1, 'total_connections': 5}
+        _str = self._test_collect_pool_stats([], [{'p1': stats, 'p2': stats}])
+        lines = _str.splitlines()
+        self.assertEqual(3, len(lines))
+        self.assertTrue(lines[0].startswith('timestamp,id,name,bytes_in'))
+        self.assertIn(',p2,db,100,10,1,5,,,', lines[2])
+
 
 class CLITestV20LbPoolXML(CLITestV20LbPoolJSON):
     format = 'xml'
@@ -208,6 +208,29 @@ class CLITestV20LbVipJSON(test_cli20.CLITestV20Base):
         args = [my_id]
         self._test_delete_resource(resource, cmd, my_id, args)
 
+    def test_create_vip_wait(self):
+        """lb-vip-create --wait."""
+        cmd = vip.CreateVip(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self._expect_request(
+            'POST', self.client.vips_path,
+            body={'vip': {'pool_id': 'my-pool-id', 'name': 'my-name',
+                          'protocol_port': '80', 'protocol': 'TCP',
+                          'subnet_id': 'subnet-id', 'admin_state_up': True}},
+            response={'vip': {'id': 'my-id', 'status': 'PENDING_CREATE'}})
+        self._expect_request(
+            'GET', self.client.vips_path, 'id=my-id&fields=id&fields=status',
+            {'vips': [{'id': 'my-id', 'status': 'ACTIVE'}]})
+        _str = self._run_command(cmd, ['--name', 'my-name',
+                                       '--protocol-port', '80',
+                                       '--protocol', 'TCP',
+                                       '--subnet-id', 'subnet-id', '--wait',
+                                       'my-pool-id'])
+        self.assertIn('ACTIVE', _str)
+        self.assertNotIn('PENDING_CREATE', _str)
+
 
 class CLITestV20LbVipXML(CLITestV20LbVipJSON):
     format = 'xml'
@@ -273,6 +273,34 @@ class CLITestV20Base(base.BaseTestCase):
         if name:
             self.assertIn(name, _str)
 
+    def _expect_request(self, method, path, query=None, response=None,
+                        body=None, status_code=200):
+        """Record a request expected on the stubbed out http client."""
+        self.client.format = self.format
+        resstr = response
+        if response is not None:
+            resstr = self.client.serialize(response)
+        if body is not None:
+            body = MyComparator(body, self.client)
+        self.client.httpclient.request(
+            MyUrlComparator(end_url(path, query, format=self.format),
+                            self.client),
+            method,
+            body=body,
+            headers=mox.ContainsKeyValue(
+                'X-Auth-Token', TOKEN)).AndReturn((MyResp(status_code),
+                                                   resstr))
+
+    def _run_command(self, cmd, args):
+        """Run cmd with args against self.client and return its output."""
+        self.mox.ReplayAll()
+        cmd_parser = cmd.get_parser('test')
+        args = ['--request-format', self.format] + list(args)
+        shell.run_command(cmd, cmd_parser, args)
+        self.mox.VerifyAll()
+        self.mox.UnsetStubs()
+        return self.fake_stdout.make_string()
+
     def _test_list_columns(self, cmd, resources,
                            resources_out, args=('-f', 'json'),
                            cmd_resources=None, parent_id=None):
@@ -617,6 +645,137 @@ class ClientV2TestJson(CLITestV20Base):
         self.mox.VerifyAll()
         self.mox.UnsetStubs()
 
+    def test_list_by_ids_splits_on_uri_too_long(self):
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        self.mox.StubOutWithMock(self.client, "_check_uri_length")
+        ids = ['id%d' % i for i in range(4)]
+        self.client._check_uri_length(mox.IgnoreArg()).AndRaise(
+            exceptions.RequestURITooLong(excess=8))
+        for chunk in (ids[:2], ids[2:]):
+            self.client._check_uri_length(mox.IgnoreArg()).AndReturn(None)
+            self._expect_request(
+                'GET', self.client.members_path,
+                '&'.join(['fields=id'] + ['id=%s' % i for i in chunk]),
+                {'members': [{'id': i} for i in chunk]})
+        self.mox.ReplayAll()
+        self.useFixture(fixtures.MonkeyPatch(
+            'neutronclient.common.utils.DEFAULT_CONCURRENCY', 1))
+        found = self.client.list_by_ids('members', ids, fields='id')
+        self.mox.VerifyAll()
+        self.mox.UnsetStubs()
+        self.assertEqual(ids, [m['id'] for m in found])
+
+    def _test_wait_for(self, polls):
+        delays = []
+        self.useFixture(fixtures.MonkeyPatch(
+            'neutronclient.v2_0.client.time.sleep', delays.append))
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        for members in polls:
+            self._expect_request(
+                'GET', self.client.members_path,
+                'fields=id&fields=status&' +
+                '&'.join('id=%s' % m['id'] for m in members),
+                {'members': members})
+        self.mox.ReplayAll()
+        return delays
+
+    def test_wait_for_single_request_per_poll(self):
+        delays = self._test_wait_for([
+            [{'id': 'm1', 'status': 'PENDING_CREATE'},
+             {'id': 'm2', 'status': 'PENDING_CREATE'}],
+            [{'id': 'm1', 'status': 'PENDING_CREATE'},
+             {'id': 'm2', 'status': 'PENDING_CREATE'}],
+            [{'id': 'm1', 'status': 'PENDING_CREATE'},
+             {'id': 'm2', 'status': 'ACTIVE'}],
+            [{'id': 'm1', 'status': 'INACTIVE'}]])
+        statuses = self.client.wait_for([('member', 'm1'), ('member', 'm2')])
+        self.mox.VerifyAll()
+        self.mox.UnsetStubs()
+        self.assertEqual({('member', 'm1'): 'INACTIVE',
+                          ('member', 'm2'): 'ACTIVE'}, statuses)
+        # backoff while nothing changes, reset on progress
+        self.assertEqual([1, 2, 1], delays)
+
+    def test_wait_for_error_status(self):
+        self._test_wait_for([[{'id': 'm1', 'status': 'ERROR'}]])
+        self.assertRaises(exceptions.ResourceInErrorState,
+                          self.client.wait_for, [('member', 'm1')], 'ACTIVE')
+        self.mox.VerifyAll()
+        self.mox.UnsetStubs()
+
+    def test_wait_for_timeout(self):
+        self._test_wait_for([[{'id': 'm1', 'status': 'PENDING_UPDATE'}]])
+        self.assertRaises(exceptions.WaitTimeout,
+                          self.client.wait_for, [('member', 'm1')],
+                          timeout=0)
+        self.mox.VerifyAll()
+        self.mox.UnsetStubs()
+
+    def test_watch(self):
+        delays = []
+        self.useFixture(fixtures.MonkeyPatch(
+            'neutronclient.v2_0.client.time.sleep', delays.append))
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        polls = [
+            [{'id': 'p1', 'status': 'DOWN', 'name': 'a'}],
+            [{'id': 'p1', 'status': 'DOWN', 'name': 'a'}],
+            [{'id': 'p1', 'status': 'ACTIVE'},
+             {'id': 'p2', 'status': 'DOWN', 'name': 'b'}],
+            [{'id': 'p2', 'status': 'DOWN', 'name': 'b'}],
+        ]
+        for ports in polls:
+            self._expect_request('GET', self.client.ports_path,
+                                 'fields=id&fields=status&fields=name',
+                                 {'ports': ports})
+        self.mox.ReplayAll()
+        feed = self.client.watch('ports', interval=1, count=4,
+                                 initial=False,
+                                 fields=['status', 'name'])
+        self.assertEqual(
+            [[],
+             [],
+             [{'event': 'update', 'id': 'p1',
+               'changes': {'status': 'ACTIVE', 'name': None}},
+              {'event': 'create', 'id': 'p2', 'resource': polls[2][1]}],
+             [{'event': 'delete', 'id': 'p1'}]],
+            list(feed))
+        self.mox.VerifyAll()
+        self.mox.UnsetStubs()
+        self.assertEqual([1, 2, 1], delays)
+
+    def test_count_pages(self):
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        query = 'fields=id&limit=%d' % self.client.COUNT_PAGE_SIZE
+        self._expect_request(
+            'GET', self.client.ports_path, query + '&network_id=n1',
+            {'ports': [{'id': 'p1'}, {'id': 'p2'}],
+             'ports_links': [{'rel': 'next', 'href': end_url(
+                 self.client.ports_path,
+                 query + '&network_id=n1&marker=p2')}]})
+        self._expect_request(
+            'GET', self.client.ports_path,
+            query + '&network_id=n1&marker=p2', {'ports': [{'id': 'p3'}]})
+        self.mox.ReplayAll()
+        self.assertEqual(3, self.client.count_ports(network_id='n1'))
+        self.mox.VerifyAll()
+        self.mox.UnsetStubs()
+
+    def test_count_sharded(self):
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        for network_id, count in (('n1', 2), ('n2', 1)):
+            self._expect_request(
+                'GET', self.client.ports_path,
+                'fields=id&limit=100&network_id=%s&'
+                'fixed_ips=ip_address%%3D10.0.0.1&'
+                'fixed_ips=ip_address%%3D10.0.0.2' % network_id,
+                {'ports': [{'id': 'p%d' % i} for i in range(count)]})
+        self.mox.ReplayAll()
+        self.assertEqual(3, self.client.count_ports(
+            max_workers=1, limit=100, network_id=['n2', 'n1', 'n2'],
+            fixed_ips=['ip_address=10.0.0.1', 'ip_address=10.0.0.2']))
+        self.mox.VerifyAll()
+        self.mox.UnsetStubs()
+
 
 class ClientV2UnicodeTestXML(ClientV2TestJson):
     format = 'xml'
@@ -0,0 +1,116 @@
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import sys
+
+from oslo.serialization import jsonutils
+import testtools
+
+from neutronclient.common import exceptions
+from neutronclient.neutron.v2_0 import address
+from neutronclient.tests.unit import test_cli20
+from neutronclient.v2_0 import addresses
+
+PORTS = [
+    {'id': 'p1', 'mac_address': 'fa:16:3e:00:00:01', 'device_id': 'vm1',
+     'network_id': 'net1',
+     'fixed_ips': [{'subnet_id': 'sub1', 'ip_address': '10.0.0.3'}]},
+    {'id': 'p2', 'mac_address': 'fa:16:3e:00:00:02', 'device_id': 'vm2',
+     'network_id': 'net2',
+     'fixed_ips': [{'subnet_id': 'sub2', 'ip_address': '10.0.0.3'},
+                   {'subnet_id': 'sub6', 'ip_address': '2001:db8::3'}]},
+]
+SUBNETS = [
+    {'id': 'sub1', 'cidr': '10.0.0.0/24', 'network_id': 'net1'},
+    {'id': 'sub2', 'cidr': '10.0.0.0/24', 'network_id': 'net2'},
+    {'id': 'big', 'cidr': '10.0.0.0/16', 'network_id': 'net3'},
+    {'id': 'other', 'cidr': '10.1.0.0/24', 'network_id': 'net3'},
+    {'id': 'sub6', 'cidr': '2001:db8::/64', 'network_id': 'net2'},
+]
+
+
+class AddressIndexTest(testtools.TestCase):
+    def setUp(self):
+        super(AddressIndexTest, self).setUp()
+        self.index = addresses.AddressIndex(PORTS, SUBNETS)
+
+    def test_lookup_shared_ip(self):
+        rows = self.index.lookup('10.0.0.3')
+        self.assertEqual([('p1', 'net1', 'sub1', '10.0.0.0/24'),
+                          ('p2', 'net2', 'sub2', '10.0.0.0/24')],
+                         [(r['port_id'], r['network_id'], r['subnet_id'],
+                           r['cidr']) for r in rows])
+
+    def test_lookup_ipv6_normalized(self):
+        rows = self.index.lookup('2001:DB8:0::3')
+        self.assertEqual([('p2', 'sub6')],
+                         [(r['port_id'], r['subnet_id']) for r in rows])
+
+    def test_lookup_ip_without_port(self):
+        self.assertEqual(['sub1', 'sub2', 'big'],
+                         [r['subnet_id']
+                          for r in self.index.lookup('10.0.0.200')])
+        self.assertEqual(['big'], [r['subnet_id']
+                                   for r in self.index.lookup('10.0.9.1')])
+        self.assertEqual(['other'],
+                         [s['id'] for s in
+                          self.index.containing_subnets('10.1.0.1')])
+        self.assertEqual([], self.index.lookup('192.168.0.1'))
+        self.assertEqual([], self.index.lookup('2001:db9::1'))
+
+    def test_lookup_mac(self):
+        rows = self.index.lookup('FA-16-3E-00-00-02')
+        self.assertEqual([('p2', '10.0.0.3'), ('p2', '2001:db8::3')],
+                         [(r['port_id'], r['ip_address']) for r in rows])
+        self.assertEqual([], self.index.lookup('fa:16:3e:00:00:09'))
+
+    def test_lookup_invalid(self):
+        self.assertRaises(ValueError, self.index.lookup, 'not-an-address')
+
+
+class CLITestV20AddressJSON(test_cli20.CLITestV20Base):
+    def test_address_lookup(self):
+        cmd = address.LookupAddress(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self._expect_request(
+            'GET', self.client.ports_path,
+            '&'.join('fields=%s' % f for f in addresses.PORT_FIELDS) +
+            '&tenant_id=t1', {'ports': PORTS[:1]})
+        self._expect_request(
+            'GET', self.client.subnets_path,
+            '&'.join('fields=%s' % f for f in addresses.SUBNET_FIELDS) +
+            '&tenant_id=t1', {'subnets': SUBNETS[:1]})
+        _str = self._run_command(cmd, ['-f', 'json', '-c', 'address',
+                                       '-c', 'port_id', '-c', 'subnet_id',
+                                       '--concurrency', '1',
+                                       '--tenant-id', 't1',
+                                       '10.0.0.3', '10.0.0.4', '10.9.0.1',
+                                       'fa:16:3e:00:00:01'])
+        self.assertEqual(
+            [{'address': '10.0.0.3', 'port_id': 'p1', 'subnet_id': 'sub1'},
+             {'address': '10.0.0.4', 'port_id': '', 'subnet_id': 'sub1'},
+             {'address': '10.9.0.1', 'port_id': '', 'subnet_id': ''},
+             {'address': 'fa:16:3e:00:00:01', 'port_id': 'p1',
+              'subnet_id': 'sub1'}],
+            jsonutils.loads(_str))
+
+    def test_address_lookup_requires_addresses(self):
+        cmd = address.LookupAddress(test_cli20.MyApp(sys.stdout), None)
+        self.assertRaises(exceptions.CommandError, self._run_command, cmd, [])
+
+
+class CLITestV20AddressXML(CLITestV20AddressJSON):
+    format = 'xml'
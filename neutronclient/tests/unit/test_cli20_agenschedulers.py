@@ -45,6 +45,20 @@ class CLITestV20LBaaSAgentScheduler(test_cli20.CLITestV20Base):
         self._test_list_resources(resources, cmd, base_args=[pool_id],
                                   path=path, response_contents=contents)
 
+    def test_list_pools_on_agent_count(self):
+        cmd = agentscheduler.ListPoolsOnLbaasAgent(
+            test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        path = ((self.client.agent_path + self.client.LOADBALANCER_POOLS) %
+                'agent_id1')
+        self._expect_request('GET', path, 'fields=id',
+                             {'pools': [{'id': 'p1'}, {'id': 'p2'}]})
+        _str = self._run_command(cmd, ['-f', 'value', '--count',
+                                       'agent_id1'])
+        self.assertEqual('2', _str.strip())
+
 
 class CLITestV20LBaaSAgentSchedulerXML(CLITestV20LBaaSAgentScheduler):
     format = 'xml'
@@ -12,12 +12,19 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
 import sys
 
+from mox3 import mox
 from oslo.serialization import jsonutils
+import testtools
 
+from neutronclient.common import exceptions
+from neutronclient.common import utils
 from neutronclient.neutron.v2_0 import agent
+from neutronclient import shell
 from neutronclient.tests.unit import test_cli20
+from neutronclient.v2_0 import agents
 
 
 class CLITestV20Agent(test_cli20.CLITestV20Base):
@@ -79,3 +86,266 @@ class CLITestV20Agent(test_cli20.CLITestV20Base):
         myid = 'myid'
         args = [myid]
         self._test_delete_resource(resource, cmd, myid, args)
+
+    def _mock_agent_load(self):
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        fields = '&'.join('fields=%s' % f for f in agents.AGENT_FIELDS)
+        self._expect_request('GET', self.client.agents_path, fields, {
+            'agents': [
+                {'id': 'dhcp1', 'agent_type': agents.DHCP_AGENT,
+                 'host': 'net1', 'alive': True},
+                {'id': 'l31', 'agent_type': agents.L3_AGENT,
+                 'host': 'net1', 'alive': False},
+                {'id': 'ovs1', 'agent_type': 'Open vSwitch agent',
+                 'host': 'cmp1', 'alive': True}]})
+        self._expect_request(
+            'GET', (self.client.agent_path + self.client.DHCP_NETS) % 'dhcp1',
+            'fields=id', {'networks': [{'id': 'n1'}, {'id': 'n2'}]})
+        self._expect_request(
+            'GET', (self.client.agent_path + self.client.L3_ROUTERS) % 'l31',
+            'fields=id', {'routers': [{'id': 'r1'}]})
+
+    def test_list_agent_load(self):
+        cmd = agent.ListAgentLoad(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self._mock_agent_load()
+        _str = self._run_command(cmd, ['-f', 'json', '--concurrency', '1'])
+        returned = dict((a['id'], a) for a in jsonutils.loads(_str))
+        self.assertEqual(2, returned['dhcp1']['networks'])
+        self.assertEqual('', returned['dhcp1']['routers'])
+        self.assertEqual(1, returned['l31']['routers'])
+        self.assertEqual('xxx', returned['l31']['alive'])
+        self.assertEqual('', returned['ovs1']['networks'])
+
+    def test_list_agent_load_by_host(self):
+        cmd = agent.ListAgentLoad(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self._mock_agent_load()
+        _str = self._run_command(cmd, ['-f', 'json', '--concurrency', '1',
+                                       '--by-host'])
+        returned = dict((h['host'], h) for h in jsonutils.loads(_str))
+        self.assertEqual({'host': 'net1', 'agents': 2, 'alive': 1,
+                          'heartbeat_age': '', 'networks': 2,
+                          'routers': 1, 'pools': 0}, returned['net1'])
+        self.assertEqual(1, returned['cmp1']['agents'])
+
+    def _test_agent_maintenance(self, cmd, admin_state_up, args,
+                                wait=None):
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        fields = '&'.join('fields=%s' % f for f in agents.AGENT_FIELDS)
+        self._expect_request('GET', self.client.agents_path,
+                             'host=net1&' + fields, {
+                                 'agents': [
+                                     {'id': 'ag1', 'host': 'net1',
+                                      'agent_type': agents.L3_AGENT,
+                                      'binary': 'neutron-l3-agent',
+                                      'admin_state_up': not admin_state_up},
+                                     {'id': 'ag2', 'host': 'net1',
+                                      'agent_type': agents.DHCP_AGENT,
+                                      'binary': 'neutron-dhcp-agent',
+                                      'admin_state_up': admin_state_up}]})
+        self._expect_request(
+            'PUT', self.client.agent_path % 'ag1',
+            body={'agent': {'admin_state_up': admin_state_up}},
+            status_code=204)
+        if wait:
+            self._expect_request(
+                'GET', self.client.agents_path,
+                'host=net1&fields=id&fields=%s' % wait, {
+                    'agents': [{'id': 'ag1', wait: admin_state_up},
+                               {'id': 'ag2', wait: admin_state_up}]})
+        _str = self._run_command(cmd, ['-f', 'json', '--concurrency', '1'] +
+                                 args)
+        returned = jsonutils.loads(_str)
+        self.assertEqual(['ag1', 'ag2'], [a['id'] for a in returned])
+        self.assertEqual([admin_state_up] * 2,
+                         [a['admin_state_up'] for a in returned])
+
+    def test_start_agent_maintenance(self):
+        cmd = agent.StartAgentMaintenance(test_cli20.MyApp(sys.stdout), None)
+        self._test_agent_maintenance(cmd, False, ['--host', 'net1'])
+
+    def test_start_agent_maintenance_wait(self):
+        cmd = agent.StartAgentMaintenance(test_cli20.MyApp(sys.stdout), None)
+        self._test_agent_maintenance(cmd, False,
+                                     ['--host', 'net1', '--wait'],
+                                     wait='admin_state_up')
+
+    def test_stop_agent_maintenance_wait(self):
+        cmd = agent.StopAgentMaintenance(test_cli20.MyApp(sys.stdout), None)
+        self._test_agent_maintenance(cmd, True, ['--host', 'net1', '--wait'],
+                                     wait='alive')
+
+    def test_agent_maintenance_requires_selector(self):
+        cmd = agent.StartAgentMaintenance(test_cli20.MyApp(sys.stdout), None)
+        parser = cmd.get_parser('agent-maintenance-start')
+        self.assertRaises(exceptions.CommandError, shell.run_command,
+                          cmd, parser, [])
+
+    def test_monitor_agents_nagios(self):
+        cmd = agent.MonitorAgents(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        fields = '&'.join('fields=%s' % f for f in agents.MONITOR_FIELDS)
+        self._expect_request('GET', self.client.agents_path, fields, {
+            'agents': [{'id': 'ag1', 'host': 'net1', 'alive': True,
+                        'agent_type': agents.L3_AGENT},
+                       {'id': 'ag2', 'host': 'net2', 'alive': False,
+                        'agent_type': agents.DHCP_AGENT}]})
+        self.mox.ReplayAll()
+        parser = cmd.get_parser('agent-monitor')
+        code = shell.run_command(cmd, parser, ['--nagios'])
+        self.mox.VerifyAll()
+        self.mox.UnsetStubs()
+        self.assertEqual(agents.NAGIOS_CRITICAL, code)
+        self.assertIn('AGENTS CRITICAL - down: net2/DHCP agent',
+                      self.fake_stdout.make_string())
+
+    def test_monitor_agents_nagios_unknown(self):
+        cmd = agent.MonitorAgents(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        fields = '&'.join('fields=%s' % f for f in agents.MONITOR_FIELDS)
+        self.client.format = self.format
+        self.client.httpclient.request(
+            test_cli20.MyUrlComparator(
+                test_cli20.end_url(self.client.agents_path, fields,
+                                   format=self.format), self.client),
+            'GET', body=None,
+            headers=mox.ContainsKeyValue('X-Auth-Token', test_cli20.TOKEN)
+        ).AndRaise(exceptions.ConnectionFailed(reason='timed out'))
+        self.mox.ReplayAll()
+        parser = cmd.get_parser('agent-monitor')
+        code = shell.run_command(cmd, parser, ['--nagios'])
+        self.mox.VerifyAll()
+        self.mox.UnsetStubs()
+        self.assertEqual(agents.NAGIOS_UNKNOWN, code)
+        status = self.fake_stdout.make_string()
+        self.assertTrue(status.startswith('AGENTS UNKNOWN - '))
+        self.assertIn('timed out', status)
+
+    def test_monitor_agents_events(self):
+        cmd = agent.MonitorAgents(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        fields = '&'.join('fields=%s' % f for f in agents.MONITOR_FIELDS)
+        for alive in (True, False):
+            self._expect_request('GET', self.client.agents_path,
+                                 'host=net1&' + fields, {
+                                     'agents': [{'id': 'ag1', 'host': 'net1',
+                                                 'alive': alive}]})
+        _str = self._run_command(cmd, ['--count', '2', '--interval', '0',
+                                       '--', '--host', 'net1'])
+        events = [jsonutils.loads(line) for line in _str.splitlines()]
+        self.assertEqual(1, len(events))
+        self.assertEqual('down', events[0]['event'])
+        self.assertEqual('ag1', events[0]['id'])
+
+
+class AgentsLibraryTest(testtools.TestCase):
+
+    def test_heartbeat_age(self):
+        now = datetime.datetime(2014, 1, 1, 12, 0, 30)
+        self.assertEqual(30, agents.heartbeat_age(
+            {'heartbeat_timestamp': '2014-01-01 12:00:00'}, now))
+        self.assertIsNone(agents.heartbeat_age({}, now))
+        self.assertIsNone(agents.heartbeat_age(
+            {'heartbeat_timestamp': None}, now))
+
+    def test_agent_monitor_changes_only(self):
+        monitor = agents.AgentMonitor(None, lag_warning=20)
+        now = datetime.datetime(2014, 1, 1, 12, 0, 30)
+        recent = '2014-01-01 12:00:25'
+        self.assertEqual([], monitor.update(
+            [{'id': 'a', 'alive': True, 'heartbeat_timestamp': recent},
+             {'id': 'b', 'alive': True, 'heartbeat_timestamp': recent}],
+            now))
+        self.assertEqual([], monitor.update(
+            [{'id': 'a', 'alive': True, 'heartbeat_timestamp': recent},
+             {'id': 'b', 'alive': True, 'heartbeat_timestamp': recent}],
+            now))
+        events = monitor.update(
+            [{'id': 'a', 'alive': True,
+              'heartbeat_timestamp': '2014-01-01 12:00:00'},
+             {'id': 'c', 'alive': True, 'heartbeat_timestamp': recent}],
+            now)
+        self.assertEqual([('lagging', 'a', 30), ('added', 'c', 5),
+                          ('removed', 'b', 5)],
+                         [(e['event'], e['id'], e['heartbeat_lag'])
+                          for e in events])
+
+    def test_agent_monitor_flapping(self):
+        monitor = agents.AgentMonitor(None, flap_window=4, flap_threshold=3)
+        events = []
+        for alive in (True, False, True, False, False, False, False):
+            events.extend(e['event'] for e in
+                          monitor.update([{'id': 'a', 'alive': alive}]))
+        self.assertEqual(['down', 'ok', 'down', 'flapping', 'stable'],
+                         events)
+
+    def test_nagios_check(self):
+        now = datetime.datetime(2014, 1, 1, 12, 1, 0)
+        data = [{'id': 'a', 'host': 'h1', 'agent_type': 'L3 agent',
+                 'alive': True, 'heartbeat_timestamp': '2014-01-01 12:00:50'},
+                {'id': 'b', 'host': 'h2', 'agent_type': 'DHCP agent',
+                 'alive': True, 'heartbeat_timestamp': '2014-01-01 12:00:20'}]
+        self.assertEqual(agents.NAGIOS_OK,
+                         agents.nagios_check(data, now=now)[0])
+        code, status = agents.nagios_check(data, 30, 60, now)
+        self.assertEqual(agents.NAGIOS_WARNING, code)
+        self.assertEqual('AGENTS WARNING - lagging: h2/DHCP agent | '
+                         'agents=2 down=0 max_lag=40s', status)
+        self.assertEqual(agents.NAGIOS_CRITICAL,
+                         agents.nagios_check(data, 10, 30, now)[0])
+
+    def test_wait_for_agents_admin_state(self):
+        agents.wait_for_agents_admin_state(FakeLoadClient(2), True,
+                                           timeout=0)
+        self.assertRaises(exceptions.WaitTimeout,
+                          agents.wait_for_agents_admin_state,
+                          FakeLoadClient(2), False, timeout=0)
+
+    def test_wait_for_agents_drained(self):
+        agents.wait_for_agents_drained(FakeLoadClient(1), timeout=0)
+        self.assertRaises(exceptions.WaitTimeout,
+                          agents.wait_for_agents_drained,
+                          FakeLoadClient(2), timeout=0)
+
+    def test_wait_for_agents_alive_timeout(self):
+        self.assertRaises(exceptions.WaitTimeout,
+                          agents.wait_for_agents_alive,
+                          FakeLoadClient(2), timeout=0)
+
+    def test_get_agent_load_concurrent(self):
+        neutron = FakeLoadClient(20)
+        load = agents.get_agent_load(neutron, max_workers=8)
+        self.assertEqual(list(range(20)), [a['pools'] for a in load])
+        self.assertEqual(set('lb%d' % i for i in range(20)),
+                         set(neutron.queried))
+
+
+class FakeLoadClient(object):
+
+    def __init__(self, count):
+        self.count = count
+        self.queried = []
+
+    def list_agents(self, **_params):
+        return {'agents': [{'id': 'lb%d' % i,
+                            'agent_type': agents.LOADBALANCER_AGENT,
+                            'admin_state_up': True}
+                           for i in range(self.count)]}
+
+    def list_pools_on_lbaas_agent(self, lbaas_agent, **_params):
+        self.queried.append(lbaas_agent)
+        return {'pools': [{'id': 'pool'}] * int(lbaas_agent[2:])}
+
+    def concurrent_map(self, func, items, max_workers=None):
+        return utils.concurrent_map(func, items, max_workers)
@@ -0,0 +1,156 @@
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import sys
+
+from oslo.serialization import jsonutils
+import testtools
+
+from neutronclient.common import exceptions
+from neutronclient.neutron.v2_0 import audit as audit_cmd
+from neutronclient.tests.unit import test_cli20
+from neutronclient.v2_0 import audit
+
+RESOURCES = {
+    'routers': [{'id': 'r1', 'name': 'used'}, {'id': 'r2', 'name': 'idle'}],
+    'ports': [
+        {'id': 'p1', 'device_id': 'r1',
+         'device_owner': 'network:router_interface', 'security_groups': []},
+        {'id': 'p2', 'device_id': 'r9',
+         'device_owner': 'network:router_interface', 'security_groups': []},
+        {'id': 'p3', 'device_id': 'r2',
+         'device_owner': 'network:router_gateway', 'security_groups': []},
+        {'id': 'p4', 'device_id': 'vm1', 'device_owner': 'compute:nova',
+         'security_groups': ['sg1']},
+        {'id': 'p5', 'device_id': 'vm9', 'device_owner': 'compute:nova',
+         'security_groups': ['sg1']},
+        {'id': 'p6', 'device_id': 'fip9',
+         'device_owner': 'network:floatingip', 'security_groups': []},
+        {'id': 'p7', 'device_id': '', 'device_owner': '',
+         'security_groups': []},
+    ],
+    'floatingips': [{'id': 'fip1', 'port_id': 'p4',
+                     'floating_ip_address': '172.24.4.3'},
+                    {'id': 'fip2', 'port_id': None,
+                     'floating_ip_address': '172.24.4.4'}],
+    'security_groups': [{'id': 'sg0', 'name': 'default'},
+                        {'id': 'sg1', 'name': 'web'},
+                        {'id': 'sg2', 'name': 'stale'},
+                        {'id': 'sg3', 'name': 'remote'}],
+    'security_group_rules': [{'id': 'rule1', 'security_group_id': 'sg1',
+                              'remote_group_id': 'sg3'},
+                             {'id': 'rule2', 'security_group_id': 'sg2',
+                              'remote_group_id': 'sg2'}],
+    'pools': [{'id': 'pool1', 'name': 'full', 'members': ['m1']},
+              {'id': 'pool2', 'name': 'empty', 'members': []}],
+}
+
+
+class FindOrphansTest(testtools.TestCase):
+    def _found(self, **kwargs):
+        return [(row['kind'], row['id'])
+                for row in audit.find_orphans(RESOURCES, **kwargs)]
+
+    def test_find_orphans(self):
+        self.assertEqual(
+            [('dead_device_port', 'p2'), ('dead_device_port', 'p6'),
+             ('pool_without_members', 'pool2'),
+             ('router_without_interfaces', 'r2'),
+             ('unassociated_floatingip', 'fip2'),
+             ('unused_security_group', 'sg2')],
+            self._found())
+
+    def test_find_dead_compute_ports(self):
+        self.assertEqual(
+            [('dead_device_port', 'p2'), ('dead_device_port', 'p5'),
+             ('dead_device_port', 'p6')],
+            self._found(kinds=['dead_device_port'], live_devices=['vm1']))
+
+    def test_missing_collection(self):
+        self.assertEqual([], audit.find_orphans({'pools': None}))
+
+    def test_count_orphans(self):
+        rows = audit.find_orphans(RESOURCES, kinds=['dead_device_port'])
+        self.assertEqual([{'kind': 'dead_device_port', 'count': 2}],
+                         audit.count_orphans(rows, ['dead_device_port']))
+        self.assertEqual(len(audit.KINDS), len(audit.count_orphans(rows)))
+
+    def test_many_resources(self):
+        ports = [{'id': 'p%d' % i, 'device_id': 'r%d' % (i % 50000),
+                  'device_owner': 'network:router_interface',
+                  'security_groups': ['sg%d' % (i % 1000)]}
+                 for i in range(100000)]
+        resources = {
+            'ports': ports,
+            'routers': [{'id': 'r%d' % i} for i in range(1, 50001)],
+            'security_groups': [{'id': 'sg%d' % i} for i in range(1001)],
+        }
+        rows = audit.find_orphans(resources, kinds=[
+            'dead_device_port', 'unused_security_group',
+            'router_without_interfaces'])
+        self.assertEqual(
+            [('dead_device_port', 'p0'), ('dead_device_port', 'p50000'),
+             ('router_without_interfaces', 'r50000'),
+             ('unused_security_group', 'sg1000')],
+            [(row['kind'], row['id']) for row in rows])
+
+
+class CLITestV20AuditJSON(test_cli20.CLITestV20Base):
+    def _expect_list(self, collection, items, **kwargs):
+        self._expect_request(
+            'GET', getattr(self.client, '%s_path' % collection),
+            '&'.join('fields=%s' % f for f in audit.FIELDS[collection]),
+            {collection: items}, **kwargs)
+
+    def _setup_command(self):
+        cmd = audit_cmd.AuditOrphans(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        return cmd
+
+    def test_audit_orphans(self):
+        cmd = self._setup_command()
+        self._expect_list('pools', RESOURCES['pools'])
+        self._expect_list('floatingips', RESOURCES['floatingips'])
+        _str = self._run_command(cmd, ['-f', 'json', '--concurrency', '1',
+                                       '--kind', 'unassociated_floatingip',
+                                       '--kind', 'pool_without_members'])
+        self.assertEqual(
+            [{'kind': 'pool_without_members', 'type': 'pool', 'id': 'pool2',
+              'name': 'empty', 'tenant_id': ''},
+             {'kind': 'unassociated_floatingip', 'type': 'floatingip',
+              'id': 'fip2', 'name': '172.24.4.4', 'tenant_id': ''}],
+            jsonutils.loads(_str))
+
+    def test_audit_orphans_summary_and_delete(self):
+        cmd = self._setup_command()
+        self._expect_list('floatingips', RESOURCES['floatingips'])
+        self._expect_request('DELETE', self.client.floatingip_path % 'fip2',
+                             status_code=204)
+        _str = self._run_command(cmd, ['-f', 'json', '--concurrency', '1',
+                                       '--kind', 'unassociated_floatingip',
+                                       '--summary', '--delete'])
+        self.assertEqual([{'kind': 'unassociated_floatingip', 'count': 1}],
+                         jsonutils.loads(_str))
+
+    def test_audit_orphans_delete_from_snapshot(self):
+        cmd = audit_cmd.AuditOrphans(test_cli20.MyApp(sys.stdout), None)
+        self.assertRaises(exceptions.CommandError, self._run_command, cmd,
+                          ['--delete', '--from-snapshot', 'inventory.db'])
+
+
+class CLITestV20AuditXML(CLITestV20AuditJSON):
+    format = 'xml'
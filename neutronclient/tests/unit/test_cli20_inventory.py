@@ -0,0 +1,269 @@
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import sys
+import time
+
+import fixtures
+from oslo.serialization import jsonutils
+import testtools
+
+from neutronclient.common import exceptions
+from neutronclient.neutron.v2_0 import inventory as inventory_cmd
+from neutronclient.neutron.v2_0 import port
+from neutronclient.tests.unit import test_cli20
+from neutronclient.v2_0 import diff
+from neutronclient.v2_0 import inventory
+
+NETWORKS = [{'id': 'net1', 'name': 'private', 'tenant_id': 't1',
+             'admin_state_up': True, 'subnets': ['sub1']},
+            {'id': 'net2', 'name': 'public', 'tenant_id': 't2',
+             'admin_state_up': False, 'subnets': []}]
+PORTS = [{'id': 'p1', 'name': 'web', 'network_id': 'net1',
+          'mac_address': 'fa:16:3e:00:00:01', 'device_owner': 'compute:nova',
+          'fixed_ips': [{'subnet_id': 'sub1', 'ip_address': '10.0.0.3'}]},
+         {'id': 'p2', 'name': 'db', 'network_id': 'net1',
+          'mac_address': 'fa:16:3e:00:00:02', 'device_owner': 'compute:nova',
+          'fixed_ips': [{'subnet_id': 'sub1', 'ip_address': '10.0.0.4'}]},
+         {'id': 'p3', 'name': '', 'network_id': 'net2',
+          'mac_address': 'fa:16:3e:00:00:03',
+          'device_owner': 'network:dhcp', 'fixed_ips': []}]
+
+REGION_NETWORKS = [{'id': 'other1', 'name': 'private', 'tenant_id': 't1',
+                    'admin_state_up': False, 'subnets': ['other-sub1']},
+                   {'id': 'other3', 'name': 'backup', 'tenant_id': 't1',
+                    'admin_state_up': True, 'subnets': []}]
+
+
+def _rule(rule_id, port):
+    return {'id': rule_id, 'direction': 'ingress', 'protocol': 'tcp',
+            'port_range_min': port, 'port_range_max': port}
+
+
+class DiffTest(testtools.TestCase):
+    def test_diff_networks(self):
+        rows = diff.diff_collection('networks', NETWORKS, REGION_NETWORKS,
+                                    ignored=['id', 'subnets'])
+        self.assertEqual(
+            [('backup/t1', 'added', 'id', None, 'other3'),
+             ('private/t1', 'changed', 'admin_state_up', True, False),
+             ('public/t2', 'removed', 'id', 'net2', None)],
+            [(r['key'], r['change'], r['field'], r['left'], r['right'])
+             for r in rows])
+
+    def test_diff_nested_resources(self):
+        left = [{'id': 'sg1', 'name': 'web', 'tenant_id': 't1',
+                 'security_group_rules': [_rule('r1', 80), _rule('r2', 443)]}]
+        right = [{'id': 'sg9', 'name': 'web', 'tenant_id': 't1',
+                  'security_group_rules': [_rule('r8', 443),
+                                           _rule('r9', 80)]}]
+        self.assertEqual([], diff.diff_collection('security_groups', left,
+                                                  right))
+        right[0]['security_group_rules'].pop()
+        rows = diff.diff_collection('security_groups', left, right)
+        self.assertEqual([('web/t1', 'security_group_rules')],
+                         [(r['key'], r['field']) for r in rows])
+
+    def test_diff_duplicate_keys(self):
+        left = [{'id': 'a', 'name': 'n', 'mtu': 1500},
+                {'id': 'b', 'name': 'n', 'mtu': 9000},
+                {'id': 'c', 'name': 'n', 'mtu': 1400}]
+        right = [{'id': 'x', 'name': 'n', 'mtu': 9000},
+                 {'id': 'y', 'name': 'n', 'mtu': 1500}]
+        rows = diff.diff_collection('networks', left, right,
+                                    key_fields=['name'])
+        self.assertEqual([('removed', 'c')],
+                         [(r['change'], r['left']) for r in rows])
+
+    def test_diff_references_between_regions(self):
+        def _side(prefix, gateway_subnet):
+            return {
+                'networks': [{'id': prefix + 'net', 'name': 'private',
+                              'tenant_id': 't1',
+                              'subnets': [prefix + 'sub']}],
+                'subnets': [{'id': prefix + 'sub', 'cidr': '10.0.0.0/24',
+                             'tenant_id': 't1',
+                             'network_id': prefix + 'net'}],
+                'security_groups': [{
+                    'id': prefix + 'sg', 'name': 'web', 'tenant_id': 't1',
+                    'security_group_rules': [
+                        {'id': prefix + 'r', 'remote_group_id': prefix + 'sg',
+                         'security_group_id': prefix + 'sg'}]}],
+                'routers': [{'id': prefix + 'rt', 'name': 'gw',
+                             'tenant_id': 't1',
+                             'external_gateway_info': {
+                                 'network_id': prefix + 'net',
+                                 'external_fixed_ips': [
+                                     {'subnet_id': gateway_subnet}]}}]}
+
+        left = diff.resolve_references(_side('a-', 'a-sub'))
+        right = diff.resolve_references(_side('b-', 'b-sub'))
+        self.assertEqual(['10.0.0.0/24/t1'], left['networks'][0]['subnets'])
+        for collection in left:
+            self.assertEqual([], diff.diff_collection(
+                collection, left[collection], right[collection]))
+        right = diff.resolve_references(_side('b-', 'unknown'))
+        self.assertEqual(
+            [('gw/t1', 'external_gateway_info')],
+            [(r['key'], r['field']) for r in diff.diff_collection(
+                'routers', left['routers'], right['routers'])])
+
+    def test_parse_key(self):
+        self.assertEqual(('subnets', ['cidr', 'tenant_id']),
+                         diff.parse_key('subnets=cidr,tenant_id'))
+        self.assertRaises(ValueError, diff.parse_key, 'subnets')
+        self.assertRaises(ValueError, diff.parse_key, '=cidr')
+
+
+class CLITestV20InventoryJSON(test_cli20.CLITestV20Base):
+    def setUp(self):
+        super(CLITestV20InventoryJSON, self).setUp()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'inventory.db')
+
+    def _stub_client(self, cmd):
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+
+    def test_inventory_snapshot(self):
+        cmd = inventory_cmd.CreateInventorySnapshot(
+            test_cli20.MyApp(sys.stdout), None)
+        self._stub_client(cmd)
+        self._expect_request('GET', self.client.networks_path,
+                             response={'networks': NETWORKS})
+        self._expect_request('GET', self.client.ports_path,
+                             response={'ports': PORTS})
+        _str = self._run_command(cmd, ['-f', 'json', '--concurrency', '1',
+                                       '--collection', 'networks',
+                                       '--collection', 'ports', self.path])
+        self.assertEqual([{'collection': 'networks', 'count': 2},
+                          {'collection': 'ports', 'count': 3}],
+                         jsonutils.loads(_str))
+        snapshot = inventory.Snapshot(self.path)
+        self.addCleanup(snapshot.close)
+        self.assertEqual(['networks', 'ports'], snapshot.collections)
+
+    def _write_snapshot(self, taken_at=None):
+        inventory.write_snapshot(self.path, {'networks': NETWORKS,
+                                             'ports': PORTS}, taken_at)
+
+    def test_list_ports_from_snapshot(self):
+        self._write_snapshot()
+        cmd = port.ListPort(test_cli20.MyApp(sys.stdout), None)
+        # no request is expected
+        self._stub_client(cmd)
+        _str = self._run_command(cmd, ['-f', 'json', '--from-snapshot',
+                                       self.path, '-F', 'id', '-F', 'name',
+                                       '--', '--network_id', 'net1'])
+        self.assertEqual([{'id': 'p1', 'name': 'web'},
+                          {'id': 'p2', 'name': 'db'}],
+                         jsonutils.loads(_str))
+
+    def test_show_port_from_snapshot(self):
+        self._write_snapshot()
+        cmd = port.ShowPort(test_cli20.MyApp(sys.stdout), None)
+        self._stub_client(cmd)
+        _str = self._run_command(cmd, ['-f', 'json', '--from-snapshot',
+                                       self.path, 'p2'])
+        shown = jsonutils.loads(_str)
+        self.assertEqual('db', shown['name'])
+        self.assertEqual('fa:16:3e:00:00:02', shown['mac_address'])
+
+    def test_list_ports_from_stale_snapshot(self):
+        self._write_snapshot(time.time() - 3600)
+        cmd = port.ListPort(test_cli20.MyApp(sys.stdout), None)
+        self._stub_client(cmd)
+        self.assertRaises(exceptions.SnapshotTooOld, self._run_command, cmd,
+                          ['--from-snapshot', self.path, '--max-age', '60'])
+
+    def test_snapshot_filters(self):
+        self._write_snapshot()
+        snapshot = inventory.Snapshot(self.path)
+        self.addCleanup(snapshot.close)
+        self.assertEqual(
+            ['p1', 'p2'],
+            [p['id'] for p in snapshot.list('ports', network_id='net1',
+                                            device_owner='compute:nova')])
+        self.assertEqual(
+            [{'id': 'p3'}],
+            snapshot.list('ports', device_owner=['network:dhcp'],
+                          fields='id'))
+        self.assertEqual(
+            [{'name': 'public', 'subnets': []}],
+            snapshot.list('networks', admin_state_up='false',
+                          fields=['name', 'subnets']))
+        self.assertEqual([{}, {}],
+                         snapshot.list('networks', fields=['cidr']))
+        self.assertEqual(NETWORKS[0], snapshot.show('networks', 'net1'))
+        self.assertRaises(exceptions.NotFound,
+                          snapshot.show, 'networks', 'net3')
+
+    def test_client_falls_back_to_server(self):
+        self._write_snapshot()
+        self.client.use_snapshot(self.path)
+        self.addCleanup(self.client.use_snapshot, None)
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        self._expect_request('GET', self.client.routers_path,
+                             response={'routers': []})
+        self.mox.ReplayAll()
+        self.assertEqual({'routers': []}, self.client.list_routers())
+        self.assertEqual(
+            [{'id': 'net2'}],
+            self.client.list_networks(name='public', fields='id')['networks'])
+        self.assertEqual('net1',
+                         self.client.show_network('net1')['network']['id'])
+        self.mox.VerifyAll()
+        self.mox.UnsetStubs()
+
+    def test_invalid_snapshot(self):
+        with open(self.path, 'w') as f:
+            f.write('not a database' * 100)
+        self.assertRaises(exceptions.InvalidSnapshot,
+                          inventory.Snapshot, self.path)
+        self.assertRaises(exceptions.InvalidSnapshot,
+                          inventory.Snapshot, self.path + '.missing')
+
+    def test_inventory_diff(self):
+        self._write_snapshot()
+        cmd = inventory_cmd.DiffInventory(test_cli20.MyApp(sys.stdout), None)
+        self._stub_client(cmd)
+        self._expect_request('GET', self.client.networks_path,
+                             response={'networks': REGION_NETWORKS})
+        # listed to compare the subnets of networks by CIDR
+        self._expect_request('GET', self.client.subnets_path,
+                             response={'subnets': []})
+        _str = self._run_command(cmd, ['-f', 'json', '--concurrency', '1',
+                                       '--collection', 'networks',
+                                       '--key', 'networks=name',
+                                       '--ignore', 'subnets',
+                                       '-c', 'key', '-c', 'change',
+                                       '-c', 'field', self.path, 'live'])
+        self.assertEqual([{'key': 'backup', 'change': 'added',
+                           'field': 'id'},
+                          {'key': 'private', 'change': 'changed',
+                           'field': 'admin_state_up'},
+                          {'key': 'public', 'change': 'removed',
+                           'field': 'id'}],
+                         jsonutils.loads(_str))
+
+    def test_inventory_diff_invalid_key(self):
+        cmd = inventory_cmd.DiffInventory(test_cli20.MyApp(sys.stdout), None)
+        self.assertRaises(exceptions.CommandError, self._run_command, cmd,
+                          ['--key', 'networks', self.path, 'live'])
+
+
+class CLITestV20InventoryXML(CLITestV20InventoryJSON):
+    format = 'xml'
@@ -426,6 +426,35 @@ class CLITestV20NetworkJSON(test_cli20.CLITestV20Base):
                                       fields_1=['a', 'b'],
                                       fields_2=['c', 'd'])
 
+    def test_list_external_nets_count(self):
+        """List external nets: --count."""
+        cmd = network.ListExternalNetwork(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self._expect_request(
+            'GET', self.client.networks_path,
+            'fields=id&limit=%d&router%%3Aexternal=True' %
+            self.client.COUNT_PAGE_SIZE,
+            {'networks': [{'id': 'ext1'}, {'id': 'ext2'}]})
+        _str = self._run_command(cmd, ['-f', 'value', '--count'])
+        self.assertEqual('2', _str.strip())
+
+    def test_list_external_nets_group_by(self):
+        """List external nets: --group-by status."""
+        cmd = network.ListExternalNetwork(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self._expect_request(
+            'GET', self.client.networks_path,
+            'fields=status&router%3Aexternal=True',
+            {'networks': [{'status': 'ACTIVE'}, {'status': 'ACTIVE'},
+                          {'status': 'DOWN'}]})
+        _str = self._run_command(cmd, ['-f', 'csv', '--group-by', 'status'])
+        self.assertEqual(['"status","count"', '"ACTIVE",2', '"DOWN",1'],
+                         _str.split())
+
     def test_update_network_exception(self):
         """Update net: myid."""
         resource = 'network'
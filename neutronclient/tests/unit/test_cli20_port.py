@@ -17,11 +17,168 @@
 import itertools
 import sys
 
+import fixtures
 from mox3 import mox
+from oslo.serialization import jsonutils
+import testtools
 
+from neutronclient.common import exceptions
 from neutronclient.neutron.v2_0 import port
 from neutronclient import shell
 from neutronclient.tests.unit import test_cli20
+from neutronclient.v2_0 import aggregate
+from neutronclient.v2_0 import sorting
+from neutronclient.v2_0 import where
+
+GROUPED_PORTS = [
+    {'id': 'p1', 'device_owner': 'compute:nova', 'device_id': 'vm1',
+     'fixed_ips': [{'subnet_id': 's1'}], 'created_at': '2014-03-01'},
+    {'id': 'p2', 'device_owner': 'compute:nova', 'device_id': 'vm1',
+     'fixed_ips': [{'subnet_id': 's1'}, {'subnet_id': 's2'}],
+     'created_at': '2014-01-01'},
+    {'id': 'p3', 'device_owner': 'network:dhcp', 'device_id': 'dhcp1',
+     'fixed_ips': [{'subnet_id': 's2'}], 'created_at': '2014-02-01'},
+    {'id': 'p4', 'device_owner': None, 'device_id': None, 'fixed_ips': []},
+]
+
+
+WHERE_PORTS = [
+    {'id': 'p1', 'name': 'web-1', 'admin_state_up': True, 'mtu': 1500,
+     'tenant_id': 't1', 'created_at': '2014-03-01T10:00:00',
+     'fixed_ips': [{'ip_address': '10.0.0.3'}, {'ip_address': 'fd00::3'}]},
+    {'id': 'p2', 'name': 'db-1', 'admin_state_up': False, 'mtu': 9000,
+     'tenant_id': 't2', 'created_at': '2014-01-01T10:00:00',
+     'fixed_ips': [{'ip_address': '10.1.0.3'}]},
+    {'id': 'p3', 'name': 'web 2', 'admin_state_up': True,
+     'tenant_id': 't3', 'fixed_ips': []},
+]
+
+
+class WhereTest(testtools.TestCase):
+    def _ids(self, text):
+        return [port['id']
+                for port in where.Expression(text).filter(WHERE_PORTS)]
+
+    def test_operators(self):
+        self.assertEqual(['p1'], self._ids('name = web-1'))
+        self.assertEqual(['p3'], self._ids("name = 'web 2'"))
+        self.assertEqual(['p2', 'p3'], self._ids('name != web-1'))
+        self.assertEqual(['p1', 'p3'], self._ids('name ~ ^web'))
+        self.assertEqual(['p2'], self._ids('name !~ "^web"'))
+        self.assertEqual(['p2'], self._ids('admin_state_up = false'))
+        self.assertEqual(['p2'], self._ids('mtu > 1500'))
+        self.assertEqual(['p1', 'p2'], self._ids('mtu <= 9000'))
+        self.assertEqual(['p2'], self._ids('created_at < 2014-02'))
+        self.assertEqual(['p1', 'p3'], self._ids('tenant_id in (t1, t3)'))
+        self.assertEqual(['p1'],
+                         self._ids('fixed_ips.ip_address within 10.0.0.0/24'))
+        self.assertEqual(['p1'],
+                         self._ids('fixed_ips.ip_address within fd00::/8'))
+        self.assertEqual(['p1', 'p2'],
+                         self._ids('fixed_ips.ip_address within 10.0.0.0/8'))
+
+    def test_boolean_operators(self):
+        self.assertEqual(['p1', 'p2'],
+                         self._ids('name ~ web and mtu = 1500 or '
+                                   'tenant_id = t2'))
+        self.assertEqual(['p1'],
+                         self._ids('name ~ web and (mtu = 1500 or '
+                                   'tenant_id = t2)'))
+        self.assertEqual(['p3'],
+                         self._ids('NOT (name = web-1 OR mtu = 9000)'))
+
+    def test_server_filters_and_fields(self):
+        expression = where.Expression(
+            "tenant_id in (t1, t2) and name = 'web-1' and "
+            "fixed_ips.ip_address within 10.0.0.0/8 and "
+            "(mtu = 1500 or tenant_id = t3) and not id = p2")
+        self.assertEqual({'tenant_id': ['t1', 't2'], 'name': ['web-1']},
+                         expression.server_filters)
+        self.assertEqual(['tenant_id', 'name', 'fixed_ips', 'mtu', 'id'],
+                         expression.fields)
+        self.assertEqual({}, where.Expression('name = a or mtu = 1')
+                         .server_filters)
+
+    def test_invalid_expressions(self):
+        for text in ('name', 'name =', 'name = a and', '(name = a',
+                     'name = a)', 'name ! a', 'name in a', 'name foo a',
+                     'name ~ (', "name ~ '('", 'ip within nothing',
+                     'and = a'):
+            self.assertRaises(ValueError, where.Expression, text)
+
+
+SORTED_PORTS = [
+    {'id': 'p%d' % i, 'mac_address': 'fa:16:3e:00:00:%02x' % (i % 3),
+     'status': status, 'fixed_ips': [{'ip_address': '10.0.0.%d' % i}]}
+    for i, status in enumerate(['ACTIVE', 'DOWN', None, 'ACTIVE', 'DOWN',
+                                'ACTIVE', None])
+]
+
+
+class SortItemsTest(testtools.TestCase):
+    def _ids(self, keys, dirs=(), chunk_size=None):
+        return [port['id'] for port in sorting.sort_items(
+            iter(SORTED_PORTS), keys, dirs, chunk_size)]
+
+    def test_sort_in_memory(self):
+        self.assertEqual(['p0', 'p3', 'p6', 'p1', 'p4', 'p2', 'p5'],
+                         self._ids(['mac_address']))
+        self.assertEqual(['p1', 'p4', 'p0', 'p3', 'p5', 'p2', 'p6'],
+                         self._ids(['status', 'id'], ['desc']))
+        self.assertEqual(['p6', 'p5', 'p4', 'p3', 'p2', 'p1', 'p0'],
+                         self._ids(['fixed_ips.ip_address'], ['desc']))
+
+    def test_external_sort(self):
+        for keys, dirs in ((['mac_address'], []),
+                           (['status', 'mac_address'], ['desc', 'asc']),
+                           (['fixed_ips.ip_address'], ['desc'])):
+            expected = self._ids(keys, dirs)
+            for chunk_size in (1, 2, 3, 7, 8):
+                self.assertEqual(expected,
+                                 self._ids(keys, dirs, chunk_size))
+
+    def test_external_sort_spills(self):
+        sorted_ports = sorting.sort_items(iter(SORTED_PORTS),
+                                          ['mac_address'], chunk_size=3)
+        self.assertFalse(isinstance(sorted_ports, list))
+        self.assertEqual(SORTED_PORTS[6], list(sorted_ports)[2])
+
+
+class GroupByTest(testtools.TestCase):
+    def test_parse_aggregate(self):
+        self.assertEqual(('count', None), aggregate.parse_aggregate('count'))
+        self.assertEqual(('max', 'created_at'),
+                         aggregate.parse_aggregate('max:created_at'))
+        self.assertRaises(ValueError, aggregate.parse_aggregate, 'sum:id')
+        self.assertRaises(ValueError, aggregate.parse_aggregate, 'min')
+
+    def test_group_pages(self):
+        grouping = aggregate.GroupBy(
+            ['device_owner'],
+            [('count', None), ('distinct', 'device_id'),
+             ('min', 'created_at'), ('max', 'created_at'),
+             ('count', 'created_at')])
+        self.assertEqual(['device_owner', 'device_id', 'created_at'],
+                         grouping.fields)
+        grouping.add(GROUPED_PORTS[:2])
+        grouping.add(GROUPED_PORTS[2:])
+        self.assertEqual(['device_owner', 'count', 'distinct(device_id)',
+                          'min(created_at)', 'max(created_at)',
+                          'count(created_at)'], grouping.columns)
+        self.assertEqual(
+            [(None, 1, 0, None, None, 0),
+             ('compute:nova', 2, 1, '2014-01-01', '2014-03-01', 2),
+             ('network:dhcp', 1, 1, '2014-02-01', '2014-02-01', 1)],
+            grouping.rows())
+
+    def test_group_multivalued_fields(self):
+        grouping = aggregate.GroupBy(['fixed_ips.subnet_id', 'device_owner'])
+        self.assertEqual(['fixed_ips', 'device_owner'], grouping.fields)
+        grouping.add(GROUPED_PORTS)
+        self.assertEqual([(None, None, 1),
+                          ('s1', 'compute:nova', 2),
+                          ('s2', 'compute:nova', 1),
+                          ('s2', 'network:dhcp', 1)], grouping.rows())
 
 
 class CLITestV20PortJSON(test_cli20.CLITestV20Base):
@@ -414,6 +571,249 @@ class CLITestV20PortJSON(test_cli20.CLITestV20Base):
         args = [myid]
         self._test_delete_resource(resource, cmd, myid, args)
 
+    def test_list_ports_watch(self):
+        """List ports: --watch."""
+        delays = []
+        self.useFixture(fixtures.MonkeyPatch(
+            'neutronclient.neutron.v2_0.time.sleep', delays.append))
+        cmd = port.ListPort(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        query = ('fields=id&fields=name&fields=mac_address&fields=fixed_ips'
+                 '&network_id=net1')
+        polls = [
+            [{'id': 'p1', 'name': 'a', 'mac_address': 'fa:16:3e:00:00:01'},
+             {'id': 'p2', 'name': 'b', 'mac_address': 'fa:16:3e:00:00:02'}],
+            [{'id': 'p1', 'name': 'a', 'mac_address': 'fa:16:3e:00:00:01'},
+             {'id': 'p2', 'name': 'b', 'mac_address': 'fa:16:3e:00:00:02'}],
+            [{'id': 'p1', 'name': 'c', 'mac_address': 'fa:16:3e:00:00:01'},
+             {'id': 'p3', 'name': 'd', 'mac_address': 'fa:16:3e:00:00:03'}],
+            [{'id': 'p1', 'name': 'c', 'mac_address': 'fa:16:3e:00:00:01'},
+             {'id': 'p3', 'name': 'd', 'mac_address': 'fa:16:3e:00:00:03'}],
+        ]
+        for ports in polls:
+            self._expect_request('GET', self.client.ports_path, query,
+                                 {'ports': ports})
+        _str = self._run_command(cmd, ['--watch', '--watch-count', '4',
+                                       '--watch-interval', '2', '--',
+                                       '--network_id', 'net1'])
+        events = [jsonutils.loads(line) for line in _str.splitlines()]
+        for event in events:
+            self.assertIsNotNone(event.pop('timestamp'))
+        self.assertEqual(
+            [{'event': 'create', 'id': 'p1', 'resource': polls[0][0]},
+             {'event': 'create', 'id': 'p2', 'resource': polls[0][1]},
+             {'event': 'update', 'id': 'p1', 'changes': {'name': 'c'}},
+             {'event': 'create', 'id': 'p3', 'resource': polls[2][1]},
+             {'event': 'delete', 'id': 'p2'}],
+            events)
+        self.assertEqual([2, 4, 2], delays)
+
+    def test_list_router_ports_watch(self):
+        """List router ports: myid --watch."""
+        self.useFixture(fixtures.MonkeyPatch(
+            'neutronclient.neutron.v2_0.time.sleep', lambda delay: None))
+        cmd = port.ListRouterPort(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        query = ('fields=id&fields=name&fields=mac_address&fields=fixed_ips'
+                 '&device_id=%s' % self.test_id)
+        for ports in ([], [{'id': 'p1', 'name': 'gw'}]):
+            self._expect_request('GET', self.client.ports_path, query,
+                                 {'ports': ports})
+        _str = self._run_command(cmd, ['--watch', '--watch-count', '2',
+                                       self.test_id])
+        events = [jsonutils.loads(line) for line in _str.splitlines()]
+        self.assertEqual([('create', 'p1')],
+                         [(e['event'], e['id']) for e in events])
+
+    def test_list_ports_count(self):
+        """List ports: --count."""
+        cmd = port.ListPort(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self._expect_request(
+            'GET', self.client.ports_path,
+            'fields=id&limit=%d&network_id=net1' %
+            self.client.COUNT_PAGE_SIZE,
+            {'ports': [{'id': 'p1'}, {'id': 'p2'}, {'id': 'p3'}]})
+        _str = self._run_command(cmd, ['-f', 'value', '--count', '-c', 'id',
+                                       '--', '--network_id', 'net1'])
+        self.assertEqual('3', _str.strip())
+
+    def test_list_ports_group_by(self):
+        """List ports: --group-by."""
+        cmd = port.ListPort(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        query = 'fields=device_owner&fields=device_id&network_id=net1'
+        self._expect_request(
+            'GET', self.client.ports_path, query,
+            {'ports': GROUPED_PORTS[:2],
+             'ports_links': [{'rel': 'next', 'href': test_cli20.end_url(
+                 self.client.ports_path, query + '&marker=p2')}]})
+        self._expect_request(
+            'GET', self.client.ports_path, query + '&marker=p2',
+            {'ports': GROUPED_PORTS[2:3]})
+        _str = self._run_command(cmd, ['-f', 'csv', '--group-by',
+                                       'device_owner', '--aggregate',
+                                       'count', '--aggregate',
+                                       'distinct:device_id',
+                                       '--', '--network_id', 'net1'])
+        self.assertEqual(['"device_owner","count","distinct(device_id)"',
+                          '"compute:nova",2,1', '"network:dhcp",1,1'],
+                         _str.split())
+
+    def test_list_ports_where(self):
+        """List ports: --where."""
+        cmd = port.ListPort(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        query = ('fields=id&fields=name&fields=tenant_id&fields=fixed_ips&'
+                 'tenant_id=t1&tenant_id=t2')
+        self._expect_request(
+            'GET', self.client.ports_path, query,
+            {'ports': WHERE_PORTS[:1],
+             'ports_links': [{'rel': 'next', 'href': test_cli20.end_url(
+                 self.client.ports_path, query + '&marker=p1')}]})
+        self._expect_request(
+            'GET', self.client.ports_path, query + '&marker=p1',
+            {'ports': WHERE_PORTS[1:]})
+        _str = self._run_command(cmd, ['-f', 'json', '-F', 'id', '-F',
+                                       'name', '--where',
+                                       'tenant_id in (t1, t2) and '
+                                       'fixed_ips.ip_address within '
+                                       '10.0.0.0/8 and name ~ ^web'])
+        self.assertEqual([{'id': 'p1', 'name': 'web-1'}],
+                         jsonutils.loads(_str))
+
+    def test_list_ports_count_where(self):
+        """List ports: --count --where."""
+        cmd = port.ListPort(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self._expect_request('GET', self.client.ports_path,
+                             'fields=id&fields=name',
+                             {'ports': WHERE_PORTS})
+        _str = self._run_command(cmd, ['-f', 'value', '--count',
+                                       '--where', 'name ~ web'])
+        self.assertEqual('2', _str.strip())
+
+    def test_list_ports_bad_where(self):
+        """List ports: --where with a syntax error."""
+        cmd = port.ListPort(test_cli20.MyApp(sys.stdout), None)
+        self.assertRaises(exceptions.CommandError, self._run_command, cmd,
+                          ['--where', 'name ='])
+
+    def test_list_ports_sort_locally(self):
+        """List ports: --sort-key on a dotted field."""
+        self.useFixture(fixtures.MonkeyPatch(
+            'neutronclient.v2_0.sorting.SORT_CHUNK_SIZE', 2))
+        cmd = port.ListPort(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        query = 'fields=id&fields=fixed_ips'
+        self._expect_request(
+            'GET', self.client.ports_path, query,
+            {'ports': SORTED_PORTS[:4],
+             'ports_links': [{'rel': 'next', 'href': test_cli20.end_url(
+                 self.client.ports_path, query + '&marker=p3')}]})
+        self._expect_request(
+            'GET', self.client.ports_path, query + '&marker=p3',
+            {'ports': SORTED_PORTS[4:]})
+        _str = self._run_command(cmd, ['-f', 'value', '-F', 'id', '-c', 'id',
+                                       '--sort-key', 'fixed_ips.ip_address',
+                                       '--sort-dir', 'desc'])
+        self.assertEqual(['p6', 'p5', 'p4', 'p3', 'p2', 'p1', 'p0'],
+                         _str.split())
+
+    def test_list_ports_expand(self):
+        """List ports: --expand."""
+        self.useFixture(fixtures.MonkeyPatch(
+            'neutronclient.common.utils.DEFAULT_CONCURRENCY', 1))
+        cmd = port.ListPort(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        ports = [{'id': 'p1', 'network_id': 'n1',
+                  'fixed_ips': [{'subnet_id': 's1'}, {'subnet_id': 's2'}]},
+                 {'id': 'p2', 'network_id': 'n2', 'fixed_ips': []},
+                 {'id': 'p3', 'network_id': 'n1',
+                  'fixed_ips': [{'subnet_id': 's1'}]}]
+        self._expect_request(
+            'GET', self.client.ports_path,
+            'fields=id&fields=network_id&fields=fixed_ips', {'ports': ports})
+        self._expect_request(
+            'GET', self.client.networks_path,
+            'id=n1&id=n2&fields=id&fields=name',
+            {'networks': [{'id': 'n1', 'name': 'net1'}]})
+        self._expect_request(
+            'GET', self.client.subnets_path,
+            'id=s1&id=s2&fields=id&fields=cidr',
+            {'subnets': [{'id': 's1', 'cidr': '10.0.0.0/24'},
+                         {'id': 's2', 'cidr': '10.0.1.0/24'}]})
+        _str = self._run_command(cmd, ['-f', 'json', '-F', 'id',
+                                       '--expand', 'network_id',
+                                       '--expand', 'fixed_ips.subnet_id:cidr',
+                                       '-c', 'id', '-c', 'network_id:name',
+                                       '-c', 'fixed_ips.subnet_id:cidr'])
+        self.assertEqual(
+            [{'id': 'p1', 'network_id:name': 'net1',
+              'fixed_ips.subnet_id:cidr': ['10.0.0.0/24', '10.0.1.0/24']},
+             {'id': 'p2', 'network_id:name': '',
+              'fixed_ips.subnet_id:cidr': []},
+             {'id': 'p3', 'network_id:name': 'net1',
+              'fixed_ips.subnet_id:cidr': ['10.0.0.0/24']}],
+            jsonutils.loads(_str))
+
+    def test_list_ports_expand_sorted_batches(self):
+        """List ports: --expand and --sort-key on an expanded column."""
+        self.useFixture(fixtures.MonkeyPatch(
+            'neutronclient.v2_0.expand.EXPAND_BATCH_SIZE', 2))
+        cmd = port.ListPort(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        ports = [{'id': 'p1', 'network_id': 'n1'},
+                 {'id': 'p2', 'network_id': 'n1'},
+                 {'id': 'p3', 'network_id': 'n2'},
+                 {'id': 'p4', 'network_id': 'n1'}]
+        self._expect_request('GET', self.client.ports_path, None,
+                             {'ports': ports})
+        # n1 is fetched for the first batch only
+        self._expect_request('GET', self.client.networks_path,
+                             'id=n1&fields=id&fields=name',
+                             {'networks': [{'id': 'n1', 'name': 'net-b'}]})
+        self._expect_request('GET', self.client.networks_path,
+                             'id=n2&fields=id&fields=name',
+                             {'networks': [{'id': 'n2', 'name': 'net-a'}]})
+        _str = self._run_command(cmd, ['-f', 'value', '-c', 'id',
+                                       '--expand', 'network_id',
+                                       '--sort-key', 'network_id:name'])
+        self.assertEqual(['p3', 'p1', 'p2', 'p4'], _str.split())
+
+    def test_list_ports_expand_unknown_reference(self):
+        """List ports: --expand on a field which is not a reference."""
+        cmd = port.ListPort(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self.assertRaises(exceptions.CommandError, self._run_command, cmd,
+                          ['--expand', 'mac_address'])
+
+    def test_list_ports_group_by_bad_aggregate(self):
+        """List ports: --group-by with an unknown aggregate."""
+        cmd = port.ListPort(test_cli20.MyApp(sys.stdout), None)
+        self.assertRaises(exceptions.CommandError, self._run_command, cmd,
+                          ['--group-by', 'device_owner',
+                           '--aggregate', 'sum:id'])
+
 
 class CLITestV20PortXML(CLITestV20PortJSON):
     format = 'xml'
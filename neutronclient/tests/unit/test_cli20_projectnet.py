@@ -0,0 +1,332 @@
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import sys
+
+import fixtures
+from oslo.serialization import jsonutils
+import testtools
+
+from neutronclient.common import exceptions
+from neutronclient.neutron.v2_0 import projectnet as projectnet_cmd
+from neutronclient.tests.unit import test_cli20
+from neutronclient.v2_0 import projectnet
+
+RESOURCES = {
+    'networks': [{'id': 'net1', 'name': 'private', 'admin_state_up': True,
+                  'shared': False, 'status': 'ACTIVE', 'tenant_id': 't1'},
+                 {'id': 'ext1', 'name': 'public', 'admin_state_up': True,
+                  'router:external': True, 'tenant_id': 't1'},
+                 {'id': 'net2', 'name': 'shared', 'admin_state_up': True,
+                  'shared': True, 'tenant_id': 't9'}],
+    'subnets': [{'id': 'sub1', 'name': 'private-sub', 'network_id': 'net1',
+                 'cidr': '10.0.0.0/24', 'ip_version': 4,
+                 'gateway_ip': '10.0.0.1', 'enable_dhcp': True},
+                {'id': 'sub2', 'name': 'foreign', 'network_id': 'other',
+                 'cidr': '10.1.0.0/24', 'ip_version': 4},
+                {'id': 'sub3', 'name': 'shared-sub', 'network_id': 'net2',
+                 'cidr': '10.2.0.0/24', 'ip_version': 4, 'tenant_id': 't9'},
+                {'id': 'sub4', 'name': 'public-sub', 'network_id': 'ext1',
+                 'cidr': '172.24.4.0/24', 'ip_version': 4,
+                 'tenant_id': 't1'}],
+    'security_groups': [{'id': 'sg1', 'name': 'default',
+                         'description': 'default'},
+                        {'id': 'sg2', 'name': 'web', 'description': ''}],
+    'security_group_rules': [{'id': 'r1', 'security_group_id': 'sg1',
+                              'direction': 'egress', 'ethertype': 'IPv4',
+                              'protocol': None, 'remote_group_id': None},
+                             {'id': 'r2', 'security_group_id': 'sg2',
+                              'direction': 'ingress', 'ethertype': 'IPv4',
+                              'protocol': 'tcp', 'port_range_min': 80,
+                              'port_range_max': 80,
+                              'remote_group_id': 'sg1'}],
+    'routers': [{'id': 'rt1', 'name': 'gw', 'admin_state_up': True,
+                 'external_gateway_info': {'network_id': 'ext1',
+                                           'enable_snat': True}}],
+    'ports': [{'device_id': 'rt1',
+               'fixed_ips': [{'subnet_id': 'sub1',
+                              'ip_address': '10.0.0.1'}]}],
+    'external_networks': [{'id': 'ext1', 'name': 'public'}],
+}
+
+DOCUMENT = {
+    'version': 1,
+    'resources': {
+        'networks': [{'ref': 'networks/0', 'name': 'private',
+                      'admin_state_up': True, 'shared': False}],
+        'security_groups': [{'ref': 'security_groups/0', 'name': 'default',
+                             'description': 'default'},
+                            {'ref': 'security_groups/1', 'name': 'web',
+                             'description': ''}],
+        'routers': [{'ref': 'routers/0', 'name': 'gw',
+                     'admin_state_up': True,
+                     'external_gateway_info': {'network': 'public',
+                                               'enable_snat': True}}],
+        'subnets': [{'ref': 'subnets/0', 'name': 'private-sub',
+                     'network_id': 'networks/0', 'cidr': '10.0.0.0/24',
+                     'ip_version': 4, 'gateway_ip': '10.0.0.1',
+                     'enable_dhcp': True}],
+        'security_group_rules': [
+            {'ref': 'security_group_rules/0',
+             'security_group_id': 'security_groups/0',
+             'direction': 'egress', 'ethertype': 'IPv4'},
+            {'ref': 'security_group_rules/1',
+             'security_group_id': 'security_groups/1',
+             'direction': 'ingress', 'ethertype': 'IPv4', 'protocol': 'tcp',
+             'port_range_min': 80, 'port_range_max': 80,
+             'remote_group_id': 'security_groups/0'}],
+        'router_interfaces': [{'ref': 'router_interfaces/0',
+                               'router_id': 'routers/0',
+                               'subnet_id': 'subnets/0'}],
+    },
+}
+
+
+class ProjectDocumentTest(testtools.TestCase):
+    def test_build_document(self):
+        document, skipped = projectnet.build_document(RESOURCES, 't1')
+        resources = dict((collection, entries) for collection, entries
+                         in document['resources'].items() if entries)
+        self.assertEqual(DOCUMENT['resources'], resources)
+        # the external and shared networks and their subnets
+        self.assertEqual(2, skipped['networks'])
+        self.assertEqual(3, skipped['subnets'])
+
+    def test_subnet_without_gateway(self):
+        resources = {'networks': [{'id': 'net1', 'name': 'isolated'}],
+                     'subnets': [{'id': 'sub1', 'network_id': 'net1',
+                                  'cidr': '10.0.0.0/24', 'ip_version': 4,
+                                  'gateway_ip': None}]}
+        document, _skipped = projectnet.build_document(resources)
+        self.assertEqual([{'ref': 'subnets/0', 'network_id': 'networks/0',
+                           'cidr': '10.0.0.0/24', 'ip_version': 4,
+                           'gateway_ip': None}],
+                         document['resources']['subnets'])
+
+    def test_dependency_levels(self):
+        levels = projectnet.dependency_levels()
+        level_of = dict((collection, i) for i, level in enumerate(levels)
+                        for collection in level)
+        self.assertEqual(0, level_of['networks'])
+        self.assertEqual(1, level_of['subnets'])
+        self.assertEqual(2, level_of['router_interfaces'])
+        self.assertEqual(3, level_of['vpnservices'])
+        for collection, _fields, references in projectnet.SCHEMA:
+            for referenced in references.values():
+                self.assertTrue(level_of[referenced] < level_of[collection])
+
+
+class CLITestV20ProjectNetworkJSON(test_cli20.CLITestV20Base):
+    def setUp(self):
+        super(CLITestV20ProjectNetworkJSON, self).setUp()
+        self.path = self.useFixture(fixtures.TempDir()).join('project.json')
+
+    def _stub_client(self, cmd):
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+
+    def test_project_network_export(self):
+        cmd = projectnet_cmd.ExportProjectNetwork(
+            test_cli20.MyApp(sys.stdout), None)
+        self._stub_client(cmd)
+        self._expect_request('GET', self.client.quota_path % 'tenant',
+                             response={'tenant': {'tenant_id': 't1'}})
+        for collection, _fields, _references in projectnet.SCHEMA:
+            if collection in projectnet.DERIVED:
+                continue
+            path = getattr(self.client, '%s_path' % collection)
+            if collection in ('ikepolicies', 'firewall_rules'):
+                # the extension is not loaded on the server
+                self._expect_request(
+                    'GET', path, 'tenant_id=t1',
+                    {'NeutronError': {'type': 'HTTPNotFound',
+                                      'message': 'Not found', 'detail': ''}},
+                    status_code=404)
+            else:
+                # the XML test serializer has no namespace for
+                # router:external, the external network is left out
+                self._expect_request(
+                    'GET', path, 'tenant_id=t1',
+                    {collection: [item for item in
+                                  RESOURCES.get(collection, [])
+                                  if 'ext1' not in (item['id'],
+                                                    item.get('network_id'))]})
+        self._expect_request(
+            'GET', self.client.ports_path,
+            'device_owner=network%3Arouter_interface&fields=device_id&'
+            'fields=fixed_ips&tenant_id=t1', {'ports': RESOURCES['ports']})
+        self._expect_request(
+            'GET', self.client.networks_path,
+            'fields=id&fields=name&router%3Aexternal=True',
+            {'networks': RESOURCES['external_networks']})
+        _str = self._run_command(cmd, ['-f', 'json', '--concurrency', '1',
+                                       self.path])
+        summary = dict((row['collection'], (row['exported'], row['skipped']))
+                       for row in jsonutils.loads(_str))
+        self.assertEqual((1, 1), summary['networks'])
+        self.assertEqual((1, 2), summary['subnets'])
+        self.assertEqual((1, 0), summary['router_interfaces'])
+        self.assertEqual((0, 0), summary['ikepolicies'])
+        with open(self.path) as f:
+            document = jsonutils.loads(f.read())
+        self.assertEqual(DOCUMENT['resources']['routers'],
+                         document['resources']['routers'])
+        self.assertEqual(DOCUMENT['resources']['security_group_rules'],
+                         document['resources']['security_group_rules'])
+
+    def _write_document(self, document):
+        with open(self.path, 'w') as f:
+            f.write(jsonutils.dumps(document))
+
+    def test_project_network_import(self):
+        self._write_document(DOCUMENT)
+        cmd = projectnet_cmd.ImportProjectNetwork(
+            test_cli20.MyApp(sys.stdout), None)
+        self._stub_client(cmd)
+        self._expect_request(
+            'GET', self.client.networks_path,
+            'name=public&fields=id&fields=name&router%3Aexternal=True',
+            {'networks': [{'id': 'ext9', 'name': 'public'}]})
+        self._expect_request(
+            'POST', self.client.networks_path,
+            body={'networks': [{'name': 'private', 'admin_state_up': True,
+                                'shared': False, 'tenant_id': 't2'}]},
+            response={'networks': [{'id': 'n9', 'name': 'private'}]})
+        self._expect_request(
+            'GET', self.client.security_groups_path,
+            'name=default&fields=id&fields=tenant_id&tenant_id=t2',
+            {'security_groups': [{'id': 'sg8', 'tenant_id': 't2'}]})
+        self._expect_request(
+            'POST', self.client.security_groups_path,
+            body={'security_groups': [{'name': 'web', 'description': '',
+                                       'tenant_id': 't2'}]},
+            response={'security_groups': [{'id': 'sg9', 'name': 'web'}]})
+        self._expect_request(
+            'POST', self.client.routers_path,
+            body={'router': {'name': 'gw', 'admin_state_up': True,
+                             'tenant_id': 't2',
+                             'external_gateway_info': {
+                                 'network_id': 'ext9',
+                                 'enable_snat': True}}},
+            response={'router': {'id': 'rt9', 'name': 'gw'}})
+        self._expect_request(
+            'POST', self.client.subnets_path,
+            body={'subnets': [{'name': 'private-sub', 'network_id': 'n9',
+                               'cidr': '10.0.0.0/24', 'ip_version': 4,
+                               'gateway_ip': '10.0.0.1', 'enable_dhcp': True,
+                               'tenant_id': 't2'}]},
+            response={'subnets': [{'id': 's9', 'name': 'private-sub'}]})
+        self._expect_request(
+            'GET', self.client.security_group_rules_path,
+            'security_group_id=sg8&security_group_id=sg9',
+            {'security_group_rules': [
+                {'id': 'r8', 'security_group_id': 'sg8',
+                 'direction': 'egress', 'ethertype': 'IPv4'}]})
+        self._expect_request(
+            'POST', self.client.security_group_rules_path,
+            body={'security_group_rules': [
+                {'security_group_id': 'sg9', 'direction': 'ingress',
+                 'ethertype': 'IPv4', 'protocol': 'tcp',
+                 'port_range_min': 80, 'port_range_max': 80,
+                 'remote_group_id': 'sg8', 'tenant_id': 't2'}]},
+            response={'security_group_rules': [{'id': 'r9'}]})
+        self._expect_request(
+            'PUT', self.client.router_path % 'rt9' + '/add_router_interface',
+            body={'subnet_id': 's9'},
+            response={'port_id': 'p9', 'subnet_id': 's9'})
+        _str = self._run_command(cmd, ['-f', 'json', '--concurrency', '1',
+                                       '--tenant-id', 't2', '-c', 'ref',
+                                       '-c', 'id', self.path])
+        self.assertEqual(
+            [('networks/0', 'n9'), ('security_groups/1', 'sg9'),
+             ('security_groups/0', 'sg8'), ('routers/0', 'rt9'),
+             ('subnets/0', 's9'), ('security_group_rules/1', 'r9'),
+             ('security_group_rules/0', 'r8'), ('router_interfaces/0', 'p9')],
+            [(row['ref'], row['id']) for row in jsonutils.loads(_str)])
+
+    def test_project_network_import_subnet_without_gateway(self):
+        document, _skipped = projectnet.build_document({
+            'networks': [{'id': 'net1', 'name': 'isolated'}],
+            'subnets': [{'id': 'sub1', 'network_id': 'net1',
+                         'cidr': '10.0.0.0/24', 'ip_version': 4,
+                         'gateway_ip': None}]})
+        self._write_document(document)
+        cmd = projectnet_cmd.ImportProjectNetwork(
+            test_cli20.MyApp(sys.stdout), None)
+        self._stub_client(cmd)
+        self._expect_request(
+            'POST', self.client.networks_path,
+            body={'networks': [{'name': 'isolated'}]},
+            response={'networks': [{'id': 'n9', 'name': 'isolated'}]})
+        # without gateway_ip, the server would set 10.0.0.1
+        self._expect_request(
+            'POST', self.client.subnets_path,
+            body={'subnets': [{'network_id': 'n9', 'cidr': '10.0.0.0/24',
+                               'ip_version': 4, 'gateway_ip': None}]},
+            response={'subnets': [{'id': 's9'}]})
+        self._run_command(cmd, ['--concurrency', '1', self.path])
+
+    def test_project_network_import_partial_failure(self):
+        document, _skipped = projectnet.build_document({
+            'networks': [{'id': 'net1', 'name': 'private'}],
+            'security_groups': [{'id': 'sg1', 'name': 'web'}],
+            'subnets': [{'id': 'sub1', 'network_id': 'net1',
+                         'cidr': '10.0.0.0/24', 'ip_version': 4}]})
+        self._write_document(document)
+        cmd = projectnet_cmd.ImportProjectNetwork(
+            test_cli20.MyApp(sys.stdout), None)
+        self._stub_client(cmd)
+        self._expect_request(
+            'POST', self.client.networks_path,
+            body={'networks': [{'name': 'private'}]},
+            response={'networks': [{'id': 'n9', 'name': 'private'}]})
+        self._expect_request(
+            'POST', self.client.security_groups_path,
+            body={'security_groups': [{'name': 'web'}]},
+            response={'NeutronError': {'type': 'OverQuota',
+                                       'message': 'Quota exceeded',
+                                       'detail': ''}},
+            status_code=409)
+        self.assertRaises(exceptions.Conflict, self._run_command, cmd,
+                          ['--concurrency', '1', self.path])
+        # the network of the same level is reported, no subnet is created
+        self.assertEqual('Created networks/0: n9\n',
+                         self.fake_stdout.make_string())
+
+    def test_project_network_import_missing_gateway(self):
+        self._write_document(DOCUMENT)
+        cmd = projectnet_cmd.ImportProjectNetwork(
+            test_cli20.MyApp(sys.stdout), None)
+        self._stub_client(cmd)
+        self._expect_request(
+            'GET', self.client.networks_path,
+            'name=public&fields=id&fields=name&router%3Aexternal=True',
+            {'networks': []})
+        self.assertRaises(exceptions.NotFound, self._run_command, cmd,
+                          [self.path])
+
+    def test_project_network_import_bad_version(self):
+        self._write_document({'version': 99, 'resources': {}})
+        cmd = projectnet_cmd.ImportProjectNetwork(
+            test_cli20.MyApp(sys.stdout), None)
+        self._stub_client(cmd)
+        self.assertRaises(exceptions.InvalidProjectDocument,
+                          self._run_command, cmd, [self.path])
+        self.assertTrue(os.path.exists(self.path))
+
+
+class CLITestV20ProjectNetworkXML(CLITestV20ProjectNetworkJSON):
+    format = 'xml'
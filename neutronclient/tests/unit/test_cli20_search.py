@@ -0,0 +1,129 @@
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import sys
+
+from oslo.serialization import jsonutils
+import testtools
+
+from neutronclient.neutron.v2_0 import search as search_cmd
+from neutronclient.tests.unit import test_cli20
+from neutronclient.v2_0 import client
+from neutronclient.v2_0 import search
+
+UUID = '9d3b2c4e-1f6a-4b8e-9c2d-7e5f6a1b3c4d'
+
+
+class PlanSearchesTest(testtools.TestCase):
+    def setUp(self):
+        super(PlanSearchesTest, self).setUp()
+        self.client = client.Client(token='token',
+                                    endpoint_url='http://localhost')
+
+    def _plan(self, term):
+        return [(collection, filters, attribute)
+                for collection, filters, attribute, expected, normalize
+                in search.plan_searches(self.client, term)]
+
+    def test_searchable_collections(self):
+        collections = search.searchable_collections(self.client)
+        self.assertEqual(search.CORE_COLLECTIONS,
+                         collections[:len(search.CORE_COLLECTIONS)])
+        self.assertIn('vips', collections)
+        self.assertIn('firewall_rules', collections)
+        self.assertNotIn('quotas', collections)
+        self.assertEqual(len(collections), len(set(collections)))
+
+    def test_plan_uuid(self):
+        plan = self._plan(UUID)
+        self.assertEqual(search.searchable_collections(self.client),
+                         [collection for collection, f, a in plan])
+        self.assertTrue(all(f == {'id': UUID} and a == 'id'
+                            for c, f, a in plan))
+
+    def test_plan_name(self):
+        plan = self._plan('web')
+        self.assertIn(('networks', {'name': 'web'}, 'name'), plan)
+        self.assertNotIn('floatingips', [c for c, f, a in plan])
+        self.assertTrue(all(a == 'name' for c, f, a in plan))
+
+    def test_plan_ip(self):
+        plan = self._plan('2001:DB8::3')
+        self.assertIn(('ports', {'fixed_ips': 'ip_address=2001:db8::3'},
+                       'fixed_ips.ip_address'), plan)
+        self.assertIn(('floatingips', {'floating_ip_address': '2001:db8::3'},
+                       'floating_ip_address'), plan)
+
+    def test_plan_cidr_and_mac(self):
+        self.assertIn(('subnets', {'cidr': '10.0.0.0/24'}, 'cidr'),
+                      self._plan('10.0.0.7/24'))
+        self.assertIn(('ports', {'mac_address': 'fa:16:3e:00:00:01'},
+                       'mac_address'), self._plan('FA-16-3E-00-00-01'))
+
+    def test_matches(self):
+        port = {'fixed_ips': [{'ip_address': '10.0.0.3'},
+                              {'ip_address': '2001:db8:0::3'}]}
+        normalize = [s[4] for s in search.plan_searches(self.client,
+                                                        '2001:db8::3')
+                     if s[0] == 'ports' and s[2] != 'name'][0]
+        self.assertTrue(search._matches(port, 'fixed_ips.ip_address',
+                                        '2001:db8::3', normalize))
+        self.assertFalse(search._matches(port, 'fixed_ips.ip_address',
+                                         '10.0.0.4', normalize))
+        self.assertFalse(search._matches({'name': 'webserver'}, 'name',
+                                         'web', None))
+
+
+class CLITestV20SearchJSON(test_cli20.CLITestV20Base):
+    def test_find(self):
+        cmd = search_cmd.FindResource(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self.mox.StubOutWithMock(search, "searchable_collections")
+        search.searchable_collections(self.client).AndReturn(
+            ['networks', 'ports', 'vips'])
+        fields = 'fields=id&fields=name&fields=tenant_id'
+        self._expect_request('GET', self.client.networks_path,
+                             'name=10.0.0.3&' + fields, {'networks': []})
+        self._expect_request('GET', self.client.ports_path,
+                             'name=10.0.0.3&' + fields,
+                             {'ports': [{'id': 'p0', 'name': 'other'}]})
+        self._expect_request('GET', self.client.vips_path,
+                             'name=10.0.0.3&' + fields, {'vips': []})
+        self._expect_request(
+            'GET', self.client.ports_path,
+            'fixed_ips=ip_address%3D10.0.0.3&' + fields + '&fields=fixed_ips',
+            {'ports': [{'id': 'p1', 'name': 'web', 'tenant_id': 't1',
+                        'fixed_ips': [{'ip_address': '10.0.0.3'}]},
+                       {'id': 'p2', 'name': 'db', 'tenant_id': 't1',
+                        'fixed_ips': [{'ip_address': '10.0.0.9'}]}]})
+        self._expect_request(
+            'GET', self.client.vips_path,
+            'address=10.0.0.3&' + fields + '&fields=address',
+            {'vips': [{'id': 'v1', 'name': 'lb', 'tenant_id': 't1',
+                       'address': '10.0.0.3'}]})
+        _str = self._run_command(cmd, ['-f', 'json', '--concurrency', '1',
+                                       '10.0.0.3'])
+        self.assertEqual(
+            [{'type': 'port', 'id': 'p1', 'name': 'web', 'tenant_id': 't1',
+              'matched': 'fixed_ips.ip_address'},
+             {'type': 'vip', 'id': 'v1', 'name': 'lb', 'tenant_id': 't1',
+              'matched': 'address'}],
+            jsonutils.loads(_str))
+
+
+class CLITestV20SearchXML(CLITestV20SearchJSON):
+    format = 'xml'
@@ -14,15 +14,88 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import random
 import sys
 
 from mox3 import mox
+import netaddr
+from oslo.serialization import jsonutils
 import six
+import testtools
 
 from neutronclient.common import exceptions
 from neutronclient.common import utils
 from neutronclient.neutron.v2_0 import securitygroup
 from neutronclient.tests.unit import test_cli20
+from neutronclient.v2_0 import sgcompact
+from neutronclient.v2_0 import sgfanout
+from neutronclient.v2_0 import sgpolicy
+
+POLICY_RULES = [
+    {'id': 'r1', 'direction': 'ingress', 'ethertype': 'IPv4',
+     'protocol': 'tcp', 'port_range_min': 22, 'port_range_max': 22,
+     'remote_ip_prefix': '10.0.0.0/24', 'remote_group_id': None},
+    {'id': 'r2', 'direction': 'ingress', 'ethertype': 'IPv4',
+     'protocol': 'tcp', 'port_range_min': 80, 'port_range_max': 443,
+     'remote_ip_prefix': None, 'remote_group_id': None},
+    {'id': 'r3', 'direction': 'ingress', 'ethertype': 'IPv4',
+     'protocol': 'icmp', 'port_range_min': 8, 'port_range_max': None,
+     'remote_ip_prefix': '0.0.0.0/0', 'remote_group_id': None},
+    {'id': 'r4', 'direction': 'egress', 'ethertype': 'IPv4',
+     'protocol': None, 'port_range_min': None, 'port_range_max': None,
+     'remote_ip_prefix': None, 'remote_group_id': None},
+    {'id': 'r5', 'direction': 'ingress', 'ethertype': 'IPv6',
+     'protocol': 'udp', 'port_range_min': 53, 'port_range_max': 53,
+     'remote_ip_prefix': None, 'remote_group_id': 'sg-web'},
+    {'id': 'r6', 'direction': 'ingress', 'ethertype': 'IPv4',
+     'protocol': 'tcp', 'port_range_min': 1000, 'port_range_max': 2000,
+     'remote_ip_prefix': '10.0.1.0/24', 'remote_group_id': None},
+    {'id': 'r7', 'direction': 'ingress', 'ethertype': 'IPv4',
+     'protocol': '6', 'port_range_min': 1500, 'port_range_max': 2500,
+     'remote_ip_prefix': '10.0.0.0/24', 'remote_group_id': None},
+]
+
+
+def _sg_rule(_id, remote_ip_prefix=None, direction='ingress',
+             ethertype='IPv4', protocol='tcp', port=22, remote_group_id=None):
+    return {'id': _id, 'security_group_id': 'sg1', 'tenant_id': 'tenant1',
+            'direction': direction,
+            'ethertype': ethertype, 'protocol': protocol,
+            'port_range_min': port, 'port_range_max': port,
+            'remote_ip_prefix': remote_ip_prefix,
+            'remote_group_id': remote_group_id}
+
+
+COMPACTED_RULES = [
+    _sg_rule('c1', '10.0.0.0/25'),
+    _sg_rule('c2', '10.0.0.128/25'),
+    _sg_rule('c3', '10.0.1.0/24'),
+    _sg_rule('c4', '10.0.3.0/24'),
+    _sg_rule('c5', '192.168.0.0/24', port=80),
+    _sg_rule('c6', port=80),
+    _sg_rule('c7', port=443, remote_group_id='sg2'),
+    _sg_rule('c8', '2001:db8::/33', direction='egress', ethertype='IPv6',
+             protocol=None, port=None),
+    _sg_rule('c9', '2001:db8:8000::/33', direction='egress',
+             ethertype='IPv6', protocol=None, port=None),
+]
+
+FANOUT_PORTS = (
+    [{'id': 'w%d' % i, 'security_groups': ['web'],
+      'fixed_ips': [{'ip_address': '10.0.0.%d' % i}]} for i in range(8)] +
+    [{'id': 'd%d' % i, 'security_groups': ['db', 'default'],
+      'fixed_ips': [{'ip_address': '10.0.1.%d' % (i * 7)}]}
+     for i in range(3)])
+FANOUT_RULES = [
+    {'id': 'f1', 'security_group_id': 'db', 'remote_group_id': 'web',
+     'ethertype': 'IPv4'},
+    {'id': 'f2', 'security_group_id': 'web', 'remote_group_id': 'db',
+     'ethertype': 'IPv4'},
+    {'id': 'f3', 'security_group_id': 'web', 'remote_group_id': 'db',
+     'ethertype': 'IPv6'},
+    {'id': 'f4', 'security_group_id': 'web', 'remote_group_id': None,
+     'ethertype': 'IPv4'},
+]
 
 
 class CLITestV20SecurityGroupsJSON(test_cli20.CLITestV20Base):
@@ -426,6 +499,253 @@ class CLITestV20SecurityGroupsJSON(test_cli20.CLITestV20Base):
         self._test_list_security_group_rules_extend(args=args,
                                                     query_field=True)
 
+    def test_security_group_check(self):
+        cmd = securitygroup.CheckPortSecurityPolicy(
+            test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self._expect_request(
+            'GET', self.client.port_path % 'p1',
+            '&'.join('fields=%s' % f for f in sgpolicy.PORT_FIELDS),
+            {'port': {'id': 'p1', 'tenant_id': 't1',
+                      'security_groups': ['sg1', 'sg2']}})
+        self._expect_request(
+            'GET', self.client.security_group_rules_path,
+            'security_group_id=sg1&security_group_id=sg2',
+            {'security_group_rules': POLICY_RULES[3:5]})
+        self._expect_request(
+            'GET', self.client.ports_path,
+            'fields=fixed_ips&fields=security_groups&tenant_id=t1',
+            {'ports': [{'security_groups': ['sg-web'],
+                        'fixed_ips': [{'ip_address': '2001:db8::5'}]}]})
+        _str = self._run_command(cmd, ['-f', 'json', '--explain', 'p1',
+                                       'ingress,udp,2001:db8::5,53',
+                                       'ingress,udp,2001:db8::6,53',
+                                       'egress,any,8.8.8.8'])
+        self.assertEqual(
+            [{'direction': 'ingress', 'protocol': 'udp',
+              'remote_ip': '2001:db8::5', 'port': '53', 'allowed': True,
+              'rules': 'r5'},
+             {'direction': 'ingress', 'protocol': 'udp',
+              'remote_ip': '2001:db8::6', 'port': '53', 'allowed': False,
+              'rules': ''},
+             {'direction': 'egress', 'protocol': 'any',
+              'remote_ip': '8.8.8.8', 'port': '', 'allowed': True,
+              'rules': 'r4'}],
+            jsonutils.loads(_str))
+
+    def test_security_group_check_invalid_flow(self):
+        cmd = securitygroup.CheckPortSecurityPolicy(
+            test_cli20.MyApp(sys.stdout), None)
+        self.assertRaises(exceptions.CommandError, self._run_command, cmd,
+                          ['p1', 'ingress,tcp,10.0.0.300,22'])
+
+    def _test_security_group_compact(self, dry_run):
+        cmd = securitygroup.CompactSecurityGroup(
+            test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self._expect_request('GET', self.client.security_group_rules_path,
+                             'security_group_id=sg1',
+                             {'security_group_rules': COMPACTED_RULES[:4]})
+        args = ['-f', 'json', '-c', 'action', '-c', 'id',
+                '-c', 'remote_ip_prefix', '--concurrency', '1', 'sg1']
+        created = 'c10'
+        if dry_run:
+            args.insert(0, '--dry-run')
+            created = ''
+        else:
+            new_rule = _sg_rule(None, '10.0.0.0/23')
+            del new_rule['id']
+            del new_rule['remote_group_id']
+            self._expect_request(
+                'POST', self.client.security_group_rules_path,
+                body={'security_group_rules': [new_rule]},
+                response={'security_group_rules': [
+                    _sg_rule('c10', '10.0.0.0/23')]}, status_code=201)
+            for _id in ('c1', 'c2', 'c3'):
+                self._expect_request(
+                    'DELETE', self.client.security_group_rule_path % _id,
+                    status_code=204)
+        _str = self._run_command(cmd, args)
+        self.assertEqual(
+            [{'action': 'create', 'id': created,
+              'remote_ip_prefix': '10.0.0.0/23'},
+             {'action': 'delete', 'id': 'c1',
+              'remote_ip_prefix': '10.0.0.0/25'},
+             {'action': 'delete', 'id': 'c2',
+              'remote_ip_prefix': '10.0.0.128/25'},
+             {'action': 'delete', 'id': 'c3',
+              'remote_ip_prefix': '10.0.1.0/24'}],
+            jsonutils.loads(_str))
+
+    def test_security_group_compact(self):
+        self._test_security_group_compact(dry_run=False)
+
+    def test_security_group_compact_dry_run(self):
+        self._test_security_group_compact(dry_run=True)
+
+    def test_security_group_fanout(self):
+        cmd = securitygroup.ListRemoteGroupFanOut(
+            test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self._expect_request(
+            'GET', self.client.ports_path,
+            '&'.join('fields=%s' % f for f in sgfanout.PORT_FIELDS) +
+            '&tenant_id=t1', {'ports': FANOUT_PORTS})
+        self._expect_request(
+            'GET', self.client.security_group_rules_path,
+            '&'.join('fields=%s' % f for f in sgfanout.RULE_FIELDS) +
+            '&tenant_id=t1', {'security_group_rules': FANOUT_RULES})
+        _str = self._run_command(cmd, ['-f', 'json', '-c', 'id',
+                                       '-c', 'pairs', '-c', 'suggestion',
+                                       '--concurrency', '1', '--top', '2',
+                                       '--tenant-id', 't1'])
+        self.assertEqual(
+            [{'id': 'f1', 'pairs': 24, 'suggestion': '10.0.0.0/29'},
+             {'id': 'f2', 'pairs': 24, 'suggestion': ''}],
+            jsonutils.loads(_str))
+
 
 class CLITestV20SecurityGroupsXML(CLITestV20SecurityGroupsJSON):
     format = 'xml'
+
+
+class PortPolicyTest(testtools.TestCase):
+    def setUp(self):
+        super(PortPolicyTest, self).setUp()
+        self.policy = sgpolicy.PortPolicy(
+            POLICY_RULES, {'sg-web': ['2001:db8::5', '10.0.0.9']})
+
+    def _allows(self, flow):
+        return self.policy.allows(**sgpolicy.parse_flow(flow))
+
+    def test_allows_port_and_prefix(self):
+        self.assertTrue(self._allows('ingress,tcp,10.0.0.5,22'))
+        self.assertFalse(self._allows('ingress,tcp,10.0.1.5,22'))
+        self.assertTrue(self._allows('ingress,tcp,8.8.8.8,443'))
+        self.assertFalse(self._allows('ingress,tcp,8.8.8.8,444'))
+        self.assertFalse(self._allows('ingress,udp,8.8.8.8,443'))
+
+    def test_allows_overlapping_rules(self):
+        self.assertTrue(self._allows('ingress,tcp,10.0.1.5,1600'))
+        self.assertTrue(self._allows('ingress,tcp,10.0.0.5,1600'))
+        self.assertTrue(self._allows('ingress,tcp,10.0.0.5,2500'))
+        self.assertFalse(self._allows('ingress,tcp,10.0.0.5,999'))
+        self.assertFalse(self._allows('ingress,tcp,10.0.1.5,2001'))
+        self.assertFalse(self._allows('ingress,tcp,10.0.0.5,2501'))
+
+    def test_allows_icmp(self):
+        self.assertTrue(self._allows('ingress,icmp,8.8.8.8,8'))
+        self.assertTrue(self._allows('ingress,1,8.8.8.8,8/3'))
+        self.assertFalse(self._allows('ingress,icmp,8.8.8.8,0'))
+
+    def test_allows_any_protocol(self):
+        self.assertTrue(self._allows('egress,any,8.8.8.8'))
+        self.assertTrue(self._allows('egress,udp,8.8.8.8,53'))
+        self.assertFalse(self._allows('egress,udp,2001:db8::1,53'))
+
+    def test_allows_remote_group(self):
+        self.assertTrue(self._allows('ingress,udp,2001:db8::5,53'))
+        self.assertFalse(self._allows('ingress,udp,2001:db8::6,53'))
+        self.assertFalse(self._allows('ingress,udp,10.0.0.9,53'))
+
+    def test_port_security_disabled(self):
+        policy = sgpolicy.PortPolicy([], enabled=False)
+        self.assertTrue(policy.allows('ingress', '8.8.8.8', 'tcp', 22))
+        self.assertFalse(sgpolicy.PortPolicy([]).allows('ingress', '8.8.8.8',
+                                                        'tcp', 22))
+
+    def test_matching_rules(self):
+        self.assertEqual(['r7'], [rule['id'] for rule in
+                                  self.policy.matching_rules(
+                                      'ingress', '10.0.0.5', 'tcp', 1600)])
+
+    def test_parse_flow_invalid(self):
+        for flow in ('ingress,tcp', 'inbound,tcp,10.0.0.1,22',
+                     'ingress,tcp,10.0.0.1,ssh', 'ingress,tcp,host,22'):
+            self.assertRaises(ValueError, sgpolicy.parse_flow, flow)
+
+    def test_portless_flow(self):
+        for flow in ('ingress,tcp,10.0.0.1', 'ingress,udp,10.0.0.1',
+                     'ingress,icmp,10.0.0.1'):
+            self.assertRaises(ValueError, sgpolicy.parse_flow, flow)
+        self.assertRaises(ValueError, self.policy.allows,
+                          'ingress', '10.0.0.5', 'tcp')
+        self.assertTrue(self._allows('egress,any,8.8.8.8'))
+        self.assertFalse(self._allows('ingress,gre,8.8.8.8'))
+
+    def test_allows_agrees_with_matching_rules(self):
+        rand = random.Random(42)
+        rules = []
+        for i in range(300):
+            port_min = rand.randint(1, 65000)
+            rules.append({
+                'id': 'r%d' % i, 'direction': rand.choice(sgpolicy.DIRECTIONS),
+                'ethertype': 'IPv4', 'protocol': rand.choice(['tcp', 'udp']),
+                'port_range_min': port_min,
+                'port_range_max': port_min + rand.randint(0, 500),
+                'remote_ip_prefix': '10.%d.%d.0/%d' % (
+                    rand.randint(0, 3), rand.randint(0, 255),
+                    rand.choice([8, 16, 24])),
+                'remote_group_id': None})
+        policy = sgpolicy.PortPolicy(rules)
+        for i in range(2000):
+            flow = (rand.choice(sgpolicy.DIRECTIONS),
+                    '10.%d.%d.1' % (rand.randint(0, 3), rand.randint(0, 255)),
+                    rand.choice(['tcp', 'udp']), rand.randint(1, 65535))
+            self.assertEqual(bool(policy.matching_rules(*flow)),
+                             policy.allows(*flow))
+
+
+class CompactionTest(testtools.TestCase):
+    def test_plan_compaction(self):
+        to_create, to_delete = sgcompact.plan_compaction(COMPACTED_RULES)
+        self.assertEqual(
+            [('egress', None, '2001:db8::/32'),
+             ('ingress', 22, '10.0.0.0/23')],
+            [(r['direction'], r['port_range_min'], r['remote_ip_prefix'])
+             for r in to_create])
+        self.assertEqual(['c8', 'c9', 'c1', 'c2', 'c3', 'c5'],
+                         [r['id'] for r in to_delete])
+        self.assertEqual([('sg1', 'tenant1')] * 2,
+                         [(r['security_group_id'], r['tenant_id'])
+                          for r in to_create])
+
+    def test_plan_compaction_nothing_to_merge(self):
+        self.assertEqual(([], []), sgcompact.plan_compaction(
+            [COMPACTED_RULES[3], COMPACTED_RULES[6]]))
+
+    def test_plan_compaction_does_not_widen(self):
+        rand = random.Random(3)
+        rules = [_sg_rule('r%d' % i, '10.%d.%d.%d/%d' % (
+            rand.randint(0, 1), rand.randint(0, 255),
+            rand.randint(0, 255), rand.choice([24, 25, 26, 28, 32])))
+            for i in range(500)]
+        to_create, to_delete = sgcompact.plan_compaction(rules)
+        deleted = set(r['id'] for r in to_delete)
+        after = ([r['remote_ip_prefix'] for r in rules
+                  if r['id'] not in deleted] +
+                 [r['remote_ip_prefix'] for r in to_create])
+        self.assertEqual(
+            netaddr.IPSet(r['remote_ip_prefix'] for r in rules),
+            netaddr.IPSet(after))
+        self.assertLess(len(after), len(rules))
+        self.assertEqual(len(after), len(netaddr.IPSet(after).iter_cidrs()))
+
+
+class FanOutTest(testtools.TestCase):
+    def test_costs(self):
+        fanout = sgfanout.FanOut()
+        fanout.add_ports(FANOUT_PORTS[:5])
+        fanout.add_ports(FANOUT_PORTS[5:])
+        fanout.add_rules(FANOUT_RULES)
+        self.assertEqual(
+            [('f1', 3, 8, 24, 1, 3), ('f2', 8, 3, 24, 3, 24),
+             ('f3', 8, 3, 24, 0, 0)],
+            [(r['id'], r['ports'], r['remote_ports'], r['pairs'],
+              r['cidrs'], r['cidr_pairs']) for r in fanout.costs()])
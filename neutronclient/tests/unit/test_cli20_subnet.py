@@ -17,10 +17,36 @@
 import sys
 
 from mox3 import mox
+from oslo.serialization import jsonutils
+import testtools
 
 from neutronclient.common import exceptions
 from neutronclient.neutron.v2_0 import subnet
 from neutronclient.tests.unit import test_cli20
+from neutronclient.v2_0 import cidrs
+from neutronclient.v2_0 import utilization
+
+
+UTILIZATION_SUBNETS = [
+    {'id': 'sub1', 'name': 'small', 'network_id': 'net1',
+     'cidr': '10.0.0.0/29', 'ip_version': 4,
+     'allocation_pools': [{'start': '10.0.0.2', 'end': '10.0.0.3'},
+                          {'start': '10.0.0.5', 'end': '10.0.0.6'}]},
+    {'id': 'sub6', 'name': 'v6', 'network_id': 'net1',
+     'cidr': '2001:db8::/64', 'ip_version': 6,
+     'allocation_pools': [{'start': '2001:db8::2',
+                           'end': '2001:db8::ffff:ffff:ffff:ffff'}]},
+]
+UTILIZATION_PORTS = [
+    # the gateway is outside of the allocation pools
+    {'fixed_ips': [{'subnet_id': 'sub1', 'ip_address': '10.0.0.1'}]},
+    {'fixed_ips': [{'subnet_id': 'sub1', 'ip_address': '10.0.0.2'},
+                   {'subnet_id': 'sub6', 'ip_address': '2001:db8::2'}]},
+    {'fixed_ips': [{'subnet_id': 'sub1', 'ip_address': '10.0.0.3'}]},
+    {'fixed_ips': [{'subnet_id': 'sub1', 'ip_address': '10.0.0.6'}]},
+    # a subnet which is not reported
+    {'fixed_ips': [{'subnet_id': 'other', 'ip_address': '10.9.0.2'}]},
+]
 
 
 class CLITestV20SubnetJSON(test_cli20.CLITestV20Base):
@@ -603,6 +629,139 @@ class CLITestV20SubnetJSON(test_cli20.CLITestV20Base):
         args = [myid]
         self._test_delete_resource(resource, cmd, myid, args)
 
+    def _test_create_subnet_auto_cidr(self, args, query, subnets, cidr,
+                                      ip_version=4, token_tenant_id=None):
+        cmd = subnet.CreateSubnet(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        if token_tenant_id:
+            self._expect_request(
+                'GET', self.client.quota_path % 'tenant',
+                response={'tenant': {'tenant_id': token_tenant_id}})
+        self._expect_request('GET', self.client.subnets_path, query,
+                             {'subnets': [{'cidr': c} for c in subnets]})
+        self._expect_request(
+            'POST', self.client.subnets_path,
+            body={'subnet': {'cidr': cidr, 'network_id': 'netid',
+                             'ip_version': ip_version}},
+            response={'subnet': {'id': 'myid', 'cidr': cidr}})
+        _str = self._run_command(cmd, args)
+        self.assertIn(cidr, _str)
+
+    def test_create_subnet_auto_cidr(self):
+        """Create subnet: --auto-cidr 10.0.0.0/16/24 netid."""
+        self._test_create_subnet_auto_cidr(
+            ['--auto-cidr', '10.0.0.0/16/24', 'netid'],
+            'fields=cidr&ip_version=4',
+            ['10.0.0.0/24', '10.0.1.0/25', '10.1.0.0/24'], '10.0.2.0/24')
+
+    def test_create_subnet_auto_cidr_best_fit_in_network(self):
+        """Create subnet: --auto-cidr 2001:db8::/56/64 --auto-cidr-fit best
+        --auto-cidr-scope network netid.
+        """
+        self._test_create_subnet_auto_cidr(
+            ['--auto-cidr', '2001:db8::/56/64', '--auto-cidr-fit', 'best',
+             '--auto-cidr-scope', 'network', 'netid'],
+            'fields=cidr&ip_version=6&network_id=netid',
+            ['2001:db8::/64', '2001:db8:0:2::/64'], '2001:db8:0:1::/64',
+            ip_version=6)
+
+    def test_create_subnet_auto_cidr_in_token_tenant(self):
+        """Create subnet: --auto-cidr 10.0.0.0/16/24
+        --auto-cidr-scope tenant netid.
+        """
+        self._test_create_subnet_auto_cidr(
+            ['--auto-cidr', '10.0.0.0/16/24', '--auto-cidr-scope', 'tenant',
+             'netid'],
+            'fields=cidr&ip_version=4&tenant_id=tid',
+            ['10.0.0.0/24'], '10.0.1.0/24', token_tenant_id='tid')
+
+    def test_create_subnet_requires_cidr_or_auto_cidr(self):
+        cmd = subnet.CreateSubnet(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self.assertRaises(exceptions.CommandError, self._run_command,
+                          cmd, ['netid'])
+
+    def test_create_subnet_invalid_auto_cidr(self):
+        cmd = subnet.CreateSubnet(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self.assertRaises(exceptions.CommandError, self._run_command,
+                          cmd, ['--auto-cidr', '10.0.0.0/16', 'netid'])
+
+    def _test_subnet_utilization(self, args):
+        cmd = subnet.ListSubnetUtilization(test_cli20.MyApp(sys.stdout),
+                                           None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self._expect_request(
+            'GET', self.client.subnets_path,
+            '&'.join('fields=%s' % f for f in utilization.SUBNET_FIELDS),
+            {'subnets': UTILIZATION_SUBNETS})
+        self._expect_request('GET', self.client.ports_path,
+                             'fields=fixed_ips', {'ports': UTILIZATION_PORTS})
+        return jsonutils.loads(self._run_command(cmd, ['-f', 'json'] + args))
+
+    def test_subnet_utilization(self):
+        rows = self._test_subnet_utilization(['--threshold', '1'])
+        self.assertEqual(
+            [{'id': 'sub1', 'name': 'small', 'network_id': 'net1',
+              'cidr': '10.0.0.0/29', 'size': 4, 'used': 3, 'free': 1,
+              'percent': 75.0}],
+            rows)
+
+    def test_subnet_utilization_by_network(self):
+        rows = self._test_subnet_utilization(['--by-network'])
+        self.assertEqual(
+            [{'network_id': 'net1', 'subnets': 2, 'size': 4 + 2 ** 64 - 2,
+              'used': 4, 'free': 2 ** 64 - 2, 'percent': 0.0}],
+            rows)
+
 
 class CLITestV20SubnetXML(CLITestV20SubnetJSON):
     format = 'xml'
+
+
+class CidrAllocatorTest(testtools.TestCase):
+    def test_first_fit(self):
+        allocator = cidrs.CidrAllocator(
+            '10.0.0.0/16', ['10.0.0.0/24', '10.0.2.0/23', '10.0.4.0/26',
+                            '192.168.0.0/24'])
+        self.assertEqual('10.0.1.0/24', str(allocator.allocate(24)))
+        self.assertEqual('10.0.5.0/24', str(allocator.allocate(24)))
+        self.assertEqual('10.0.4.64/26', str(allocator.allocate(26)))
+
+    def test_best_fit(self):
+        allocator = cidrs.CidrAllocator('10.0.0.0/16',
+                                        ['10.0.0.0/24', '10.0.2.0/23',
+                                         '10.0.5.0/24', '10.0.6.0/23'])
+        # 10.0.1.0/24 and 10.0.4.0/24 are the smallest free blocks
+        self.assertEqual('10.0.1.0/26', str(allocator.allocate(26, True)))
+        self.assertEqual('10.0.1.64/26', str(allocator.allocate(26, True)))
+        self.assertEqual('10.0.8.0/22', str(allocator.allocate(22, True)))
+
+    def test_allocate_many(self):
+        allocator = cidrs.CidrAllocator('10.0.0.0/22', ['10.0.0.0/26'])
+        self.assertEqual(['10.0.0.64/26', '10.0.1.0/24', '10.0.2.0/23'],
+                         [str(block) for block in
+                          allocator.allocate_many([26, 24, 23])])
+        self.assertEqual(['10.0.0.128/25'],
+                         [str(block) for block in allocator.free_blocks()])
+
+    def test_exhausted(self):
+        allocator = cidrs.CidrAllocator('10.0.0.0/24', ['10.0.0.0/25'])
+        allocator.allocate(25)
+        self.assertRaises(exceptions.NoFreeCidr, allocator.allocate, 30)
+        allocator = cidrs.CidrAllocator('10.0.0.0/24')
+        self.assertRaises(exceptions.NoFreeCidr, allocator.allocate, 23)
+
+    def test_thousands_of_subnets(self):
+        used = ['10.%d.%d.0/24' % (i // 256, i % 256)
+                for i in range(0, 8192, 2)]
+        allocator = cidrs.CidrAllocator('10.0.0.0/8', used)
+        self.assertEqual(['10.0.1.0/24', '10.0.3.0/24', '10.32.0.0/16'],
+                         [str(block) for block in
+                          allocator.allocate_many([24, 24, 16])])
@@ -0,0 +1,161 @@
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import sys
+
+import fixtures
+from oslo.serialization import jsonutils
+import testtools
+
+from neutronclient.common import exceptions
+from neutronclient.neutron.v2_0 import topology as topology_cmd
+from neutronclient.tests.unit import test_cli20
+from neutronclient.v2_0 import inventory
+from neutronclient.v2_0 import topology
+
+RESOURCES = {
+    'networks': [{'id': 'ext', 'name': 'public'},
+                 {'id': 'net1', 'name': 'private'}],
+    'subnets': [{'id': 'sub-ext', 'network_id': 'ext',
+                 'cidr': '172.24.4.0/24'},
+                {'id': 'sub1', 'network_id': 'net1', 'cidr': '10.0.0.0/24'},
+                {'id': 'sub2', 'network_id': 'net1', 'cidr': '10.0.1.0/24'}],
+    'routers': [{'id': 'r1', 'name': 'router1',
+                 'external_gateway_info': {'network_id': 'ext'}}],
+    'ports': [
+        {'id': 'gw', 'network_id': 'ext', 'device_id': 'r1',
+         'device_owner': 'network:router_gateway',
+         'fixed_ips': [{'subnet_id': 'sub-ext', 'ip_address': '172.24.4.2'}],
+         'security_groups': []},
+        {'id': 'if1', 'network_id': 'net1', 'device_id': 'r1',
+         'device_owner': 'network:router_interface',
+         'fixed_ips': [{'subnet_id': 'sub1', 'ip_address': '10.0.0.1'}],
+         'security_groups': []},
+        {'id': 'vm1', 'name': 'web', 'network_id': 'net1',
+         'device_id': 'instance1', 'device_owner': 'compute:nova',
+         'fixed_ips': [{'subnet_id': 'sub1', 'ip_address': '10.0.0.3'}],
+         'security_groups': ['sg1']},
+        {'id': 'vm2', 'name': 'db', 'network_id': 'net1',
+         'device_id': 'instance2', 'device_owner': 'compute:nova',
+         'fixed_ips': [{'subnet_id': 'sub2', 'ip_address': '10.0.1.3'}],
+         'security_groups': ['sg1']}],
+    'floatingips': [{'id': 'fip1', 'floating_network_id': 'ext',
+                     'router_id': 'r1', 'port_id': 'vm1',
+                     'floating_ip_address': '172.24.4.10',
+                     'fixed_ip_address': '10.0.0.3'}],
+    'security_groups': [{'id': 'sg1', 'name': 'default'}],
+}
+
+
+class TopologyTest(testtools.TestCase):
+    def setUp(self):
+        super(TopologyTest, self).setUp()
+        self.graph = topology.Topology(RESOURCES)
+
+    def test_field_values(self):
+        port = RESOURCES['ports'][2]
+        self.assertEqual(['sub1'],
+                         topology.field_values(port, 'fixed_ips.subnet_id'))
+        self.assertEqual(['sg1'],
+                         topology.field_values(port, 'security_groups'))
+        self.assertEqual([], topology.field_values(port, 'missing.field'))
+
+    def test_lookup(self):
+        self.assertEqual(['sub1', 'sub2'],
+                         sorted(s['id'] for s in
+                                self.graph.lookup('subnet', 'network_id',
+                                                  'net1')))
+        self.assertEqual(['vm1', 'vm2'],
+                         sorted(p['id'] for p in
+                                self.graph.lookup('port', 'security_groups',
+                                                  'sg1')))
+
+    def test_ports_behind_router(self):
+        self.assertEqual(['sub1'], [s['id'] for s in
+                                    self.graph.router_subnets('r1')])
+        self.assertEqual(['vm1'], [p['id'] for p in
+                                   self.graph.ports_behind_router('r1')])
+
+    def test_trace_floatingip(self):
+        self.assertEqual(
+            [('floatingip', 'fip1'), ('network', 'ext'), ('router', 'r1'),
+             ('port', 'vm1'), ('subnet', 'sub1'), ('network', 'net1')],
+            [(rtype, item['id'])
+             for rtype, item in self.graph.trace_floatingip('fip1')])
+
+    def test_neighbors(self):
+        self.assertEqual(['ext', 'fip1', 'gw', 'if1'],
+                         sorted(n['id'] for n in self.graph.neighbors('r1')))
+
+    def test_find(self):
+        self.assertEqual('r1', self.graph.find('router', 'router1')['id'])
+        self.assertEqual('r1', self.graph.find('router', 'r1')['id'])
+        self.assertRaises(exceptions.NotFound,
+                          self.graph.find, 'router', 'router2')
+
+    def test_to_dict(self):
+        graph = self.graph.to_dict()
+        self.assertEqual(12, len(graph['nodes']))
+        self.assertIn({'source': 'vm1', 'target': 'sub1',
+                       'field': 'fixed_ips.subnet_id'}, graph['edges'])
+        # device_id references to instances are not edges of the graph
+        self.assertNotIn('instance1',
+                         [edge['target'] for edge in graph['edges']])
+
+    def test_to_dot(self):
+        dot = self.graph.to_dot()
+        self.assertTrue(dot.startswith('digraph neutron {\n'))
+        self.assertIn('  "r1" [label="router\\nrouter1"];\n', dot)
+        self.assertIn('  "fip1" -> "vm1" [label="port_id"];\n', dot)
+
+
+class CLITestV20Topology(test_cli20.CLITestV20Base):
+    def setUp(self):
+        super(CLITestV20Topology, self).setUp()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'inventory.db')
+        inventory.write_snapshot(self.path, RESOURCES)
+
+    def _test_command(self, cmd_class, args):
+        cmd = cmd_class(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        return self._run_command(cmd, ['--from-snapshot', self.path] + args)
+
+    def test_topology_export_json(self):
+        _str = self._test_command(topology_cmd.ExportTopology,
+                                  ['--output-format', 'json'])
+        self.assertEqual(topology.Topology(RESOURCES).to_dict(),
+                         jsonutils.loads(_str))
+
+    def test_topology_router_ports(self):
+        _str = self._test_command(topology_cmd.ListPortsBehindRouter,
+                                  ['-f', 'json', '-c', 'id', '-c', 'name',
+                                   'router1'])
+        self.assertEqual([{'id': 'vm1', 'name': 'web'}],
+                         jsonutils.loads(_str))
+
+    def test_topology_floatingip_trace(self):
+        _str = self._test_command(topology_cmd.TraceFloatingIP,
+                                  ['-f', 'csv', '--quote', 'none', 'fip1'])
+        self.assertEqual(['type,id,name,detail',
+                          'floatingip,fip1,,172.24.4.10 -> 10.0.0.3',
+                          'network,ext,public,',
+                          'router,r1,router1,',
+                          'port,vm1,web,compute:nova instance1',
+                          'subnet,sub1,,10.0.0.0/24',
+                          'network,net1,private,'],
+                         _str.splitlines())
@@ -16,6 +16,8 @@
 
 import sys
 
+from oslo.serialization import jsonutils
+
 from neutronclient.common import exceptions
 from neutronclient.neutron.v2_0 import quota as test_quota
 from neutronclient.tests.unit import test_cli20
@@ -42,3 +44,40 @@ class CLITestV20Quota(test_cli20.CLITestV20Base):
     def test_delete_quota_get_parser(self):
         cmd = test_cli20.MyApp(sys.stdout)
         test_quota.DeleteQuota(cmd, None).get_parser(cmd)
+
+    def test_quota_usage(self):
+        cmd = test_quota.ListQuotaUsage(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self._expect_request(
+            'GET', self.client.quotas_path, None,
+            {'quotas': [{'tenant_id': 't1', 'network': 2, 'port': -1}]})
+        self._expect_request(
+            'GET', self.client.networks_path, 'fields=tenant_id',
+            {'networks': [{'tenant_id': 't1'}, {'tenant_id': 't1'},
+                          {'tenant_id': 't2'}]})
+        self._expect_request(
+            'GET', self.client.ports_path, 'fields=tenant_id',
+            {'ports': [{'tenant_id': 't1'}, {'tenant_id': 't2'},
+                       {'tenant_id': 't2'}, {'tenant_id': 't3'}]})
+        self._expect_request(
+            'GET', self.client.quota_path % 't2', None,
+            {'quota': {'network': 10, 'port': 50}})
+        _str = self._run_command(cmd, ['-f', 'json', '--concurrency', '1',
+                                       '--resource', 'port',
+                                       '--resource', 'network'])
+        self.assertEqual(
+            [{'tenant_id': 't1', 'resource': 'network', 'used': 2,
+              'limit': 2, 'percent': 100},
+             {'tenant_id': 't1', 'resource': 'port', 'used': 1,
+              'limit': -1, 'percent': ''},
+             {'tenant_id': 't2', 'resource': 'network', 'used': 1,
+              'limit': 10, 'percent': 10},
+             {'tenant_id': 't2', 'resource': 'port', 'used': 2,
+              'limit': 50, 'percent': 4},
+             {'tenant_id': 't3', 'resource': 'network', 'used': 0,
+              'limit': 10, 'percent': 0},
+             {'tenant_id': 't3', 'resource': 'port', 'used': 1,
+              'limit': 50, 'percent': 2}],
+            jsonutils.loads(_str))
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+
 import testtools
 
 from neutronclient.common import exceptions
@@ -108,3 +110,31 @@ class ImportClassTestCase(testtools.TestCase):
         self.assertRaises(
             exceptions.UnsupportedVersion,
             utils.get_client_class, 'image', '2', {'image': '2'})
+
+
+class ConcurrentMapTest(testtools.TestCase):
+
+    def test_keeps_order(self):
+        self.assertEqual([i * 2 for i in range(50)],
+                         utils.concurrent_map(lambda i: i * 2, range(50), 8))
+
+    def test_inline_when_single_worker(self):
+        threads = set()
+
+        def _record(item):
+            threads.add(threading.current_thread())
+
+        utils.concurrent_map(_record, range(5), 1)
+        self.assertEqual(set([threading.current_thread()]), threads)
+
+    def test_reraises_first_error(self):
+        def _fail(item):
+            if item == 3:
+                raise ValueError(item)
+            return item
+
+        self.assertRaises(ValueError, utils.concurrent_map, _fail, range(10),
+                          4)
+
+    def test_empty(self):
+        self.assertEqual([], utils.concurrent_map(lambda i: i, []))
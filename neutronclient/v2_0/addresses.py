@@ -0,0 +1,187 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Reverse lookup of IP and MAC addresses to ports and subnets."""
+
+import bisect
+
+import netaddr
+
+from neutronclient.i18n import _
+
+PORT_FIELDS = ['id', 'mac_address', 'fixed_ips', 'device_id', 'network_id']
+SUBNET_FIELDS = ['id', 'cidr', 'network_id']
+
+COLUMNS = ['address', 'port_id', 'mac_address', 'ip_address', 'device_id',
+           'network_id', 'subnet_id', 'cidr']
+
+
+def normalize_mac(mac):
+    return ':'.join('%02x' % byte for byte in netaddr.EUI(mac).words)
+
+
+class _CidrTree(object):
+    """Containment queries over the CIDRs of one IP version.
+
+    CIDRs are either nested or disjoint, so once sorted by first address
+    (and largest first on ties) each CIDR only needs a pointer to its
+    smallest enclosing CIDR: the CIDRs containing an address are the
+    last CIDR starting at or before the address, found by bisection, or
+    its first ancestor containing the address, followed by the ancestors
+    of that one.
+    """
+
+    def __init__(self, networks):
+        # networks: dict of netaddr.IPNetwork to the subnets having it
+        nets = sorted(networks, key=lambda net: (net.first, -net.last))
+        self.starts = [net.first for net in nets]
+        self.lasts = [net.last for net in nets]
+        self.subnets = [networks[net] for net in nets]
+        self.parents = []
+        stack = []
+        for i, net in enumerate(nets):
+            while stack and self.lasts[stack[-1]] < net.first:
+                stack.pop()
+            self.parents.append(stack[-1] if stack else None)
+            stack.append(i)
+
+    def containing(self, value):
+        """Return the subnets containing value, the innermost first."""
+        node = bisect.bisect_right(self.starts, value) - 1
+        if node < 0:
+            return []
+        while node is not None and self.lasts[node] < value:
+            node = self.parents[node]
+        found = []
+        while node is not None:
+            found.extend(self.subnets[node])
+            node = self.parents[node]
+        return found
+
+
+class AddressIndex(object):
+    """Index of the addresses of a set of ports and subnets.
+
+    Port IPs and MACs are kept in hash maps for exact matches, and subnet
+    CIDRs in a sorted structure answering containment queries in
+    O(log n), so that a batch of addresses is resolved without any
+    request.
+
+    :param ports: ports having at least the PORT_FIELDS
+    :param subnets: subnets having at least the SUBNET_FIELDS
+    """
+
+    def __init__(self, ports=(), subnets=()):
+        self.by_ip = {}
+        self.by_mac = {}
+        self.subnets = {}
+        self.add_ports(ports)
+        self.set_subnets(subnets)
+
+    def add_ports(self, ports):
+        for port in ports:
+            if port.get('mac_address'):
+                self.by_mac.setdefault(normalize_mac(port['mac_address']),
+                                       []).append(port)
+            for fixed_ip in port.get('fixed_ips') or []:
+                ip = netaddr.IPAddress(fixed_ip['ip_address'])
+                self.by_ip.setdefault(ip, []).append((port, fixed_ip))
+
+    def set_subnets(self, subnets):
+        networks = {4: {}, 6: {}}
+        for subnet in subnets:
+            self.subnets[subnet['id']] = subnet
+            net = netaddr.IPNetwork(subnet['cidr']).cidr
+            networks[net.version].setdefault(net, []).append(subnet)
+        self._trees = dict((version, _CidrTree(nets))
+                           for version, nets in networks.items())
+
+    def _row(self, address, port=None, fixed_ip=None, subnet=None):
+        subnet = subnet or (fixed_ip and
+                            self.subnets.get(fixed_ip.get('subnet_id')))
+        port = port or {}
+        return {'address': address,
+                'port_id': port.get('id'),
+                'mac_address': port.get('mac_address'),
+                'ip_address': fixed_ip and fixed_ip['ip_address'],
+                'device_id': port.get('device_id'),
+                'network_id': (port.get('network_id') or
+                               (subnet or {}).get('network_id')),
+                'subnet_id': ((fixed_ip or {}).get('subnet_id') or
+                              (subnet or {}).get('id')),
+                'cidr': (subnet or {}).get('cidr')}
+
+    def containing_subnets(self, ip):
+        """Return the subnets whose CIDR contains ip, innermost first."""
+        ip = netaddr.IPAddress(ip)
+        return self._trees[ip.version].containing(int(ip))
+
+    def lookup_ip(self, address):
+        """Return the ports having an IP, else the subnets containing it.
+
+        Overlapping tenant networks can make several ports share an IP,
+        in which case a row is returned for each of them.
+        """
+        ports = self.by_ip.get(netaddr.IPAddress(address), [])
+        if ports:
+            return [self._row(address, port, fixed_ip)
+                    for port, fixed_ip in ports]
+        return [self._row(address, subnet=subnet)
+                for subnet in self.containing_subnets(address)]
+
+    def lookup_mac(self, address):
+        """Return the ports having a MAC address, one row per fixed IP."""
+        rows = []
+        for port in self.by_mac.get(normalize_mac(address), []):
+            rows.extend(self._row(address, port, fixed_ip)
+                        for fixed_ip in port.get('fixed_ips') or [None])
+        return rows
+
+    def lookup(self, address):
+        """Resolve an IP or MAC address into rows with the COLUMNS keys.
+
+        :raises: ValueError if address is neither an IP nor a MAC address
+        """
+        if netaddr.valid_ipv4(address) or netaddr.valid_ipv6(address):
+            return self.lookup_ip(address)
+        if netaddr.valid_mac(address):
+            return self.lookup_mac(address)
+        raise ValueError(_("%s is neither an IP nor a MAC address") %
+                         address)
+
+
+def load_address_index(client, max_workers=None, **_params):
+    """Build an AddressIndex with one pass over the ports and subnets.
+
+    Ports are added to the index page by page as they are received, and
+    the subnets are listed concurrently with them.
+
+    :param _params: filters passed to both list requests
+    """
+    index = AddressIndex()
+
+    def _ports():
+        for page in client.list_ports(retrieve_all=False,
+                                      fields=PORT_FIELDS, **_params):
+            index.add_ports(page['ports'])
+
+    def _subnets():
+        index.set_subnets(client.list_subnets(fields=SUBNET_FIELDS,
+                                              **_params)['subnets'])
+
+    client.concurrent_map(lambda load: load(), [_ports, _subnets],
+                          max_workers)
+    return index
@@ -0,0 +1,356 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Helpers operating on the whole set of Neutron agents at once."""
+
+import time
+
+from oslo.utils import timeutils
+
+from neutronclient.common import exceptions
+from neutronclient.i18n import _
+
+DHCP_AGENT = 'DHCP agent'
+L3_AGENT = 'L3 agent'
+LOADBALANCER_AGENT = 'Loadbalancer agent'
+
+AGENT_FIELDS = ['id', 'agent_type', 'host', 'binary', 'alive',
+                'admin_state_up', 'heartbeat_timestamp']
+
+# agent_type: (load key, client method, collection)
+_HOSTED_RESOURCES = {
+    DHCP_AGENT: ('networks', 'list_networks_on_dhcp_agent', 'networks'),
+    L3_AGENT: ('routers', 'list_routers_on_l3_agent', 'routers'),
+    LOADBALANCER_AGENT: ('pools', 'list_pools_on_lbaas_agent', 'pools'),
+}
+LOAD_KEYS = ['networks', 'routers', 'pools']
+
+
+def heartbeat_age(agent, now=None):
+    """Return the number of seconds since the agent last reported.
+
+    None is returned when the agent has no usable heartbeat timestamp.
+    """
+    try:
+        timestamp = timeutils.parse_isotime(agent['heartbeat_timestamp'])
+    except (TypeError, KeyError, ValueError):
+        return None
+    now = now or timeutils.utcnow()
+    return int(timeutils.delta_seconds(timeutils.normalize_time(timestamp),
+                                       now))
+
+
+def _count_hosted(client, agent):
+    load = dict((key, None) for key in LOAD_KEYS)
+    hosted = _HOSTED_RESOURCES.get(agent.get('agent_type'))
+    if hosted:
+        key, method, collection = hosted
+        data = getattr(client, method)(agent['id'], fields='id')
+        load[key] = len(data.get(collection, []))
+    return load
+
+
+def get_agent_load(client, max_workers=None, **_params):
+    """Return every agent along with the number of resources it hosts.
+
+    Agents are listed with a single request, then the networks, routers
+    and pools hosted by each DHCP, L3 and loadbalancer agent are counted
+    with concurrent requests. Each returned agent carries 'networks',
+    'routers' and 'pools' counts (None when not applicable to its type)
+    and a 'heartbeat_age' in seconds.
+
+    :param client: a neutronclient.v2_0.client.Client
+    :param max_workers: maximum number of concurrent requests
+    :param _params: filters passed to list_agents
+    """
+    _params.setdefault('fields', AGENT_FIELDS)
+    agents = client.list_agents(**_params)['agents']
+    loads = client.concurrent_map(lambda agent: _count_hosted(client, agent),
+                                  agents, max_workers)
+    now = timeutils.utcnow()
+    for agent, load in zip(agents, loads):
+        agent.update(load)
+        agent['heartbeat_age'] = heartbeat_age(agent, now)
+    return agents
+
+
+def summarize_load_by_host(agents):
+    """Aggregate the result of get_agent_load per host.
+
+    The heartbeat age of a host is the one of its most lagging agent.
+    """
+    hosts = {}
+    for agent in agents:
+        summary = hosts.setdefault(agent.get('host'), {
+            'host': agent.get('host'), 'agents': 0, 'alive': 0,
+            'heartbeat_age': None, 'networks': 0, 'routers': 0, 'pools': 0})
+        summary['agents'] += 1
+        if agent.get('alive'):
+            summary['alive'] += 1
+        for key in LOAD_KEYS:
+            summary[key] += agent.get(key) or 0
+        age = agent.get('heartbeat_age')
+        if age is not None and (summary['heartbeat_age'] is None or
+                                age > summary['heartbeat_age']):
+            summary['heartbeat_age'] = age
+    return [hosts[host] for host in sorted(hosts, key=str)]
+
+
+def set_agents_admin_state(client, admin_state_up, max_workers=None,
+                           **_params):
+    """Set the admin state of every agent matching the given filters.
+
+    Matching agents are found with a single filtered list request (for
+    instance host='compute-1' or binary='neutron-dhcp-agent') and only
+    those not already in the requested state are updated, concurrently.
+    The matching agents are returned with their new admin state.
+
+    :param client: a neutronclient.v2_0.client.Client
+    :param admin_state_up: the admin state to set
+    :param max_workers: maximum number of concurrent requests
+    :param _params: filters passed to list_agents
+    """
+    _params['fields'] = AGENT_FIELDS
+    agents = client.list_agents(**_params)['agents']
+    changed = [agent for agent in agents
+               if agent.get('admin_state_up') != admin_state_up]
+    body = {'agent': {'admin_state_up': admin_state_up}}
+    client.concurrent_map(lambda agent: client.update_agent(agent['id'],
+                                                            body),
+                          changed, max_workers)
+    for agent in agents:
+        agent['admin_state_up'] = admin_state_up
+    return agents
+
+
+def _wait_until(check, resource, timeout, interval):
+    deadline = time.time() + timeout
+    while not check():
+        if time.time() >= deadline:
+            raise exceptions.WaitTimeout(timeout=timeout, resource=resource)
+        time.sleep(interval)
+
+
+def wait_for_agents_admin_state(client, admin_state_up, timeout=60,
+                                interval=2, **_params):
+    """Wait until every matching agent is listed with an admin state.
+
+    Schedulers stop assigning new networks, routers and pools to an agent
+    as soon as it is listed administratively down. Each check is a single
+    list request using the filters of set_agents_admin_state.
+
+    :raises: WaitTimeout if some agents still differ after timeout seconds
+    """
+    params = dict(_params, fields=['id', 'admin_state_up'])
+    _wait_until(lambda: all(agent.get('admin_state_up') == admin_state_up
+                            for agent in
+                            client.list_agents(**params)['agents']),
+                _('agents admin state'), timeout, interval)
+
+
+def wait_for_agents_drained(client, timeout=60, interval=2,
+                            max_workers=None, **_params):
+    """Wait until the matching agents host no network, router or pool.
+
+    Schedulers stop assigning new resources to agents which are
+    administratively down, but those already hosted stay until they are
+    rescheduled or moved by the operator. Each check lists the agents
+    with the filters of set_agents_admin_state and counts their hosted
+    resources concurrently.
+
+    :raises: WaitTimeout if some agents still host resources after
+        timeout seconds
+    """
+    def _drained():
+        loaded = get_agent_load(client, max_workers=max_workers,
+                                **dict(_params))
+        return not any(agent.get(key) for agent in loaded
+                       for key in LOAD_KEYS)
+
+    _wait_until(_drained, _('agents to be drained'), timeout, interval)
+
+
+def wait_for_agents_alive(client, timeout=60, interval=2, **_params):
+    """Wait until the server reports every matching agent alive.
+
+    Agents restarted during a maintenance are reported alive again once
+    their first heartbeat reaches the server. Each check is a single list
+    request using the filters of set_agents_admin_state.
+
+    :raises: WaitTimeout if some agents are still down after timeout
+        seconds
+    """
+    params = dict(_params, fields=['id', 'alive'])
+    _wait_until(lambda: all(agent.get('alive') for agent in
+                            client.list_agents(**params)['agents']),
+                _('agents to be alive'), timeout, interval)
+
+
+MONITOR_FIELDS = ['id', 'host', 'agent_type', 'alive', 'heartbeat_timestamp']
+
+STATE_OK = 'ok'
+STATE_LAGGING = 'lagging'
+STATE_DOWN = 'down'
+
+NAGIOS_OK = 0
+NAGIOS_WARNING = 1
+NAGIOS_CRITICAL = 2
+NAGIOS_UNKNOWN = 3
+
+
+class AgentMonitor(object):
+    """Track agent liveness across successive polls and report changes.
+
+    Each poll is a single list_agents request restricted to MONITOR_FIELDS.
+    An agent is 'down' when the server reports it not alive, 'lagging' when
+    its heartbeat is at least lag_warning seconds old and 'ok' otherwise.
+    Only changes are reported: an event is emitted when an agent appears,
+    disappears or changes state, and when it starts or stops flapping,
+    i.e. changes state at least flap_threshold times over the last
+    flap_window polls.
+
+    :param client: a neutronclient.v2_0.client.Client
+    :param lag_warning: heartbeat age in seconds considered lagging, or
+        None to only consider the alive flag
+    :param _params: filters passed to list_agents
+    """
+
+    def __init__(self, client, lag_warning=None, flap_window=10,
+                 flap_threshold=3, **_params):
+        self.client = client
+        self.lag_warning = lag_warning
+        self.flap_window = flap_window
+        self.flap_threshold = flap_threshold
+        self.params = _params
+        self.params['fields'] = MONITOR_FIELDS
+        self.polls = 0
+        self.agents = {}
+        self._states = {}
+        self._transitions = {}
+        self._flapping = set()
+
+    def state(self, agent):
+        if not agent.get('alive'):
+            return STATE_DOWN
+        lag = agent.get('heartbeat_lag')
+        if (self.lag_warning is not None and lag is not None and
+                lag >= self.lag_warning):
+            return STATE_LAGGING
+        return STATE_OK
+
+    def poll(self, now=None):
+        """Poll the server once and return the list of change events."""
+        agents = self.client.list_agents(**self.params)['agents']
+        return self.update(agents, now)
+
+    def _event(self, name, agent, state):
+        return {'event': name, 'id': agent.get('id'),
+                'host': agent.get('host'),
+                'agent_type': agent.get('agent_type'), 'state': state,
+                'heartbeat_lag': agent.get('heartbeat_lag')}
+
+    def update(self, agents, now=None):
+        """Feed a list of agents into the monitor and return change events.
+
+        On the first update only the agents which are not 'ok' are
+        reported.
+        """
+        now = now or timeutils.utcnow()
+        first = not self.polls
+        self.polls += 1
+        events = []
+        current = {}
+        for agent in agents:
+            agent['heartbeat_lag'] = heartbeat_age(agent, now)
+            current[agent['id']] = agent
+            state = self.state(agent)
+            previous = self._states.get(agent['id'])
+            self._states[agent['id']] = state
+            if previous is None:
+                if not first:
+                    events.append(self._event('added', agent, state))
+                elif state != STATE_OK:
+                    events.append(self._event(state, agent, state))
+                continue
+            transitions = [poll for poll in
+                           self._transitions.get(agent['id'], [])
+                           if poll > self.polls - self.flap_window]
+            if state != previous:
+                transitions.append(self.polls)
+                events.append(self._event(state, agent, state))
+            self._transitions[agent['id']] = transitions
+            flapping = len(transitions) >= self.flap_threshold
+            if flapping and agent['id'] not in self._flapping:
+                self._flapping.add(agent['id'])
+                events.append(self._event('flapping', agent, state))
+            elif not flapping and agent['id'] in self._flapping:
+                self._flapping.discard(agent['id'])
+                events.append(self._event('stable', agent, state))
+        for agent_id in set(self.agents) - set(current):
+            agent = self.agents[agent_id]
+            events.append(self._event('removed', agent,
+                                      self._states.pop(agent_id)))
+            self._transitions.pop(agent_id, None)
+            self._flapping.discard(agent_id)
+        self.agents = current
+        return events
+
+    @property
+    def flapping(self):
+        return [self.agents[agent_id] for agent_id in sorted(self._flapping)]
+
+
+def nagios_check(agents, lag_warning=None, lag_critical=None, now=None):
+    """Evaluate agents the way a Nagios plugin would.
+
+    Returns an (exit code, status line) tuple. The check is CRITICAL when
+    an agent is not alive or its heartbeat is at least lag_critical seconds
+    old, and WARNING when a heartbeat is at least lag_warning seconds old.
+    """
+    now = now or timeutils.utcnow()
+    down = []
+    critical = []
+    warning = []
+    max_lag = 0
+    for agent in agents:
+        lag = heartbeat_age(agent, now)
+        name = '%s/%s' % (agent.get('host'), agent.get('agent_type'))
+        if lag is not None:
+            max_lag = max(max_lag, lag)
+        if not agent.get('alive'):
+            down.append(name)
+        elif (lag is not None and lag_critical is not None and
+                lag >= lag_critical):
+            critical.append(name)
+        elif (lag is not None and lag_warning is not None and
+                lag >= lag_warning):
+            warning.append(name)
+    perfdata = 'agents=%d down=%d max_lag=%ds' % (
+        len(agents), len(down), max_lag)
+    if down or critical:
+        code, label = NAGIOS_CRITICAL, 'CRITICAL'
+    elif warning:
+        code, label = NAGIOS_WARNING, 'WARNING'
+    else:
+        code, label = NAGIOS_OK, 'OK'
+    details = []
+    if down:
+        details.append(_('down: %s') % ', '.join(sorted(down)))
+    if critical or warning:
+        details.append(_('lagging: %s') %
+                       ', '.join(sorted(critical + warning)))
+    summary = '; '.join(details) or (_('%d agents alive') % len(agents))
+    return code, 'AGENTS %s - %s | %s' % (label, summary, perfdata)
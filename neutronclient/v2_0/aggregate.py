@@ -0,0 +1,148 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+
+"""Streaming group-by and aggregation of listed resources."""
+
+import itertools
+
+from oslo.serialization import jsonutils
+
+from neutronclient.i18n import _
+from neutronclient.v2_0 import sorting
+from neutronclient.v2_0 import topology
+
+# aggregate functions, all but count requiring a field
+FUNCTIONS = ('count', 'distinct', 'min', 'max')
+
+
+def parse_aggregate(spec):
+    """Parse an aggregate given as FUNCTION or FUNCTION:FIELD.
+
+    count alone counts the resources, count:FIELD the resources having a
+    value for FIELD, distinct:FIELD the distinct values of FIELD, and
+    min:FIELD and max:FIELD its smallest and largest values.
+
+    :returns: a (function, field) tuple, field being None for count
+    :raises: ValueError on an unknown function or a missing field
+    """
+    function, _sep, field = spec.partition(':')
+    if function not in FUNCTIONS:
+        raise ValueError(_("Unknown aggregate %(function)s, expected one "
+                           "of %(functions)s") %
+                         {'function': function,
+                          'functions': ', '.join(FUNCTIONS)})
+    if not field and function != 'count':
+        raise ValueError(_("Aggregate %(function)s requires a field, as "
+                           "in %(function)s:FIELD") % {'function': function})
+    return function, field or None
+
+
+def column_name(function, field):
+    return '%s(%s)' % (function, field) if field else function
+
+
+def _hashable(value):
+    if isinstance(value, (dict, list)):
+        return jsonutils.dumps(value, sort_keys=True)
+    return value
+
+
+class GroupBy(object):
+    """Aggregates of resources grouped by the values of some fields.
+
+    Resources are added page by page and only the accumulators of each
+    group are kept, so that memory grows with the number of groups
+    rather than with the number of resources; distinct also keeps the
+    distinct values of its field in each group. A resource with several
+    values for a grouping field, e.g. fixed_ips.subnet_id, is added to
+    the group of each of them, and a resource without any to the group
+    of None.
+
+    :param group_by: fields, possibly dotted, to group on
+    :param aggregates: (function, field) tuples as from parse_aggregate
+    """
+
+    def __init__(self, group_by, aggregates=(('count', None),)):
+        self.group_by = list(group_by)
+        self.aggregates = list(aggregates)
+        self.groups = {}
+
+    @property
+    def columns(self):
+        return self.group_by + [column_name(function, field)
+                                for function, field in self.aggregates]
+
+    @property
+    def fields(self):
+        """Return the resource fields to request, in order."""
+        fields = []
+        for field in self.group_by + [f for _fn, f in self.aggregates if f]:
+            root = field.split('.')[0]
+            if root not in fields:
+                fields.append(root)
+        return fields
+
+    def _new_group(self):
+        return [set() if function == 'distinct' else
+                0 if function == 'count' else None
+                for function, _field in self.aggregates]
+
+    def _accumulate(self, group, item):
+        for i, (function, field) in enumerate(self.aggregates):
+            if function == 'count':
+                if field is None or topology.field_values(item, field):
+                    group[i] += 1
+                continue
+            for value in topology.field_values(item, field):
+                if function == 'distinct':
+                    group[i].add(_hashable(value))
+                    continue
+                key = sorting.value_key(value)
+                if (group[i] is None or
+                        (function == 'min' and
+                         key < sorting.value_key(group[i])) or
+                        (function == 'max' and
+                         key > sorting.value_key(group[i]))):
+                    group[i] = value
+
+    def _keys(self, item):
+        values = []
+        for field in self.group_by:
+            found = set(_hashable(value)
+                        for value in topology.field_values(item, field))
+            values.append(found or [None])
+        return itertools.product(*values)
+
+    def add(self, items):
+        for item in items:
+            for key in self._keys(item):
+                group = self.groups.get(key)
+                if group is None:
+                    group = self.groups[key] = self._new_group()
+                self._accumulate(group, item)
+
+    def rows(self):
+        """Return a tuple of values of the columns for each group."""
+        rows = []
+        for key in sorted(self.groups, key=lambda key: [sorting.value_key(v)
+                                                        for v in key]):
+            group = self.groups[key]
+            rows.append(key + tuple(
+                len(value) if function == 'distinct' else value
+                for (function, _field), value in zip(self.aggregates,
+                                                     group)))
+        return rows
@@ -0,0 +1,184 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Detection of orphaned and leaked resources."""
+
+from neutronclient.common import exceptions
+
+# Fields fetched for each audited collection
+FIELDS = {
+    'ports': ['id', 'name', 'tenant_id', 'device_id', 'device_owner',
+              'security_groups'],
+    'floatingips': ['id', 'tenant_id', 'port_id', 'floating_ip_address'],
+    'security_groups': ['id', 'name', 'tenant_id'],
+    'security_group_rules': ['id', 'security_group_id', 'remote_group_id'],
+    'routers': ['id', 'name', 'tenant_id'],
+    'pools': ['id', 'name', 'tenant_id', 'members'],
+}
+
+DEAD_DEVICE_PORT = 'dead_device_port'
+UNASSOCIATED_FLOATINGIP = 'unassociated_floatingip'
+UNUSED_SECURITY_GROUP = 'unused_security_group'
+ROUTER_WITHOUT_INTERFACES = 'router_without_interfaces'
+POOL_WITHOUT_MEMBERS = 'pool_without_members'
+
+# kind: (audited resource type, collections needed)
+KINDS = {
+    DEAD_DEVICE_PORT: ('port', ['ports', 'routers', 'floatingips']),
+    UNASSOCIATED_FLOATINGIP: ('floatingip', ['floatingips']),
+    UNUSED_SECURITY_GROUP: ('security_group', ['security_groups', 'ports',
+                                               'security_group_rules']),
+    ROUTER_WITHOUT_INTERFACES: ('router', ['routers', 'ports']),
+    POOL_WITHOUT_MEMBERS: ('pool', ['pools']),
+}
+
+COLUMNS = ['kind', 'type', 'id', 'name', 'tenant_id']
+
+ROUTER_INTERFACE_OWNERS = ('network:router_interface',
+                           'network:router_interface_distributed')
+ROUTER_OWNERS = ROUTER_INTERFACE_OWNERS + ('network:router_gateway',)
+FLOATINGIP_OWNER = 'network:floatingip'
+COMPUTE_OWNER_PREFIX = 'compute:'
+
+
+def fetch_audited(client, kinds, max_workers=None, **_params):
+    """List once, concurrently, the collections needed by kinds.
+
+    A collection of an extension not loaded on the server, e.g. pools
+    without LBaaS, is returned as None.
+
+    :param _params: filters passed to every list request, e.g. tenant_id
+    :returns: dict of the resources keyed by collection
+    """
+    collections = []
+    for kind in kinds:
+        for collection in KINDS[kind][1]:
+            if collection not in collections:
+                collections.append(collection)
+
+    def _list(collection):
+        try:
+            return getattr(client, 'list_%s' % collection)(
+                fields=FIELDS[collection], **_params)[collection]
+        except exceptions.NotFound:
+            return None
+
+    return dict(zip(collections,
+                    client.concurrent_map(_list, collections, max_workers)))
+
+
+def _row(kind, item):
+    return {'kind': kind, 'type': KINDS[kind][0], 'id': item['id'],
+            'name': item.get('name') or item.get('floating_ip_address'),
+            'tenant_id': item.get('tenant_id')}
+
+
+def find_orphans(resources, kinds=None, live_devices=None):
+    """Cross-index resources and return the orphans found, kind by kind.
+
+    Every check is a set lookup per resource, so that an audit is linear
+    in the number of resources.
+
+    :param resources: dict of the resources keyed by collection, as
+        returned by fetch_audited
+    :param kinds: the kinds of orphans to look for, defaults to all KINDS
+    :param live_devices: ids of the existing instances; when given, ports
+        owned by compute whose device is not among them are also dead
+    :returns: list of dicts with the COLUMNS keys, sorted by kind
+    """
+    kinds = kinds or KINDS
+    ports = resources.get('ports') or []
+    rows = []
+    if DEAD_DEVICE_PORT in kinds:
+        routers = set(r['id'] for r in resources.get('routers') or [])
+        fips = set(f['id'] for f in resources.get('floatingips') or [])
+        if live_devices is not None:
+            live_devices = set(live_devices)
+        for port in ports:
+            owner = port.get('device_owner') or ''
+            device_id = port.get('device_id')
+            if not device_id:
+                continue
+            if ((owner in ROUTER_OWNERS and device_id not in routers) or
+                    (owner == FLOATINGIP_OWNER and device_id not in fips) or
+                    (live_devices is not None and
+                     owner.startswith(COMPUTE_OWNER_PREFIX) and
+                     device_id not in live_devices)):
+                rows.append(_row(DEAD_DEVICE_PORT, port))
+    if UNASSOCIATED_FLOATINGIP in kinds:
+        rows.extend(_row(UNASSOCIATED_FLOATINGIP, fip)
+                    for fip in resources.get('floatingips') or []
+                    if not fip.get('port_id'))
+    if UNUSED_SECURITY_GROUP in kinds:
+        used = set()
+        for port in ports:
+            used.update(port.get('security_groups') or [])
+        # deleting a group also deletes the rules of other groups which
+        # refer to it
+        for rule in resources.get('security_group_rules') or []:
+            if rule.get('remote_group_id') not in (
+                    None, rule.get('security_group_id')):
+                used.add(rule['remote_group_id'])
+        rows.extend(_row(UNUSED_SECURITY_GROUP, sg)
+                    for sg in resources.get('security_groups') or []
+                    if sg['id'] not in used and sg.get('name') != 'default')
+    if ROUTER_WITHOUT_INTERFACES in kinds:
+        attached = set(port.get('device_id') for port in ports
+                       if port.get('device_owner') in ROUTER_INTERFACE_OWNERS)
+        rows.extend(_row(ROUTER_WITHOUT_INTERFACES, router)
+                    for router in resources.get('routers') or []
+                    if router['id'] not in attached)
+    if POOL_WITHOUT_MEMBERS in kinds:
+        rows.extend(_row(POOL_WITHOUT_MEMBERS, pool)
+                    for pool in resources.get('pools') or []
+                    if not pool.get('members'))
+    rows.sort(key=lambda row: row['kind'])
+    return rows
+
+
+def count_orphans(rows, kinds=None):
+    """Return [{'kind': kind, 'count': n}] for every kind audited."""
+    counts = dict.fromkeys(kinds or KINDS, 0)
+    for row in rows:
+        counts[row['kind']] += 1
+    return [{'kind': kind, 'count': counts[kind]} for kind in sorted(counts)]
+
+
+def audit(client, kinds=None, live_devices=None, max_workers=None,
+          **_params):
+    """Fetch the audited collections and return the orphans found."""
+    kinds = sorted(kinds or KINDS)
+    resources = fetch_audited(client, kinds, max_workers, **_params)
+    return find_orphans(resources, kinds, live_devices)
+
+
+def delete_orphans(client, rows, max_workers=None):
+    """Delete the orphans of rows concurrently.
+
+    A failed deletion does not stop the others: the result of each row is
+    stored into its 'result' key, either 'deleted' or the error message.
+    """
+    def _delete(row):
+        try:
+            getattr(client, 'delete_%s' % row['type'])(row['id'])
+        except exceptions.NeutronClientException as e:
+            return str(e)
+        return 'deleted'
+
+    for row, result in zip(rows, client.concurrent_map(_delete, rows,
+                                                       max_workers)):
+        row['result'] = result
+    return rows
@@ -0,0 +1,109 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Change feed emulation on top of repeated list requests."""
+
+from oslo.serialization import jsonutils
+import six
+
+EVENT_CREATE = 'create'
+EVENT_UPDATE = 'update'
+EVENT_DELETE = 'delete'
+
+
+def _hash_value(value):
+    if isinstance(value, (list, dict)):
+        value = jsonutils.dumps(value, sort_keys=True)
+    return hash(value)
+
+
+class ChangeTracker(object):
+    """Turn successive listings of a collection into change events.
+
+    Only a digest of each resource is kept between listings: the sorted
+    tuple of its field names, shared by all the resources having the same
+    fields, and the tuple of the hashes of its field values. An update
+    event therefore carries the new value of the changed fields only.
+
+    Events are dicts with an 'event' key set to 'create' (with the whole
+    'resource'), 'update' (with the 'changes' dict, a removed field being
+    reported as None) or 'delete', and the 'id' of the resource.
+
+    :param key: the field identifying a resource
+    """
+
+    def __init__(self, key='id'):
+        self.key = key
+        self.digests = {}
+        self._fieldsets = {}
+
+    def __len__(self):
+        return len(self.digests)
+
+    def _digest(self, item):
+        fields = tuple(sorted(item))
+        fields = self._fieldsets.setdefault(fields, fields)
+        return fields, tuple(_hash_value(item[field]) for field in fields)
+
+    def update(self, items):
+        """Feed a complete listing and return the change events."""
+        events = []
+        digests = {}
+        for item in items:
+            _id = item[self.key]
+            digest = self._digest(item)
+            digests[_id] = digest
+            previous = self.digests.get(_id)
+            if previous is None:
+                events.append({'event': EVENT_CREATE, 'id': _id,
+                               'resource': item})
+            elif previous != digest:
+                old = dict(zip(*previous))
+                changes = {}
+                for field, value_hash in zip(*digest):
+                    if old.pop(field, None) != value_hash:
+                        changes[field] = item[field]
+                for field in old:
+                    changes[field] = None
+                events.append({'event': EVENT_UPDATE, 'id': _id,
+                               'changes': changes})
+        for _id in self.digests:
+            if _id not in digests:
+                events.append({'event': EVENT_DELETE, 'id': _id})
+        self.digests = digests
+        return events
+
+
+def next_interval(delay, changed, interval, max_interval):
+    """Return the delay before the next poll.
+
+    The delay is reset to interval when the last poll saw changes and
+    doubles, up to max_interval, while the collection stays unchanged.
+    """
+    if changed:
+        return interval
+    return min(delay * 2, max(interval, max_interval))
+
+
+def ensure_key_field(_params, key='id'):
+    """Make sure a field projection includes the field tracked by key."""
+    fields = _params.get('fields')
+    if fields:
+        if isinstance(fields, six.string_types):
+            fields = [fields]
+        if key not in fields:
+            _params['fields'] = [key] + list(fields)
+    return _params
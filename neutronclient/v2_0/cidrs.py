@@ -0,0 +1,137 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Allocation of free subnet CIDRs within a supernet."""
+
+import heapq
+
+import netaddr
+
+from neutronclient.common import exceptions
+
+
+class CidrAllocator(object):
+    """Free blocks of a supernet, allocated from like a buddy allocator.
+
+    The free space is kept as maximal aligned CIDR blocks in one heap of
+    start addresses per prefix length. Allocating a /N takes either the
+    lowest free block of prefix length N or less (first fit) or the
+    lowest of the smallest such blocks (best fit), and gives back the
+    unused halves of that block to the smaller prefix lengths. Each
+    allocation therefore costs O(prefix bits * log blocks).
+
+    :param supernet: the CIDR to allocate from
+    :param allocated: CIDRs already in use; those not overlapping the
+        supernet are ignored
+    """
+
+    def __init__(self, supernet, allocated=()):
+        self.supernet = netaddr.IPNetwork(supernet).cidr
+        self.bits = 32 if self.supernet.version == 4 else 128
+        self._free = {}
+        used = []
+        for cidr in allocated:
+            net = netaddr.IPNetwork(cidr).cidr
+            if (net.version == self.supernet.version and
+                    net.first <= self.supernet.last and
+                    net.last >= self.supernet.first):
+                used.append((max(net.first, self.supernet.first),
+                             min(net.last, self.supernet.last)))
+        start = self.supernet.first
+        for first, last in sorted(used):
+            if first > start:
+                self._release_range(start, first - 1)
+            start = max(start, last + 1)
+        if start <= self.supernet.last:
+            self._release_range(start, self.supernet.last)
+
+    def _release_range(self, first, last):
+        for net in netaddr.iprange_to_cidrs(
+                netaddr.IPAddress(first, self.supernet.version),
+                netaddr.IPAddress(last, self.supernet.version)):
+            heapq.heappush(self._free.setdefault(net.prefixlen, []),
+                           net.first)
+
+    def _block(self, first, prefixlen):
+        return netaddr.IPNetwork('%s/%d' % (
+            netaddr.IPAddress(first, self.supernet.version), prefixlen))
+
+    def free_blocks(self):
+        """Return the free blocks sorted by address."""
+        return sorted((self._block(first, prefixlen)
+                       for prefixlen, starts in self._free.items()
+                       for first in starts),
+                      key=lambda net: net.first)
+
+    def allocate(self, prefixlen, best_fit=False):
+        """Allocate and return a free block of the given prefix length.
+
+        :raises: NoFreeCidr when no such block is left
+        """
+        candidates = [p for p in self._free
+                      if p <= prefixlen and self._free[p]]
+        if prefixlen > self.bits or not candidates:
+            raise exceptions.NoFreeCidr(prefixlen=prefixlen,
+                                        supernet=self.supernet)
+        if best_fit:
+            block_len = max(candidates)
+        else:
+            block_len = min(candidates, key=lambda p: self._free[p][0])
+        first = heapq.heappop(self._free[block_len])
+        # give back the upper half of each split
+        for split_len in range(block_len + 1, prefixlen + 1):
+            heapq.heappush(self._free.setdefault(split_len, []),
+                           first + (1 << (self.bits - split_len)))
+        return self._block(first, prefixlen)
+
+    def allocate_many(self, prefixlens, best_fit=False):
+        """Allocate a block for each of the given prefix lengths.
+
+        Larger blocks are allocated first so that small ones do not split
+        the space they need; the blocks are returned in the order of
+        prefixlens.
+        """
+        order = sorted(range(len(prefixlens)), key=lambda i: prefixlens[i])
+        blocks = [None] * len(prefixlens)
+        for i in order:
+            blocks[i] = self.allocate(prefixlens[i], best_fit)
+        return blocks
+
+
+def load_allocator(client, supernet, **_params):
+    """Build a CidrAllocator from the subnets matching the given filters.
+
+    Only the cidr field of the subnets of the supernet IP version is
+    requested.
+
+    :param _params: filters scoping the subnets, e.g. network_id or
+        tenant_id
+    """
+    supernet = netaddr.IPNetwork(supernet)
+    _params.update(fields='cidr', ip_version=supernet.version)
+    subnets = client.list_subnets(**_params)['subnets']
+    return CidrAllocator(supernet, [subnet['cidr'] for subnet in subnets])
+
+
+def allocate_cidrs(client, supernet, prefixlens, best_fit=False, **_params):
+    """Return free CIDRs of the given prefix lengths within supernet.
+
+    The CIDRs are computed from a single subnet list request and are not
+    reserved: concurrent callers may be handed the same CIDRs.
+    """
+    allocator = load_allocator(client, supernet, **_params)
+    return [str(block) for block in allocator.allocate_many(prefixlens,
+                                                            best_fit)]
@@ -14,10 +14,12 @@
 #    under the License.
 #
 
+import itertools
 import logging
 import time
 
 import requests
+import six
 import six.moves.urllib.parse as urlparse
 
 from neutronclient import client
@@ -26,6 +28,8 @@ from neutronclient.common import exceptions
 from neutronclient.common import serializer
 from neutronclient.common import utils
 from neutronclient.i18n import _
+from neutronclient.v2_0 import changefeed
+from neutronclient.v2_0 import inventory
 
 
 _logger = logging.getLogger(__name__)
@@ -258,6 +262,12 @@ class Client(object):
                      }
     # 8192 Is the default max URI len for eventlet.wsgi.server
     MAX_URI_LEN = 8192
+    # Page size asked when counting; the server lowers it to its
+    # pagination_max_limit when pagination is enabled
+    COUNT_PAGE_SIZE = 10000
+    # Filters never used to shard a count: a resource may match several
+    # of their values
+    _UNSHARDABLE_FILTERS = ('fields', 'sort_key', 'sort_dir', 'fixed_ips')
 
     def get_attr_metadata(self):
         if self.format == 'json':
@@ -1205,6 +1215,7 @@ class Client(object):
         self.format = 'json'
         self.action_prefix = "/v%s" % (self.version)
         self.retry_interval = 1
+        self.snapshot = None
 
     def _handle_fault_response(self, status_code, response_body):
         # Create exception with HTTP status code and message
@@ -1320,6 +1331,10 @@ class Client(object):
                                   headers=headers, params=params)
 
     def get(self, action, body=None, headers=None, params=None):
+        if self.snapshot is not None and not body:
+            found = self._show_from_snapshot(action, params)
+            if found is not None:
+                return found
         return self.retry_request("GET", action, body=body,
                                   headers=headers, params=params)
 
@@ -1333,6 +1348,9 @@ class Client(object):
                                   headers=headers, params=params)
 
     def list(self, collection, path, retrieve_all=True, **params):
+        if self._in_snapshot(collection, path):
+            res = {collection: self.snapshot.list(collection, **params)}
+            return res if retrieve_all else iter([res])
         if retrieve_all:
             res = []
             for r in self._pagination(collection, path, **params):
@@ -1341,6 +1359,217 @@ class Client(object):
         else:
             return self._pagination(collection, path, **params)
 
+    def use_snapshot(self, path, max_age=None):
+        """Answer reads from an inventory snapshot instead of the server.
+
+        Listing or showing a resource of a collection present in the
+        snapshot file no longer issues any request; other requests are
+        still sent to the server. Pass None to stop using a snapshot.
+
+        :param path: a file written by inventory.take_snapshot
+        :param max_age: maximum age in seconds of the snapshot collections,
+            reading an older one raises SnapshotTooOld
+        """
+        if self.snapshot is not None:
+            self.snapshot.close()
+        self.snapshot = path and inventory.Snapshot(path, max_age)
+
+    def _in_snapshot(self, collection, path):
+        return (self.snapshot is not None and
+                self.snapshot.has(collection) and
+                getattr(self, '%s_path' % collection, None) == path)
+
+    def _show_from_snapshot(self, action, params):
+        path, sep, _id = action.rpartition('/')
+        if not sep or not _id:
+            return None
+        for collection in self.snapshot.collections:
+            if self._in_snapshot(collection, path):
+                resource = self.EXTED_PLURALS.get(collection, collection[:-1])
+                return {resource: self.snapshot.show(collection, _id,
+                                                     **(params or {}))}
+        return None
+
+    def concurrent_map(self, func, items, max_workers=None):
+        """Call func on each of items concurrently, sharing this client.
+
+        The client authenticates up front so that the workers do not race
+        each other to fetch a token.
+        """
+        self.httpclient.authenticate_and_fetch_endpoint_url()
+        return utils.concurrent_map(func, items, max_workers)
+
+    def count(self, collection, max_workers=None, **_params):
+        """Count the resources of a collection matching the filters.
+
+        Pages are requested with the id field only and COUNT_PAGE_SIZE
+        resources each, and only their lengths are kept. When a filter
+        has several values, e.g. network_id=[net1, net2], the count is
+        sharded on its values and the shards are counted concurrently.
+
+        :param collection: the collection to count, for instance 'ports'
+        :param max_workers: maximum number of concurrent shards
+        :param _params: filters, as for the list_* methods
+        """
+        path = getattr(self, '%s_path' % collection)
+        params = dict(_params, fields=['id'])
+        params.setdefault('limit', self.COUNT_PAGE_SIZE)
+
+        def _count(shard_params):
+            return sum(len(page[collection])
+                       for page in self.list(collection, path, False,
+                                             **shard_params))
+
+        for key, values in sorted(six.iteritems(params)):
+            if (key not in self._UNSHARDABLE_FILTERS and
+                    isinstance(values, (list, tuple)) and
+                    len(set(values)) > 1):
+                shards = [dict(params, **{key: value})
+                          for value in sorted(set(values))]
+                return sum(self.concurrent_map(_count, shards, max_workers))
+        return _count(params)
+
+    def get_collection(self, resource):
+        """Return the name of the collection holding the given resource."""
+        for collection, singular in six.iteritems(self.EXTED_PLURALS):
+            if singular == resource:
+                return collection
+        return resource + 's'
+
+    def list_by_ids(self, collection, ids, **_params):
+        """Fetch the resources of a collection having the given ids.
+
+        All the ids are passed as filters of a single list request. When the
+        URI gets too long, the ids are split in as few chunks as possible
+        according to the excess length, and the chunks are fetched
+        concurrently.
+        """
+        ids = list(ids)
+        if not ids:
+            return []
+        obj_lister = getattr(self, "list_%s" % collection)
+
+        def _list(chunk):
+            return obj_lister(id=chunk, **_params)[collection]
+
+        try:
+            return _list(ids)
+        except exceptions.RequestURITooLong as uri_len_exc:
+            # Use the excess attribute of the exception to know how many
+            # id filters fit in a single request
+            id_filter_len = max(len(urlparse.urlencode({'id': _id})) + 1
+                                for _id in ids)
+            max_size = id_filter_len * len(ids) - uri_len_exc.excess
+            chunk_size = max(1, max_size // id_filter_len)
+        chunks = [ids[i:i + chunk_size]
+                  for i in range(0, len(ids), chunk_size)]
+        return list(itertools.chain.from_iterable(
+            self.concurrent_map(_list, chunks)))
+
+    def wait_for(self, resources, status=None, timeout=300, interval=1,
+                 max_interval=16, error_statuses=('ERROR',)):
+        """Wait until the given resources reach a status.
+
+        Each poll issues a single list request per resource type, asking
+        only for the id and status fields of the awaited resources, so that
+        waiting on hundreds of new members costs one request per poll. The
+        poll interval doubles, up to max_interval, while no resource changes
+        status and is reset as soon as one does.
+
+        :param resources: iterable of (resource, id) tuples, for instance
+            [('member', member_id), ('vip', vip_id)]
+        :param status: the status to wait for; by default any status not
+            starting with PENDING_
+        :param timeout: seconds to wait before raising WaitTimeout
+        :param error_statuses: statuses raising ResourceInErrorState
+        :returns: dict of the final status keyed by (resource, id)
+        """
+        pending = {}
+        for resource, _id in resources:
+            pending.setdefault(resource, set()).add(_id)
+        result = {}
+        deadline = time.time() + timeout
+        delay = interval
+        last = None
+        while True:
+            current = {}
+            # sorted so that the requests do not depend on set ordering
+            for resource in sorted(pending):
+                ids = sorted(pending[resource])
+                collection = self.get_collection(resource)
+                found = self.list_by_ids(collection, ids,
+                                         fields=['id', 'status'])
+                found = dict((item['id'], item['status']) for item in found)
+                for _id in ids:
+                    if _id not in found:
+                        raise exceptions.NotFound(
+                            message=_("%(resource)s %(id)s no longer "
+                                      "exists") %
+                            {'resource': resource, 'id': _id})
+                    current[(resource, _id)] = found[_id]
+            for key, _status in sorted(current.items()):
+                if _status in error_statuses:
+                    raise exceptions.ResourceInErrorState(
+                        resource=key[0], id=key[1], status=_status)
+                if (_status == status if status else
+                        not (_status or '').startswith('PENDING_')):
+                    result[key] = _status
+                    pending[key[0]].discard(key[1])
+            pending = dict((resource, ids) for resource, ids
+                           in six.iteritems(pending) if ids)
+            if not pending:
+                return result
+            if time.time() >= deadline:
+                raise exceptions.WaitTimeout(
+                    timeout=timeout,
+                    resource=', '.join('%s %s' % (resource, _id)
+                                       for resource, ids
+                                       in sorted(pending.items())
+                                       for _id in sorted(ids)))
+            if current == last:
+                delay = min(delay * 2, max_interval)
+            else:
+                delay = interval
+            last = current
+            time.sleep(min(delay, max(0, deadline - time.time())))
+
+    def watch(self, collection, interval=5, max_interval=60, count=None,
+              initial=True, **_params):
+        """Poll a collection and yield what changed between two polls.
+
+        Neutron has no change feed, so this generator lists the collection
+        repeatedly and yields, after each poll, the list of create, update
+        and delete events computed by changefeed.ChangeTracker. Only hashes
+        of the resources are kept between polls and update events carry
+        the changed fields only. Pass a fields filter to restrict each poll
+        to the fields of interest; the id field is always requested.
+
+        The poll interval is reset to interval whenever a poll sees changes
+        and doubles, up to max_interval, while the collection stays still.
+
+        :param collection: the collection to watch, for instance 'ports'
+        :param count: number of polls, None to poll forever
+        :param initial: whether the first poll yields a create event for
+            each existing resource
+        :param _params: filters passed to the list request
+        """
+        obj_lister = getattr(self, "list_%s" % collection)
+        changefeed.ensure_key_field(_params)
+        tracker = changefeed.ChangeTracker()
+        delay = interval
+        polls = 0
+        while count is None or polls < count:
+            if polls:
+                time.sleep(delay)
+            events = tracker.update(obj_lister(**_params)[collection])
+            if polls:
+                delay = changefeed.next_interval(delay, events, interval,
+                                                 max_interval)
+            elif not initial:
+                events = []
+            polls += 1
+            yield events
+
     def _pagination(self, collection, path, **params):
         if params.get('page_reverse', False):
             linkrel = 'previous'
@@ -1360,3 +1589,24 @@ class Client(object):
                         break
             except KeyError:
                 break
+
+
+def _count_method(collection):
+    def count_method(self, max_workers=None, **_params):
+        return self.count(collection, max_workers, **_params)
+    count_method.__name__ = 'count_%s' % collection
+    count_method.__doc__ = ("Count the %s matching the filters, see "
+                            "Client.count." % collection)
+    return count_method
+
+
+def _add_count_methods(cls):
+    """Add a count_<collection> method per collection with a list method."""
+    for name in dir(cls):
+        collection = name[len('list_'):]
+        if (name.startswith('list_') and
+                hasattr(cls, '%s_path' % collection)):
+            setattr(cls, 'count_%s' % collection, _count_method(collection))
+
+
+_add_count_methods(Client)
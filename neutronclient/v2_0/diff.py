@@ -0,0 +1,282 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+
+"""Comparison of two inventories of Neutron resources."""
+
+import hashlib
+
+from oslo.serialization import jsonutils
+import six
+
+from neutronclient.common import utils
+from neutronclient.i18n import _
+from neutronclient.v2_0 import inventory
+from neutronclient.v2_0 import sorting
+
+DEFAULT_COLLECTIONS = ['networks', 'subnets', 'routers', 'security_groups']
+
+# fields matching the resources of both sides, ids differing between
+# regions; the resources of other collections are matched by id
+DEFAULT_KEYS = {
+    'networks': ['name', 'tenant_id'],
+    'subnets': ['cidr', 'tenant_id'],
+    'routers': ['name', 'tenant_id'],
+    'security_groups': ['name', 'tenant_id'],
+}
+DEFAULT_KEY = ['id']
+
+# fields not compared, in nested resources as well, e.g. the ids of the
+# rules of a security group
+DEFAULT_IGNORED = ['id']
+
+# fields, dotted for nested ones, holding the ids of resources of another
+# collection; they are compared through the keys of the resources they
+# refer to, as ids differ between regions
+REFERENCES = {
+    'networks': {'subnets': 'subnets'},
+    'subnets': {'network_id': 'networks'},
+    'ports': {'network_id': 'networks', 'fixed_ips.subnet_id': 'subnets',
+              'security_groups': 'security_groups'},
+    'routers': {'external_gateway_info.network_id': 'networks',
+                'external_gateway_info.external_fixed_ips.subnet_id':
+                'subnets'},
+    'security_groups': {
+        'security_group_rules.security_group_id': 'security_groups',
+        'security_group_rules.remote_group_id': 'security_groups'},
+    'security_group_rules': {'security_group_id': 'security_groups',
+                             'remote_group_id': 'security_groups'},
+    'floatingips': {'floating_network_id': 'networks',
+                    'router_id': 'routers'},
+}
+
+COLUMNS = ['collection', 'key', 'change', 'field', 'left', 'right']
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+
+def parse_key(spec):
+    """Parse a matching key given as COLLECTION=FIELD[,FIELD...].
+
+    :returns: a (collection, fields) tuple
+    :raises: ValueError if the collection or the fields are missing
+    """
+    collection, _sep, fields = spec.partition('=')
+    fields = [f for f in fields.split(',') if f]
+    if not collection or not fields:
+        raise ValueError(_("Expected COLLECTION=FIELD[,FIELD...], found "
+                           "%r") % spec)
+    return collection, fields
+
+
+def load_side(source, collections, max_workers=None, optional=()):
+    """Return the resources of a client or of a snapshot file.
+
+    :param source: a Client, or the path of a snapshot written by
+        inventory.take_snapshot
+    :param optional: collections loaded as well, unless missing from the
+        snapshot
+    :returns: dict of the resources keyed by collection
+    """
+    collections = list(collections) + [c for c in optional
+                                       if c not in collections]
+    if isinstance(source, six.string_types):
+        snapshot = inventory.Snapshot(source)
+        try:
+            return dict((collection, snapshot.list(collection))
+                        for collection in collections
+                        if collection not in optional or
+                        snapshot.has(collection))
+        finally:
+            snapshot.close()
+    return inventory.fetch_collections(source, collections, max_workers)
+
+
+def _key_text(key):
+    return '/'.join('' if v is None else six.text_type(v) for v in key)
+
+
+def _replace(value, path, names):
+    if isinstance(value, list):
+        return [_replace(v, path, names) for v in value]
+    if not path:
+        if isinstance(value, six.string_types):
+            return names.get(value, value)
+        return value
+    if isinstance(value, dict) and path[0] in value:
+        value = dict(value)
+        value[path[0]] = _replace(value[path[0]], path[1:], names)
+    return value
+
+
+def resolve_references(resources, keys=None):
+    """Replace the ids of REFERENCES by the keys of the resources.
+
+    An id is replaced by the key of the resource it refers to, joined
+    with '/' as in the key column, e.g. the CIDR and tenant of a subnet,
+    when that resource is among the resources of its collection. Other
+    ids are kept.
+
+    :param resources: dict of the resources keyed by collection
+    :param keys: dict of the matching fields keyed by collection
+    :returns: dict of copies of the resources keyed by collection
+    """
+    keys = keys or {}
+    names = {}
+    for collection, items in six.iteritems(resources):
+        key_fields = (keys.get(collection) or
+                      DEFAULT_KEYS.get(collection, DEFAULT_KEY))
+        names[collection] = dict(
+            (item.get('id'), _key_text(_hashable(item.get(field))
+                                       for field in key_fields))
+            for item in items or [])
+    resolved = {}
+    for collection, items in six.iteritems(resources):
+        references = [(field.split('.'), names[referenced])
+                      for field, referenced in
+                      sorted(REFERENCES.get(collection, {}).items())
+                      if referenced in names]
+        if not references:
+            resolved[collection] = items
+            continue
+        resolved[collection] = []
+        for item in items or []:
+            for path, referenced_names in references:
+                item = _replace(item, path, referenced_names)
+            resolved[collection].append(item)
+    return resolved
+
+
+def _canonical(value, ignored):
+    # nested lists are compared regardless of their order
+    if isinstance(value, dict):
+        return dict((k, _canonical(v, ignored))
+                    for k, v in six.iteritems(value) if k not in ignored)
+    if isinstance(value, list):
+        return sorted((_canonical(v, ignored) for v in value),
+                      key=lambda v: jsonutils.dumps(v, sort_keys=True))
+    return value
+
+
+def _hashable(value):
+    if isinstance(value, (dict, list)):
+        return jsonutils.dumps(value, sort_keys=True)
+    return value
+
+
+def _index(items, key_fields, ignored):
+    """Map the key of each resource to its digests and canonical forms."""
+    index = {}
+    for item in items:
+        key = tuple(_hashable(item.get(field)) for field in key_fields)
+        canonical = _canonical(item, ignored)
+        digest = hashlib.sha1(jsonutils.dumps(
+            canonical, sort_keys=True).encode('utf-8')).hexdigest()
+        index.setdefault(key, []).append((digest, item, canonical))
+    return index
+
+
+def _pair(lefts, rights):
+    """Pair the resources of a key, identical ones first.
+
+    :returns: the unmatched left and right resources
+    """
+    unmatched = {}
+    for i, entry in enumerate(rights):
+        unmatched.setdefault(entry[0], []).append(i)
+    matched = set()
+    removed = []
+    for entry in lefts:
+        if unmatched.get(entry[0]):
+            matched.add(unmatched[entry[0]].pop(0))
+        else:
+            removed.append(entry)
+    added = [entry for i, entry in enumerate(rights) if i not in matched]
+    return removed, added
+
+
+def diff_collection(collection, left, right, key_fields=None, ignored=None):
+    """Compare the resources of a collection on both sides.
+
+    Resources are matched with a hash map of their key fields, and
+    compared with a digest of their fields but the ignored ones, so that
+    the comparison is linear in the number of resources; only the fields
+    of the matched resources with different digests are compared. Several
+    resources having the same key are paired identical ones first.
+
+    :param key_fields: fields matching the resources, defaulting to
+        DEFAULT_KEYS or DEFAULT_KEY
+    :param ignored: fields not compared, defaulting to DEFAULT_IGNORED
+    :returns: list of dicts with the COLUMNS keys
+    """
+    key_fields = key_fields or DEFAULT_KEYS.get(collection, DEFAULT_KEY)
+    ignored = set(DEFAULT_IGNORED if ignored is None else ignored)
+    left_index = _index(left, key_fields, ignored)
+    right_index = _index(right, key_fields, ignored)
+    rows = []
+
+    def _row(key, change, field=None, left=None, right=None):
+        rows.append({'collection': collection,
+                     'key': _key_text(key),
+                     'change': change, 'field': field,
+                     'left': left, 'right': right})
+
+    keys = set(left_index) | set(right_index)
+    for key in sorted(keys, key=lambda key: [sorting.value_key(v)
+                                             for v in key]):
+        removed, added = _pair(left_index.get(key, []),
+                               right_index.get(key, []))
+        for (_ld, _li, old), (_rd, _ri, new) in zip(removed, added):
+            for field in sorted(set(old) | set(new)):
+                if old.get(field) != new.get(field):
+                    _row(key, CHANGED, field, old.get(field), new.get(field))
+        for _digest, item, _canonical_item in removed[len(added):]:
+            _row(key, REMOVED, 'id', left=item.get('id'))
+        for _digest, item, _canonical_item in added[len(removed):]:
+            _row(key, ADDED, 'id', right=item.get('id'))
+    return rows
+
+
+def diff(left, right, collections=None, keys=None, ignored=None,
+         max_workers=None):
+    """Compare the collections of two inventories.
+
+    Both sides are loaded concurrently, each being a client, e.g. of
+    another region, or a snapshot file. The ids of REFERENCES are
+    compared through the keys of the resources they refer to, whose
+    collections are loaded as well.
+
+    :param keys: dict of the matching fields keyed by collection
+    :param ignored: fields not compared, defaulting to DEFAULT_IGNORED
+    :returns: list of dicts with the COLUMNS keys
+    """
+    collections = list(collections or DEFAULT_COLLECTIONS)
+    keys = keys or {}
+    referenced = sorted(set(
+        referenced for collection in collections
+        for referenced in REFERENCES.get(collection, {}).values()))
+    sides = utils.concurrent_map(
+        lambda source: resolve_references(
+            load_side(source, collections, max_workers, referenced), keys),
+        [left, right], max_workers)
+    rows = []
+    for collection in collections:
+        rows.extend(diff_collection(collection, sides[0][collection],
+                                    sides[1][collection],
+                                    keys.get(collection), ignored))
+    return rows
@@ -0,0 +1,166 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+
+"""Join of listed resources with the resources they refer to."""
+
+import itertools
+
+from neutronclient.i18n import _
+from neutronclient.v2_0 import topology
+
+# reference fields whose name does not tell the referenced collection,
+# other fields named <resource>_id referring to the <resource> collection
+REFERENCES = {
+    'subnets': 'subnets',
+    'security_groups': 'security_groups',
+    'remote_group_id': 'security_groups',
+    'floating_network_id': 'networks',
+    'health_monitors': 'health_monitors',
+    'members': 'members',
+    'firewall_rules': 'firewall_rules',
+    'firewall_policy_id': 'firewall_policies',
+    'ikepolicy_id': 'ikepolicies',
+    'ipsecpolicy_id': 'ipsecpolicies',
+}
+
+DEFAULT_ATTRIBUTES = ['name']
+
+# number of listed resources whose references are fetched at once
+EXPAND_BATCH_SIZE = 1000
+
+
+def parse_expansion(spec):
+    """Parse an expansion given as FIELD[:ATTRIBUTE[,ATTRIBUTE...]].
+
+    :returns: a (field, attributes) tuple, the attributes defaulting to
+        DEFAULT_ATTRIBUTES
+    :raises: ValueError if the field is missing
+    """
+    field, _sep, attributes = spec.partition(':')
+    if not field:
+        raise ValueError(_("Expected FIELD[:ATTRIBUTE,...], found %r") %
+                         spec)
+    attributes = [a for a in attributes.split(',') if a]
+    return field, attributes or list(DEFAULT_ATTRIBUTES)
+
+
+def referenced_collection(client, field):
+    """Return the collection of the resources a reference field refers to.
+
+    :raises: ValueError if the collection cannot be told from the field
+    """
+    key = field.split('.')[-1]
+    collection = REFERENCES.get(key)
+    if collection is None and key.endswith('_id'):
+        collection = client.get_collection(key[:-len('_id')])
+    if collection is None or not hasattr(client, 'list_%s' % collection):
+        raise ValueError(_("Cannot tell which resources %s refers to") %
+                         field)
+    return collection
+
+
+def column_name(field, attribute):
+    return '%s:%s' % (field, attribute)
+
+
+class Expander(object):
+    """Adds attributes of referenced resources to listed resources.
+
+    An expansion of the field network_id with the attribute name adds a
+    network_id:name key to each resource. References held in lists, as
+    in fixed_ips.subnet_id, give lists of attributes. The referenced
+    resources are fetched with one list request per collection, all
+    concurrently, and kept, so that a resource referenced by several
+    pages is fetched once.
+
+    :param client: the client fetching the referenced resources
+    :param expansions: (field, attributes) tuples as from parse_expansion
+    :param max_workers: maximum number of concurrent requests
+    :raises: ValueError if a field does not refer to a known collection
+    """
+
+    def __init__(self, client, expansions, max_workers=None):
+        self.client = client
+        self.max_workers = max_workers
+        self.expansions = [(field, attributes,
+                            referenced_collection(client, field))
+                           for field, attributes in expansions]
+        self.fields = {}
+        for _field, attributes, collection in self.expansions:
+            fields = self.fields.setdefault(collection, ['id'])
+            for attribute in attributes:
+                if attribute.split('.')[0] not in fields:
+                    fields.append(attribute.split('.')[0])
+        self.cache = dict((collection, {}) for collection in self.fields)
+
+    @property
+    def columns(self):
+        return [column_name(field, attribute)
+                for field, attributes, _collection in self.expansions
+                for attribute in attributes]
+
+    def _fetch(self, missing):
+        def _list(collection):
+            return self.client.list_by_ids(collection,
+                                           sorted(missing[collection]),
+                                           fields=self.fields[collection])
+
+        found = self.client.concurrent_map(_list, sorted(missing),
+                                           self.max_workers)
+        for collection, resources in zip(sorted(missing), found):
+            cache = self.cache[collection]
+            # unknown ids are kept as well, so as not to ask for them again
+            cache.update(dict.fromkeys(missing[collection]))
+            cache.update((r['id'], r) for r in resources)
+
+    def expand(self, items):
+        """Add the expanded attributes to a list of resources."""
+        missing = {}
+        for field, _attributes, collection in self.expansions:
+            cache = self.cache[collection]
+            for item in items:
+                for _id in topology.field_values(item, field):
+                    if _id not in cache:
+                        missing.setdefault(collection, set()).add(_id)
+        if missing:
+            self._fetch(missing)
+        for item in items:
+            for field, attributes, collection in self.expansions:
+                referenced = [self.cache[collection].get(_id) or {}
+                              for _id in topology.field_values(item, field)]
+                many = isinstance(item.get(field.split('.')[0]), list)
+                for attribute in attributes:
+                    values = [value for resource in referenced
+                              for value in topology.field_values(resource,
+                                                                 attribute)]
+                    if not many:
+                        values = values[0] if values else None
+                    item[column_name(field, attribute)] = values
+        return items
+
+    def expand_stream(self, items, batch_size=None):
+        """Yield resources expanded batch by batch as they are received.
+
+        :param batch_size: defaults to EXPAND_BATCH_SIZE
+        """
+        batch_size = batch_size or EXPAND_BATCH_SIZE
+        items = iter(items)
+        batch = list(itertools.islice(items, batch_size))
+        while batch:
+            for item in self.expand(batch):
+                yield item
+            batch = list(itertools.islice(items, batch_size))
@@ -0,0 +1,256 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Shadowing, redundancy and conflict analysis of firewall policies."""
+
+import netaddr
+
+SHADOWED = 'shadowed'
+REDUNDANT = 'redundant'
+CONFLICT = 'conflict'
+
+COLUMNS = ['position', 'id', 'name', 'anomaly', 'related_position',
+           'related_id']
+
+_MAX_PORT = 65535
+
+
+def _network(address, ip_version):
+    if not address:
+        return netaddr.IPNetwork('::/0' if ip_version == 6 else '0.0.0.0/0')
+    return netaddr.IPNetwork(address).cidr
+
+
+def _port_range(port):
+    """Return the (min, max) interval of a rule port, e.g. "80:90"."""
+    if port is None or port == '':
+        return 0, _MAX_PORT
+    first, _sep, last = str(port).partition(':')
+    return int(first), int(last or first)
+
+
+def _contains(outer, inner):
+    return outer[0] <= inner[0] and inner[1] <= outer[1]
+
+
+def _overlaps(one, other):
+    return one[0] <= other[1] and other[0] <= one[1]
+
+
+class _Rule(object):
+    """The match of a firewall rule as a box of intervals."""
+
+    def __init__(self, position, rule):
+        self.position = position
+        self.rule = rule
+        self.action = rule.get('action')
+        ip_version = int(rule.get('ip_version') or 4)
+        self.protocol = rule.get('protocol') or None
+        self.source = _network(rule.get('source_ip_address'), ip_version)
+        self.destination = _network(rule.get('destination_ip_address'),
+                                    ip_version)
+        ports = self.protocol in (None, 'tcp', 'udp')
+        self.source_port = _port_range(
+            rule.get('source_port') if ports else None)
+        self.destination_port = _port_range(
+            rule.get('destination_port') if ports else None)
+
+    def contains(self, other):
+        return ((self.protocol is None or self.protocol == other.protocol) and
+                _contains(self.source_port, other.source_port) and
+                _contains(self.destination_port, other.destination_port) and
+                other.source in self.source and
+                other.destination in self.destination)
+
+    def overlaps(self, other):
+        return ((self.protocol is None or other.protocol is None or
+                 self.protocol == other.protocol) and
+                _overlaps(self.source_port, other.source_port) and
+                _overlaps(self.destination_port, other.destination_port) and
+                _overlaps((self.source.first, self.source.last),
+                          (other.source.first, other.source.last)) and
+                _overlaps((self.destination.first, self.destination.last),
+                          (other.destination.first, other.destination.last)))
+
+
+class _PrefixTrie(object):
+    """Binary trie of the CIDRs of one IP version.
+
+    Each node holds the positions of the rules having its CIDR and the
+    number of rules in its subtree. The rules whose CIDR contains a given
+    one are found by walking down the bits of its prefix, those whose
+    CIDR is inside it by walking the subtree below, and both can be
+    counted without being enumerated.
+    """
+
+    def __init__(self, bits):
+        self.bits = bits
+        self.root = self._node()
+
+    @staticmethod
+    def _node():
+        # [child for bit 0, child for bit 1, positions, subtree size]
+        return [None, None, [], 0]
+
+    def _bit(self, net, depth):
+        return (net.value >> (self.bits - 1 - depth)) & 1
+
+    def _path(self, net):
+        """Yield the nodes from the root down to the node of net."""
+        node = self.root
+        yield node
+        for depth in range(net.prefixlen):
+            node = node[self._bit(net, depth)]
+            if node is None:
+                return
+            yield node
+
+    def insert(self, net, position):
+        node = self.root
+        node[3] += 1
+        for depth in range(net.prefixlen):
+            bit = self._bit(net, depth)
+            if node[bit] is None:
+                node[bit] = self._node()
+            node = node[bit]
+            node[3] += 1
+        node[2].append(position)
+
+    def _walk(self, net):
+        path = list(self._path(net))
+        if len(path) == net.prefixlen + 1:
+            return path[:-1], path[-1]
+        return path, None
+
+    def count(self, net, overlapping=False):
+        """Return the number of CIDRs containing, or overlapping, net."""
+        ancestors, node = self._walk(net)
+        total = sum(len(n[2]) for n in ancestors)
+        if node is not None:
+            total += node[3] if overlapping else len(node[2])
+        return total
+
+    def find(self, net, overlapping=False):
+        """Return the positions of the CIDRs counted by count."""
+        ancestors, node = self._walk(net)
+        found = []
+        for ancestor in ancestors:
+            found.extend(ancestor[2])
+        if node is not None:
+            if not overlapping:
+                found.extend(node[2])
+                return found
+            stack = [node]
+            while stack:
+                node = stack.pop()
+                found.extend(node[2])
+                stack.extend(child for child in node[:2] if child is not None)
+        return found
+
+
+class _Index(object):
+    """Source and destination prefix tries of the rules seen so far.
+
+    The candidates of a rule are enumerated from whichever trie yields
+    fewer of them, then checked against the full rule.
+    """
+
+    def __init__(self):
+        self.tries = {}
+
+    def _tries(self, net):
+        if net.version not in self.tries:
+            bits = 32 if net.version == 4 else 128
+            self.tries[net.version] = (_PrefixTrie(bits), _PrefixTrie(bits))
+        return self.tries[net.version]
+
+    def insert(self, rule):
+        sources, destinations = self._tries(rule.source)
+        sources.insert(rule.source, rule.position)
+        destinations.insert(rule.destination, rule.position)
+
+    def candidates(self, rule, overlapping=False):
+        sources, destinations = self._tries(rule.source)
+        if (sources.count(rule.source, overlapping) <=
+                destinations.count(rule.destination, overlapping)):
+            return sorted(sources.find(rule.source, overlapping))
+        return sorted(destinations.find(rule.destination, overlapping))
+
+
+def analyze_rules(rules):
+    """Find the anomalies of an ordered list of firewall rules.
+
+    A rule is shadowed when an earlier rule matching all of its traffic
+    has another action, and redundant when it has the same action: in
+    both cases the rule never takes effect. Two rules are in conflict
+    when they partly overlap with different actions, their order deciding
+    which one applies. Disabled rules are ignored.
+
+    Earlier rules are indexed in source and destination prefix tries,
+    so that a rule is only compared to the earlier rules whose source,
+    or destination when fewer, contains or overlaps its own, instead of
+    to all of them.
+
+    :param rules: the firewall rules in policy order
+    :returns: list of dicts with the COLUMNS keys, positions counting
+        from 1
+    """
+    index = _Index()
+    boxes = {}
+    anomalies = []
+    for position, rule in enumerate(rules, 1):
+        if rule.get('enabled') is False:
+            continue
+        box = _Rule(position, rule)
+        covering = None
+        for earlier in index.candidates(box):
+            if boxes[earlier].contains(box):
+                covering = boxes[earlier]
+                break
+        if covering:
+            anomalies.append(_anomaly(
+                box, SHADOWED if covering.action != box.action
+                else REDUNDANT, covering))
+            # the rule never matches, so it can't conflict with later ones
+            continue
+        for earlier in index.candidates(box, overlapping=True):
+            other = boxes[earlier]
+            if other.action != box.action and other.overlaps(box):
+                anomalies.append(_anomaly(box, CONFLICT, other))
+        boxes[position] = box
+        index.insert(box)
+    return anomalies
+
+
+def _anomaly(rule, anomaly, related):
+    return {'position': rule.position, 'id': rule.rule.get('id'),
+            'name': rule.rule.get('name'), 'anomaly': anomaly,
+            'related_position': related.position,
+            'related_id': related.rule.get('id')}
+
+
+def load_policy_rules(client, policy_id):
+    """Return the rules of a firewall policy in policy order.
+
+    The rules are fetched with a single list request filtering on all
+    their ids, split only when the URI gets too long.
+    """
+    policy = client.show_firewall_policy(
+        policy_id, fields=['id', 'firewall_rules'])['firewall_policy']
+    rule_ids = policy.get('firewall_rules') or []
+    rules = dict((rule['id'], rule)
+                 for rule in client.list_by_ids('firewall_rules', rule_ids))
+    return [rules[rule_id] for rule_id in rule_ids if rule_id in rules]
@@ -0,0 +1,253 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Local inventory snapshots of Neutron collections stored in SQLite."""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from oslo.serialization import jsonutils
+import six
+
+from neutronclient.common import exceptions
+from neutronclient.i18n import _
+
+DEFAULT_COLLECTIONS = ['networks', 'subnets', 'ports', 'routers',
+                       'floatingips']
+
+# Fields stored in their own indexed column besides the JSON body, so that
+# filtering and projecting on them does not need to decode the body.
+COLUMNS = ['id', 'name', 'tenant_id', 'status', 'network_id', 'device_id',
+           'device_owner', 'mac_address', 'cidr', 'router_id', 'port_id',
+           'floating_ip_address', 'fixed_ip_address']
+
+# List parameters which are not resource filters
+_NON_FILTERS = ('fields', 'verbose', 'limit', 'marker', 'page_reverse',
+                'sort_key', 'sort_dir')
+
+_COLLECTION_RE = re.compile(r'^[a-z][a-z0-9_]*$')
+
+
+def _table(collection):
+    if not _COLLECTION_RE.match(collection):
+        raise exceptions.NeutronClientException(
+            message=_("Invalid collection name %s") % collection)
+    return '"%s"' % collection
+
+
+def _column_value(value):
+    if value is None or isinstance(value, six.string_types):
+        return value
+    return six.text_type(value)
+
+
+def fetch_collections(client, collections=None, max_workers=None,
+                      **_params):
+    """List the given collections concurrently.
+
+    :param _params: filters passed to every list request
+    :returns: dict of the resources keyed by collection
+    """
+    collections = list(collections or DEFAULT_COLLECTIONS)
+
+    def _list(collection):
+        return getattr(client, 'list_%s' % collection)(**_params)[collection]
+
+    return dict(zip(collections,
+                    client.concurrent_map(_list, collections, max_workers)))
+
+
+def write_snapshot(path, resources, taken_at=None):
+    """Write collections of resources into a new SQLite snapshot file.
+
+    The file is written aside and renamed over path once complete, so that
+    readers never see a partial snapshot.
+
+    :param resources: dict of the resources keyed by collection
+    :param taken_at: the time of the snapshot, defaults to now
+    """
+    taken_at = taken_at or time.time()
+    tmp_path = '%s.tmp' % path
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute('CREATE TABLE snapshot_collections '
+                     '(collection TEXT PRIMARY KEY, taken_at REAL, '
+                     'fields TEXT)')
+        for collection, items in six.iteritems(resources):
+            table = _table(collection)
+            fields = set()
+            for item in items:
+                fields.update(item)
+            conn.execute('CREATE TABLE %s (%s, body TEXT)' % (
+                table, ', '.join('%s TEXT' % column for column in COLUMNS)))
+            conn.executemany(
+                'INSERT INTO %s VALUES (%s)' % (
+                    table, ', '.join('?' * (len(COLUMNS) + 1))),
+                ([_column_value(item.get(column)) for column in COLUMNS] +
+                 [jsonutils.dumps(item)] for item in items))
+            for column in COLUMNS:
+                if column in fields:
+                    conn.execute('CREATE INDEX "%s_%s" ON %s (%s)' % (
+                        collection, column, table, column))
+            conn.execute('INSERT INTO snapshot_collections VALUES (?, ?, ?)',
+                         (collection, taken_at,
+                          jsonutils.dumps(sorted(fields))))
+        conn.commit()
+    finally:
+        conn.close()
+    os.rename(tmp_path, path)
+
+
+def take_snapshot(client, path, collections=None, max_workers=None):
+    """Fetch collections concurrently and store them into path.
+
+    :returns: dict of the number of resources keyed by collection
+    """
+    taken_at = time.time()
+    resources = fetch_collections(client, collections, max_workers)
+    write_snapshot(path, resources, taken_at)
+    return dict((collection, len(items))
+                for collection, items in six.iteritems(resources))
+
+
+def _matches(value, wanted):
+    if not isinstance(wanted, (list, tuple)):
+        wanted = [wanted]
+    if isinstance(value, bool):
+        value = str(value)
+        wanted = [str(w).capitalize() for w in wanted]
+    return any(value == w or six.text_type(value) == six.text_type(w)
+               for w in wanted)
+
+
+class Snapshot(object):
+    """Read access to a snapshot written by take_snapshot.
+
+    list and show answer the same requests as the list_* and show_* client
+    methods. Filters and field projections on the indexed COLUMNS are
+    resolved by SQLite without decoding the JSON bodies.
+
+    :param path: the snapshot file
+    :param max_age: maximum age in seconds of a collection, reading an
+        older collection raising SnapshotTooOld
+    """
+
+    def __init__(self, path, max_age=None):
+        if not os.path.isfile(path):
+            raise exceptions.InvalidSnapshot(path=path)
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        try:
+            rows = self._conn.execute(
+                'SELECT collection, taken_at, fields '
+                'FROM snapshot_collections').fetchall()
+        except sqlite3.DatabaseError:
+            self._conn.close()
+            raise exceptions.InvalidSnapshot(path=path)
+        self.taken_at = {}
+        self.fields = {}
+        for collection, taken_at, fields in rows:
+            self.taken_at[collection] = taken_at
+            self.fields[collection] = set(jsonutils.loads(fields))
+
+    def close(self):
+        self._conn.close()
+
+    @property
+    def collections(self):
+        return sorted(self.taken_at)
+
+    def has(self, collection):
+        return collection in self.taken_at
+
+    def age(self, collection):
+        return time.time() - self.taken_at[collection]
+
+    def _check_age(self, collection):
+        if not self.has(collection):
+            raise exceptions.NotFound(
+                message=_("Snapshot %(path)s has no %(collection)s") %
+                {'path': self.path, 'collection': collection})
+        age = self.age(collection)
+        if self.max_age is not None and age > self.max_age:
+            raise exceptions.SnapshotTooOld(
+                collection=collection, path=self.path, age=age,
+                max_age=self.max_age)
+
+    def _query(self, collection, columns, filters):
+        clauses = []
+        args = []
+        for column, wanted in filters:
+            if not isinstance(wanted, (list, tuple)):
+                wanted = [wanted]
+            clauses.append('%s IN (%s)' % (column,
+                                           ', '.join('?' * len(wanted))))
+            args.extend(_column_value(w) for w in wanted)
+        sql = 'SELECT %s FROM %s' % (', '.join(columns), _table(collection))
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        with self._lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def list(self, collection, **_params):
+        """Return the resources of a collection matching the filters."""
+        self._check_age(collection)
+        known = self.fields[collection]
+        fields = _params.get('fields')
+        if isinstance(fields, six.string_types):
+            fields = [fields]
+        indexed = []
+        others = []
+        for key, wanted in six.iteritems(_params):
+            if key in _NON_FILTERS:
+                continue
+            if key in COLUMNS:
+                indexed.append((key, wanted))
+            else:
+                others.append((key, wanted))
+        if fields and not others and all(f in COLUMNS for f in fields):
+            fields = [f for f in fields if f in known]
+            if not fields:
+                return [{} for row in self._query(collection, ['id'],
+                                                  indexed)]
+            return [dict(zip(fields, row))
+                    for row in self._query(collection, fields, indexed)]
+        items = []
+        for (body,) in self._query(collection, ['body'], indexed):
+            item = jsonutils.loads(body)
+            if all(key in item and _matches(item[key], wanted)
+                   for key, wanted in others):
+                if fields:
+                    item = dict((f, item[f]) for f in fields if f in item)
+                items.append(item)
+        return items
+
+    def show(self, collection, _id, **_params):
+        """Return a single resource of a collection."""
+        items = self.list(collection, id=_id, **_params)
+        if not items:
+            raise exceptions.NotFound(
+                message=_("%(collection)s %(id)s not found in snapshot "
+                          "%(path)s") % {'collection': collection, 'id': _id,
+                                         'path': self.path})
+        return items[0]
@@ -0,0 +1,158 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Collection of loadbalancer pool statistics across all pools."""
+
+import csv
+import time
+
+from oslo.serialization import jsonutils
+from oslo.utils import encodeutils
+import six
+
+from neutronclient.common import exceptions
+
+COUNTERS = ['bytes_in', 'bytes_out', 'total_connections']
+GAUGES = ['active_connections']
+STATS = ['bytes_in', 'bytes_out', 'active_connections', 'total_connections']
+COLUMNS = (['timestamp', 'id', 'name'] + STATS +
+           ['%s_delta' % counter for counter in COUNTERS])
+
+# Prometheus metric of each stat, the names of counters ending in _total
+METRICS = {'bytes_in': 'neutron_lb_pool_bytes_in_total',
+           'bytes_out': 'neutron_lb_pool_bytes_out_total',
+           'active_connections': 'neutron_lb_pool_active_connections',
+           'total_connections': 'neutron_lb_pool_connections_total'}
+
+
+def list_pools(client, **_params):
+    """Return the id and name of every pool matching the given filters."""
+    _params['fields'] = ['id', 'name']
+    return client.list_pools(**_params)['pools']
+
+
+def collect_pool_stats(client, pools, max_workers=None):
+    """Fetch the stats of the given pools concurrently.
+
+    Returns one row per pool carrying the pool id and name, the time the
+    sample was taken and the pool stats. Pools deleted since they were
+    listed are skipped.
+
+    :param client: a neutronclient.v2_0.client.Client
+    :param pools: pools as returned by list_pools
+    :param max_workers: maximum number of concurrent requests
+    """
+    def _retrieve(pool):
+        try:
+            stats = client.retrieve_pool_stats(pool['id'])['stats']
+        except exceptions.NotFound:
+            return None
+        row = {'timestamp': int(time.time()), 'id': pool['id'],
+               'name': pool.get('name')}
+        for key in STATS:
+            value = stats.get(key)
+            row[key] = int(value) if value is not None else None
+        return row
+
+    rows = client.concurrent_map(_retrieve, pools, max_workers)
+    return [row for row in rows if row is not None]
+
+
+def add_deltas(rows, previous):
+    """Add per-interval counter deltas to rows.
+
+    :param rows: the current sample, as returned by collect_pool_stats
+    :param previous: dict of the previous sample rows keyed by pool id
+    The delta of a counter is None on the first sample of a pool, and the
+    current value when the counter went backwards (e.g. after a restart).
+    """
+    for row in rows:
+        last = previous.get(row['id'])
+        for key in COUNTERS:
+            delta = None
+            if last is not None and row[key] is not None:
+                delta = row[key] - (last[key] or 0)
+                if delta < 0:
+                    delta = row[key]
+            row['%s_delta' % key] = delta
+    return rows
+
+
+def sample_pool_stats(client, interval, count=None, max_workers=None,
+                      **_params):
+    """Yield pool stats samples with counter deltas every interval seconds.
+
+    Pools are listed once, then each sample fetches the stats of all of
+    them concurrently. Sampling stops after count samples, or never if
+    count is None.
+    """
+    pools = list_pools(client, **_params)
+    previous = {}
+    taken = 0
+    while count is None or taken < count:
+        if taken:
+            time.sleep(interval)
+        rows = add_deltas(collect_pool_stats(client, pools, max_workers),
+                          previous)
+        previous = dict((row['id'], row) for row in rows)
+        taken += 1
+        yield rows
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if six.PY2 and isinstance(value, six.text_type):
+        return encodeutils.safe_encode(value)
+    return value
+
+
+def write_csv(rows, stream, header=True):
+    writer = csv.writer(stream, lineterminator='\n')
+    if header:
+        writer.writerow(COLUMNS)
+    for row in rows:
+        writer.writerow([_cell(row.get(column)) for column in COLUMNS])
+
+
+def write_jsonl(rows, stream):
+    for row in rows:
+        stream.write(jsonutils.dumps(dict((column, row.get(column))
+                                          for column in COLUMNS)) + '\n')
+
+
+def _escape_label(value):
+    return (six.text_type(value or '').replace('\\', '\\\\')
+            .replace('"', '\\"').replace('\n', '\\n'))
+
+
+def write_prometheus(rows, stream):
+    """Write rows in the Prometheus text exposition format."""
+    for key in STATS:
+        kind = 'counter' if key in COUNTERS else 'gauge'
+        metric = METRICS[key]
+        stream.write('# TYPE %s %s\n' % (metric, kind))
+        for row in rows:
+            if row.get(key) is None:
+                continue
+            stream.write('%s{pool_id="%s",pool_name="%s"} %s\n' %
+                         (metric, _escape_label(row['id']),
+                          _escape_label(row.get('name')), row[key]))
+
+
+WRITERS = {'csv': write_csv,
+           'jsonl': write_jsonl,
+           'prometheus': write_prometheus}
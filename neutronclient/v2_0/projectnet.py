@@ -0,0 +1,455 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+
+"""Export and import of the network configuration of a project."""
+
+import sys
+
+import six
+
+from neutronclient.common import exceptions
+from neutronclient.i18n import _
+
+VERSION = 1
+
+ROUTER_INTERFACE = 'network:router_interface'
+
+# (collection, copied fields, reference fields and the collection they
+# refer to) in dependency order; a reference field holding a list
+# refers to each of its ids
+SCHEMA = [
+    ('networks', ['name', 'admin_state_up', 'shared'], {}),
+    ('security_groups', ['name', 'description'], {}),
+    ('routers', ['name', 'admin_state_up'], {}),
+    ('ikepolicies', ['name', 'description', 'auth_algorithm',
+                     'encryption_algorithm', 'phase1_negotiation_mode',
+                     'ike_version', 'pfs', 'lifetime'], {}),
+    ('ipsecpolicies', ['name', 'description', 'transform_protocol',
+                       'auth_algorithm', 'encryption_algorithm',
+                       'encapsulation_mode', 'pfs', 'lifetime'], {}),
+    ('firewall_rules', ['name', 'description', 'protocol', 'ip_version',
+                        'source_ip_address', 'destination_ip_address',
+                        'source_port', 'destination_port', 'action',
+                        'enabled', 'shared'], {}),
+    ('health_monitors', ['type', 'delay', 'timeout', 'max_retries',
+                         'http_method', 'url_path', 'expected_codes',
+                         'admin_state_up'], {}),
+    ('subnets', ['name', 'cidr', 'ip_version', 'gateway_ip', 'enable_dhcp',
+                 'allocation_pools', 'dns_nameservers', 'host_routes',
+                 'ipv6_ra_mode', 'ipv6_address_mode'],
+     {'network_id': 'networks'}),
+    ('security_group_rules', ['direction', 'ethertype', 'protocol',
+                              'port_range_min', 'port_range_max',
+                              'remote_ip_prefix'],
+     {'security_group_id': 'security_groups',
+      'remote_group_id': 'security_groups'}),
+    ('firewall_policies', ['name', 'description', 'shared', 'audited'],
+     {'firewall_rules': 'firewall_rules'}),
+    ('firewalls', ['name', 'description', 'admin_state_up'],
+     {'firewall_policy_id': 'firewall_policies'}),
+    ('router_interfaces', [],
+     {'router_id': 'routers', 'subnet_id': 'subnets'}),
+    ('pools', ['name', 'description', 'protocol', 'lb_method',
+               'admin_state_up', 'provider'],
+     {'subnet_id': 'subnets'}),
+    ('vips', ['name', 'description', 'protocol', 'protocol_port',
+              'connection_limit', 'session_persistence', 'admin_state_up'],
+     {'pool_id': 'pools', 'subnet_id': 'subnets'}),
+    ('members', ['address', 'protocol_port', 'weight', 'admin_state_up'],
+     {'pool_id': 'pools'}),
+    ('pool_health_monitors', [],
+     {'pool_id': 'pools', 'health_monitor_id': 'health_monitors'}),
+    ('vpnservices', ['name', 'description', 'admin_state_up'],
+     {'subnet_id': 'subnets', 'router_id': 'routers'}),
+    ('ipsec_site_connections', ['name', 'description', 'peer_address',
+                                'peer_id', 'peer_cidrs', 'route_mode', 'mtu',
+                                'initiator', 'auth_mode', 'psk', 'dpd',
+                                'admin_state_up'],
+     {'vpnservice_id': 'vpnservices', 'ikepolicy_id': 'ikepolicies',
+      'ipsecpolicy_id': 'ipsecpolicies'}),
+]
+
+# dependencies besides the references: a VPN service needs its router to
+# have an interface on its subnet
+_AFTER = {'vpnservices': ['router_interfaces']}
+
+# collections derived from the router ports and the pools
+DERIVED = ('router_interfaces', 'pool_health_monitors')
+
+# copied fields whose null value differs from their default, e.g. a
+# subnet without gateway rather than one with the first address
+NULLABLE_FIELDS = ('gateway_ip',)
+
+# collections created with one bulk request per BULK_SIZE resources
+BULK_COLLECTIONS = ('networks', 'subnets', 'security_groups',
+                    'security_group_rules')
+BULK_SIZE = 100
+
+_RULE_KEY = ('security_group_id', 'direction', 'ethertype', 'protocol',
+             'port_range_min', 'port_range_max', 'remote_ip_prefix',
+             'remote_group_id')
+# security group ids per rule listing request, keeping the URI short
+_GROUPS_PER_REQUEST = 50
+
+COLUMNS = ['collection', 'ref', 'id', 'name']
+SUMMARY_COLUMNS = ['collection', 'exported', 'skipped']
+
+_REFERENCES = dict((collection, references)
+                   for collection, _fields, references in SCHEMA)
+
+
+def dependency_levels():
+    """Return the SCHEMA collections grouped in dependency levels.
+
+    The collections of a level only depend on those of the previous
+    levels, so that they can be created concurrently.
+    """
+    levels = []
+    level_of = {}
+    for collection, _fields, references in SCHEMA:
+        dependencies = (list(references.values()) +
+                        _AFTER.get(collection, []))
+        level = 1 + max([level_of[d] for d in dependencies] or [-1])
+        level_of[collection] = level
+        while len(levels) <= level:
+            levels.append([])
+        levels[level].append(collection)
+    return levels
+
+
+def fetch_project(client, max_workers=None, **_params):
+    """List concurrently the collections of SCHEMA and the router ports.
+
+    Collections of extensions not loaded on the server are empty. The
+    external networks, which routers may use as gateway, are listed as
+    well under 'external_networks'.
+
+    :param _params: filters passed to every list request, e.g. tenant_id
+    :returns: dict of the resources keyed by collection
+    """
+    requests = [(collection, collection,
+                 getattr(client, 'list_%s' % collection), _params)
+                for collection, _fields, _references in SCHEMA
+                if collection not in DERIVED]
+    requests.append(('ports', 'ports', client.list_ports,
+                     dict(_params, device_owner=ROUTER_INTERFACE,
+                          fields=['device_id', 'fixed_ips'])))
+    requests.append(('external_networks', 'networks', client.list_networks,
+                     {'router:external': True, 'fields': ['id', 'name']}))
+
+    def _list(request):
+        _name, collection, lister, params = request
+        try:
+            return lister(**params)[collection]
+        except exceptions.NotFound:
+            return []
+
+    return dict(zip([request[0] for request in requests],
+                    client.concurrent_map(_list, requests, max_workers)))
+
+
+def _derived(resources):
+    interfaces = []
+    for port in resources.get('ports') or []:
+        for fixed_ip in port.get('fixed_ips') or []:
+            interface = {'router_id': port['device_id'],
+                         'subnet_id': fixed_ip['subnet_id']}
+            if interface not in interfaces:
+                interfaces.append(interface)
+    associations = [{'pool_id': pool['id'], 'health_monitor_id': monitor}
+                    for pool in resources.get('pools') or []
+                    for monitor in pool.get('health_monitors') or []]
+    return {'router_interfaces': interfaces,
+            'pool_health_monitors': associations}
+
+
+def _entry(item, fields, references, refs):
+    """Return the portable entry of a resource, None if it refers to a
+    resource which is not exported.
+    """
+    entry = dict((field, item[field]) for field in fields
+                 if item.get(field) is not None or
+                 (field in NULLABLE_FIELDS and field in item))
+    for field in references:
+        value = item.get(field)
+        if value is None:
+            continue
+        ids = value if isinstance(value, list) else [value]
+        if any(_id not in refs for _id in ids):
+            return None
+        entry[field] = ([refs[_id] for _id in value]
+                        if isinstance(value, list) else refs[value])
+    return entry
+
+
+def _foreign(item, tenant_id):
+    """Tell whether a resource is not the project's own.
+
+    External networks, usually the provider's, are never exported, nor
+    the resources of another tenant, e.g. its shared networks.
+    """
+    return (item.get('router:external') or
+            (tenant_id is not None and
+             item.get('tenant_id', tenant_id) != tenant_id))
+
+
+def build_document(resources, tenant_id=None):
+    """Build the portable document of the resources of a project.
+
+    Every resource gets a reference, such as networks/0, which replaces
+    its id in the resources referring to it. External networks and the
+    resources of other tenants are skipped, and so are the resources
+    referring to a resource which is not exported, e.g. a subnet of a
+    shared network. The gateway of a router refers to its external
+    network by name.
+
+    :param resources: dict of the resources keyed by collection, as from
+        fetch_project
+    :param tenant_id: the tenant of the project, None to keep resources
+        of any tenant
+    :returns: (document, dict of the number of skipped resources keyed
+        by collection)
+    """
+    derived = _derived(resources)
+    external_names = dict((net['id'], net.get('name'))
+                          for net in resources.get('external_networks') or [])
+    refs = {}
+    exported = {}
+    skipped = {}
+    for collection, fields, references in SCHEMA:
+        items = derived.get(collection, resources.get(collection) or [])
+        entries = exported[collection] = []
+        skipped[collection] = 0
+        for item in items:
+            entry = (None if _foreign(item, tenant_id)
+                     else _entry(item, fields, references, refs))
+            if entry is None:
+                skipped[collection] += 1
+                continue
+            gateway = item.get('external_gateway_info') or {}
+            if external_names.get(gateway.get('network_id')):
+                entry['external_gateway_info'] = dict(
+                    (key, value) for key, value in gateway.items()
+                    if key == 'enable_snat' and value is not None)
+                entry['external_gateway_info']['network'] = (
+                    external_names[gateway['network_id']])
+            entry['ref'] = '%s/%d' % (collection, len(entries))
+            if item.get('id'):
+                refs[item['id']] = entry['ref']
+            entries.append(entry)
+    return {'version': VERSION, 'resources': exported}, skipped
+
+
+def export_project(client, tenant_id=None, max_workers=None):
+    """Return the portable document of the network resources of a project.
+
+    :param tenant_id: the tenant of the project, defaults to the tenant
+        of the client
+    :returns: (document, dict of the number of skipped resources keyed
+        by collection)
+    """
+    if tenant_id is None:
+        tenant_id = client.get_quotas_tenant()['tenant']['tenant_id']
+    return build_document(fetch_project(client, max_workers,
+                                        tenant_id=tenant_id), tenant_id)
+
+
+def _resolve_gateways(client, routers):
+    names = sorted(set(router['external_gateway_info']['network']
+                       for router in routers
+                       if router.get('external_gateway_info')))
+    found = {}
+    if names:
+        for net in client.list_networks(
+                name=names, fields=['id', 'name'],
+                **{'router:external': True})['networks']:
+            found.setdefault(net['name'], net['id'])
+    missing = [name for name in names if name not in found]
+    if missing:
+        raise exceptions.NotFound(
+            message=_("No external network named %s") % ', '.join(missing))
+    return found
+
+
+def _body(entry, references, ids, tenant_id, gateways):
+    body = dict((key, value) for key, value in entry.items()
+                if key != 'ref')
+    for field in references:
+        value = body.get(field)
+        if isinstance(value, list):
+            body[field] = [ids[ref] for ref in value]
+        elif value is not None:
+            body[field] = ids[value]
+    if body.get('external_gateway_info'):
+        gateway = dict(body['external_gateway_info'])
+        gateway['network_id'] = gateways[gateway.pop('network')]
+        body['external_gateway_info'] = gateway
+    if tenant_id:
+        body['tenant_id'] = tenant_id
+    return body
+
+
+def _default_security_group(client, tenant_id):
+    params = {'name': 'default', 'fields': ['id', 'tenant_id']}
+    if tenant_id:
+        params['tenant_id'] = tenant_id
+    groups = client.list_security_groups(**params)['security_groups']
+    if len(groups) > 1:
+        # an admin lists the default groups of every tenant
+        tenant_id = tenant_id or client.get_quotas_tenant()['tenant'][
+            'tenant_id']
+        groups = [group for group in groups
+                  if group['tenant_id'] == tenant_id]
+    return groups[0]['id'] if groups else None
+
+
+def _existing_rules(client, bodies, max_workers):
+    group_ids = sorted(set(body['security_group_id'] for body in bodies))
+    chunks = [group_ids[i:i + _GROUPS_PER_REQUEST]
+              for i in range(0, len(group_ids), _GROUPS_PER_REQUEST)]
+    existing = {}
+    for rules in client.concurrent_map(
+            lambda chunk: client.list_security_group_rules(
+                security_group_id=chunk)['security_group_rules'],
+            chunks, max_workers):
+        for rule in rules:
+            existing[tuple(rule.get(f) for f in _RULE_KEY)] = rule['id']
+    return existing
+
+
+def _create(client, collection, bodies, max_workers):
+    """Create resources, in concurrent bulk requests when supported."""
+    resource = client.EXTED_PLURALS.get(collection, collection[:-1])
+    creator = getattr(client, 'create_%s' % resource)
+    if collection in BULK_COLLECTIONS:
+        chunks = [bodies[i:i + BULK_SIZE]
+                  for i in range(0, len(bodies), BULK_SIZE)]
+        created = client.concurrent_map(
+            lambda chunk: creator({collection: chunk})[collection],
+            chunks, max_workers)
+        return [item for chunk in created for item in chunk]
+    return client.concurrent_map(
+        lambda body: creator({resource: body})[resource], bodies,
+        max_workers)
+
+
+def _import_collection(client, collection, entries, ids, tenant_id,
+                       gateways, max_workers):
+    """Create the resources of a collection.
+
+    :returns: list of (ref, id, name) tuples
+    """
+    references = _REFERENCES[collection]
+    bodies = [_body(entry, references, ids, tenant_id, gateways)
+              for entry in entries]
+    refs = [entry['ref'] for entry in entries]
+    if collection == 'router_interfaces':
+        # interfaces of the same router are added one after the other
+        by_router = {}
+        for ref, body in zip(refs, bodies):
+            by_router.setdefault(body['router_id'], []).append((ref, body))
+
+        def _add_interfaces(interfaces):
+            return [(ref, client.add_interface_router(
+                body['router_id'],
+                {'subnet_id': body['subnet_id']})['port_id'], None)
+                for ref, body in interfaces]
+
+        added = client.concurrent_map(
+            _add_interfaces, [by_router[r] for r in sorted(by_router)],
+            max_workers)
+        return [row for interfaces in added for row in interfaces]
+    if collection == 'pool_health_monitors':
+        client.concurrent_map(
+            lambda body: client.associate_health_monitor(
+                body['pool_id'],
+                {'health_monitor': {'id': body['health_monitor_id']}}),
+            bodies, max_workers)
+        return [(ref, body['health_monitor_id'], None)
+                for ref, body in zip(refs, bodies)]
+    # resources which already exist, such as the default security group
+    # and its rules, are reused
+    existing = {}
+    if collection == 'security_groups' and any(
+            body.get('name') == 'default' for body in bodies):
+        default = _default_security_group(client, tenant_id)
+        if default:
+            existing = dict((ref, default) for ref, body in zip(refs, bodies)
+                            if body.get('name') == 'default')
+    elif collection == 'security_group_rules':
+        rules = _existing_rules(client, bodies, max_workers)
+        for ref, body in zip(refs, bodies):
+            key = tuple(body.get(f) for f in _RULE_KEY)
+            if key in rules:
+                existing[ref] = rules[key]
+    to_create = [(ref, body) for ref, body in zip(refs, bodies)
+                 if ref not in existing]
+    created = _create(client, collection, [body for _ref, body in to_create],
+                      max_workers)
+    rows = [(ref, item['id'], item.get('name'))
+            for (ref, _unused), item in zip(to_create, created)]
+    return rows + [(ref, existing[ref], None) for ref in refs
+                   if ref in existing]
+
+
+def import_project(client, document, tenant_id=None, max_workers=None):
+    """Recreate the resources of a document written by export_project.
+
+    The collections of each dependency level are created concurrently,
+    in concurrent bulk requests for BULK_COLLECTIONS, and the ids of the
+    created resources replace their references in the next levels. The
+    default security group of the project and the rules it already has
+    are reused rather than created.
+
+    :param tenant_id: the tenant owning the created resources, which
+        requires admin rights, defaults to the tenant of the client
+    :returns: list of dicts with the COLUMNS keys, one per resource
+    :raises: InvalidProjectDocument if the document version is unknown,
+        NotFound if a router gateway network has no match by name. The
+        error of a failed collection is raised once the other collections
+        of its level are done, with the rows of all the resources created
+        so far in its imported_rows attribute.
+    """
+    if document.get('version') != VERSION:
+        raise exceptions.InvalidProjectDocument(
+            version=document.get('version'))
+    resources = document.get('resources') or {}
+    gateways = _resolve_gateways(client, resources.get('routers') or [])
+    ids = {}
+    rows = []
+
+    def _import(collection):
+        try:
+            return _import_collection(
+                client, collection, resources[collection], ids, tenant_id,
+                gateways, max_workers), None
+        except Exception:
+            return [], sys.exc_info()
+
+    for level in dependency_levels():
+        collections = [c for c in level if resources.get(c)]
+        imported = client.concurrent_map(_import, collections, max_workers)
+        for collection, (created, _exc_info) in zip(collections, imported):
+            for ref, _id, name in created:
+                ids[ref] = _id
+                rows.append({'collection': collection, 'ref': ref,
+                             'id': _id, 'name': name})
+        failures = [exc_info for _created, exc_info in imported if exc_info]
+        if failures:
+            failures[0][1].imported_rows = rows
+            six.reraise(*failures[0])
+    return rows
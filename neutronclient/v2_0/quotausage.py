@@ -0,0 +1,112 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Quota usage of the tenants, computed from resource counts."""
+
+import six
+
+from neutronclient.common import exceptions
+
+# quota resource: collection counted against it
+QUOTA_COLLECTIONS = {
+    'network': 'networks',
+    'subnet': 'subnets',
+    'port': 'ports',
+    'router': 'routers',
+    'floatingip': 'floatingips',
+    'security_group': 'security_groups',
+    'security_group_rule': 'security_group_rules',
+    'vip': 'vips',
+    'pool': 'pools',
+    'member': 'members',
+    'health_monitor': 'health_monitors',
+}
+
+COLUMNS = ['tenant_id', 'resource', 'used', 'limit', 'percent']
+
+
+def count_by_tenant(client, collection, **_params):
+    """Count the resources of a collection per tenant in one paged scan.
+
+    Only the tenant_id field is fetched, page by page.
+
+    :returns: dict of the number of resources keyed by tenant_id, or None
+        for the collection of an extension not loaded on the server
+    """
+    counts = {}
+    try:
+        for page in getattr(client, 'list_%s' % collection)(
+                retrieve_all=False, fields=['tenant_id'], **_params):
+            for item in page[collection]:
+                tenant_id = item.get('tenant_id')
+                counts[tenant_id] = counts.get(tenant_id, 0) + 1
+    except exceptions.NotFound:
+        return None
+    return counts
+
+
+def quota_usage(client, resources=None, max_workers=None, tenant_id=None):
+    """Return the usage of the quotas of all tenants, or of one.
+
+    The quota-governed collections are each scanned once, concurrently
+    with the quotas listing. The default quotas, applying to the tenants
+    without quotas of their own, are then shown once if needed.
+
+    :param resources: the quota resources to report, all by default
+    :returns: list of dicts with the COLUMNS keys, percent being None for
+        unlimited quotas
+    """
+    resources = sorted(resources or QUOTA_COLLECTIONS)
+    filters = {}
+    if tenant_id:
+        filters['tenant_id'] = tenant_id
+
+    def _fetch(resource):
+        if resource is None:
+            return client.list_quotas(**filters)['quotas']
+        return count_by_tenant(client, QUOTA_COLLECTIONS[resource],
+                               **filters)
+
+    results = client.concurrent_map(_fetch, [None] + resources, max_workers)
+    quotas = dict((quota['tenant_id'], quota) for quota in results[0])
+    counts = dict((resource, result)
+                  for resource, result in zip(resources, results[1:])
+                  if result is not None)
+    tenants = set(quotas)
+    for per_tenant in six.itervalues(counts):
+        tenants.update(per_tenant)
+    tenants.discard(None)
+    if tenant_id:
+        tenants = set([tenant_id])
+    defaults = None
+    without_quotas = sorted(tenants - set(quotas))
+    if without_quotas:
+        defaults = client.show_quota(without_quotas[0])['quota']
+    rows = []
+    for tenant in sorted(tenants):
+        limits = quotas.get(tenant) or defaults
+        for resource in sorted(counts):
+            limit = limits.get(resource)
+            if limit is None:
+                continue
+            limit = int(limit)
+            used = counts[resource].get(tenant, 0)
+            rows.append({'tenant_id': tenant, 'resource': resource,
+                         'used': used, 'limit': limit,
+                         'percent': (None if limit < 0 else
+                                     100 if limit == 0 else
+                                     used * 100 // limit)})
+    return rows
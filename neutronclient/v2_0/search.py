@@ -0,0 +1,156 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Search of a resource by id, name or address across all collections."""
+
+import re
+
+import netaddr
+
+from neutronclient.common import constants
+from neutronclient.common import exceptions
+from neutronclient.v2_0 import addresses
+from neutronclient.v2_0 import topology
+
+CORE_COLLECTIONS = ['networks', 'subnets', 'ports', 'routers', 'floatingips',
+                    'security_groups']
+
+# plurals which are not searchable resource collections
+_NOT_SEARCHABLE = ['quotas', 'service_providers', 'service_types',
+                   'service_definitions', 'extensions']
+
+# collections whose resources have no name attribute
+UNNAMED_COLLECTIONS = ['floatingips', 'security_group_rules', 'members',
+                       'health_monitors', 'metering_label_rules']
+
+# (collection, filter, attribute) searched for an IP address; the filter
+# may differ from the attribute holding the address
+IP_SEARCHES = [('ports', 'fixed_ips', 'fixed_ips.ip_address'),
+               ('floatingips', 'floating_ip_address', 'floating_ip_address'),
+               ('floatingips', 'fixed_ip_address', 'fixed_ip_address'),
+               ('subnets', 'gateway_ip', 'gateway_ip'),
+               ('vips', 'address', 'address'),
+               ('members', 'address', 'address')]
+
+COLUMNS = ['type', 'id', 'name', 'tenant_id', 'matched']
+
+_UUID_RE = re.compile('^[0-9a-fA-F]{8}-([0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}$')
+
+
+def searchable_collections(client):
+    """Return the core collections and those of EXTED_PLURALS."""
+    found = list(CORE_COLLECTIONS)
+    for collection in sorted(client.EXTED_PLURALS):
+        if (collection not in found and
+                collection not in _NOT_SEARCHABLE and
+                collection not in constants.PLURALS and
+                hasattr(client, 'list_%s' % collection)):
+            found.append(collection)
+    return found
+
+
+def _matches(item, attribute, expected, normalize):
+    for value in topology.field_values(item, attribute):
+        try:
+            if (normalize(value) if normalize else value) == expected:
+                return True
+        except (netaddr.AddrFormatError, ValueError, TypeError):
+            pass
+    return False
+
+
+def plan_searches(client, term):
+    """Return the searches of term as a list of tuples.
+
+    Each search is a (collection, filters, attribute, expected value,
+    normalize function) tuple. A UUID is searched as an id in every
+    collection. Any other term is searched as a name in the collections
+    having names, and also as an address when it is an IP, a CIDR or a
+    MAC address.
+    """
+    collections = searchable_collections(client)
+    if _UUID_RE.match(term):
+        return [(collection, {'id': term}, 'id', term, None)
+                for collection in collections]
+    searches = [(collection, {'name': term}, 'name', term, None)
+                for collection in collections
+                if collection not in UNNAMED_COLLECTIONS]
+    if netaddr.valid_ipv4(term) or netaddr.valid_ipv6(term):
+        ip = str(netaddr.IPAddress(term))
+        for collection, _filter, attribute in IP_SEARCHES:
+            if collection in collections:
+                value = ('ip_address=%s' % ip if _filter == 'fixed_ips'
+                         else ip)
+                searches.append((collection, {_filter: value}, attribute, ip,
+                                 lambda v: str(netaddr.IPAddress(v))))
+    elif '/' in term:
+        try:
+            cidr = str(netaddr.IPNetwork(term).cidr)
+        except (netaddr.AddrFormatError, ValueError):
+            pass
+        else:
+            searches.append(('subnets', {'cidr': cidr}, 'cidr', cidr,
+                             lambda v: str(netaddr.IPNetwork(v).cidr)))
+    elif netaddr.valid_mac(term):
+        mac = addresses.normalize_mac(term)
+        searches.append(('ports', {'mac_address': mac}, 'mac_address', mac,
+                         addresses.normalize_mac))
+    return searches
+
+
+def find(client, term, max_workers=None, **_params):
+    """Find the resources of any type matching an id, name or address.
+
+    One list request per searched collection and attribute is issued,
+    all concurrently, each restricted to the fields shown in the result.
+    As Neutron ignores filters on unknown attributes, the returned
+    resources are checked again locally. Collections of extensions not
+    loaded on the server are skipped.
+
+    :param _params: extra filters, e.g. tenant_id
+    :returns: list of dicts with the COLUMNS keys
+    """
+    searches = plan_searches(client, term)
+
+    def _search(search):
+        collection, filters, attribute, expected, normalize = search
+        filters = dict(filters, **_params)
+        filters['fields'] = ['id', 'name', 'tenant_id']
+        if attribute.split('.')[0] not in filters['fields']:
+            filters['fields'].append(attribute.split('.')[0])
+        try:
+            items = getattr(client, 'list_%s' % collection)(**filters)
+        except exceptions.NotFound:
+            return []
+        return [item for item in items[collection]
+                if _matches(item, attribute, expected, normalize)]
+
+    rows = []
+    seen = set()
+    for search, items in zip(searches,
+                             client.concurrent_map(_search, searches,
+                                                   max_workers)):
+        collection, attribute = search[0], search[2]
+        resource = client.EXTED_PLURALS.get(collection, collection[:-1])
+        for item in items:
+            if (collection, item['id']) in seen:
+                continue
+            seen.add((collection, item['id']))
+            rows.append({'type': resource, 'id': item['id'],
+                         'name': item.get('name'),
+                         'tenant_id': item.get('tenant_id'),
+                         'matched': attribute})
+    return rows
@@ -0,0 +1,124 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Compaction of the remote IP prefixes of security group rules."""
+
+import netaddr
+
+CREATE = 'create'
+DELETE = 'delete'
+
+# Rules differing only in their remote_ip_prefix are merged
+RULE_KEY = ('direction', 'ethertype', 'protocol', 'port_range_min',
+            'port_range_max')
+
+COLUMNS = ['action', 'id', 'direction', 'ethertype', 'protocol',
+           'port_range_min', 'port_range_max', 'remote_ip_prefix']
+
+
+def plan_compaction(rules):
+    """Return the rules to create and delete to compact rules.
+
+    The rules having a remote_ip_prefix are grouped by RULE_KEY, and the
+    prefixes of each group merged into the smallest set of CIDRs covering
+    exactly the same addresses. Prefixes already covered by a rule of
+    the group without remote, which matches any address, are dropped.
+    Rules with a remote group are left alone.
+
+    :returns: (rules to create, rules to delete), the rules to create
+        having no id and the security group and tenant of the rules they
+        replace
+    """
+    groups = {}
+    open_keys = set()
+    for rule in rules:
+        if rule.get('remote_group_id'):
+            continue
+        key = tuple(rule.get(field) for field in RULE_KEY)
+        if rule.get('remote_ip_prefix'):
+            groups.setdefault(key, []).append(rule)
+        else:
+            open_keys.add(key)
+    to_create = []
+    to_delete = []
+    for key in sorted(groups, key=str):
+        group = groups[key]
+        if key in open_keys:
+            to_delete.extend(group)
+            continue
+        merged = set(str(net) for net in netaddr.cidr_merge(
+            [rule['remote_ip_prefix'] for rule in group]))
+        kept = set()
+        for rule in group:
+            cidr = rule['remote_ip_prefix']
+            if cidr in merged and cidr not in kept:
+                kept.add(cidr)
+            else:
+                to_delete.append(rule)
+        for cidr in sorted(merged - kept,
+                           key=lambda c: netaddr.IPNetwork(c).sort_key()):
+            new_rule = dict(zip(RULE_KEY, key))
+            new_rule['security_group_id'] = group[0]['security_group_id']
+            new_rule['tenant_id'] = group[0].get('tenant_id')
+            new_rule['remote_ip_prefix'] = cidr
+            to_create.append(new_rule)
+    return to_create, to_delete
+
+
+def apply_compaction(client, to_create, to_delete, max_workers=None):
+    """Create the new rules in one bulk request, then delete the old ones.
+
+    The old rules are deleted concurrently, and only once the new ones
+    exist, so that the allowed traffic never shrinks meanwhile.
+
+    :returns: the created rules
+    """
+    created = []
+    if to_create:
+        body = {'security_group_rules': [
+            dict((k, v) for k, v in rule.items() if v is not None)
+            for rule in to_create]}
+        created = client.create_security_group_rule(
+            body)['security_group_rules']
+    client.concurrent_map(
+        lambda rule: client.delete_security_group_rule(rule['id']),
+        to_delete, max_workers)
+    return created
+
+
+def _row(action, rule):
+    row = dict.fromkeys(COLUMNS)
+    row.update(rule)
+    row['action'] = action
+    return row
+
+
+def compact_security_group(client, security_group_id, dry_run=False,
+                           max_workers=None):
+    """Compact the rules of a security group.
+
+    :param dry_run: only compute the changes, without applying them
+    :returns: list of dicts with the COLUMNS keys, one per rule created
+        or deleted
+    """
+    rules = client.list_security_group_rules(
+        security_group_id=security_group_id)['security_group_rules']
+    to_create, to_delete = plan_compaction(rules)
+    if not dry_run:
+        to_create = apply_compaction(client, to_create, to_delete,
+                                     max_workers)
+    return ([_row(CREATE, rule) for rule in to_create] +
+            [_row(DELETE, rule) for rule in to_delete])
@@ -0,0 +1,114 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Fan-out cost of the security group rules having a remote group."""
+
+import netaddr
+
+PORT_FIELDS = ['id', 'security_groups', 'fixed_ips']
+RULE_FIELDS = ['id', 'security_group_id', 'remote_group_id', 'ethertype']
+
+COLUMNS = ['id', 'security_group_id', 'remote_group_id', 'ports',
+           'remote_ports', 'pairs', 'cidrs', 'cidr_pairs', 'suggestion']
+
+
+class FanOut(object):
+    """Members of the security groups and their remote group rules.
+
+    Ports and rules are added page by page and only the counts, member
+    IPs and remote group rules are kept.
+    """
+
+    def __init__(self):
+        self.ports = {}
+        self.ips = {}
+        self.rules = []
+
+    def add_ports(self, ports):
+        for port in ports:
+            ips = [fixed_ip['ip_address']
+                   for fixed_ip in port.get('fixed_ips') or []]
+            for group_id in port.get('security_groups') or []:
+                self.ports[group_id] = self.ports.get(group_id, 0) + 1
+                self.ips.setdefault(group_id, []).extend(ips)
+
+    def add_rules(self, rules):
+        self.rules.extend(rule for rule in rules
+                          if rule.get('remote_group_id'))
+
+    def _cidrs(self, group_id, ethertype):
+        version = 6 if ethertype == 'IPv6' else 4
+        return netaddr.cidr_merge(
+            ip for ip in self.ips.get(group_id, [])
+            if netaddr.IPAddress(ip).version == version)
+
+    def costs(self):
+        """Return the cost of each remote group rule, highest first.
+
+        The pairs of a rule are the ports of its group times the ports of
+        its remote group, each port of the group tracking every port of
+        the remote group. The cidrs are the fewest CIDRs covering exactly
+        the current IPs of the remote group: when they are fewer than the
+        remote ports, rules on these CIDRs would be cheaper, as long as
+        the membership of the remote group does not change.
+        """
+        rows = []
+        cidrs_cache = {}
+        for rule in self.rules:
+            remote = rule['remote_group_id']
+            key = (remote, rule.get('ethertype'))
+            if key not in cidrs_cache:
+                cidrs_cache[key] = self._cidrs(remote, rule.get('ethertype'))
+            cidrs = cidrs_cache[key]
+            ports = self.ports.get(rule['security_group_id'], 0)
+            remote_ports = self.ports.get(remote, 0)
+            cheaper = cidrs and len(cidrs) < remote_ports
+            rows.append({
+                'id': rule['id'],
+                'security_group_id': rule['security_group_id'],
+                'remote_group_id': remote, 'ports': ports,
+                'remote_ports': remote_ports,
+                'pairs': ports * remote_ports, 'cidrs': len(cidrs),
+                'cidr_pairs': ports * len(cidrs),
+                'suggestion': (' '.join(str(cidr) for cidr in cidrs)
+                               if cheaper else '')})
+        rows.sort(key=lambda row: (-row['pairs'], row['id']))
+        return rows
+
+
+def load_fanout(client, max_workers=None, **_params):
+    """Build a FanOut from one streamed pass over the ports and rules.
+
+    Ports and rules are listed concurrently, a page at a time, asking
+    only for the fields needed.
+
+    :param _params: filters passed to both list requests, e.g. tenant_id
+    """
+    fanout = FanOut()
+
+    def _ports():
+        for page in client.list_ports(retrieve_all=False,
+                                      fields=PORT_FIELDS, **_params):
+            fanout.add_ports(page['ports'])
+
+    def _rules():
+        for page in client.list_security_group_rules(
+                retrieve_all=False, fields=RULE_FIELDS, **_params):
+            fanout.add_rules(page['security_group_rules'])
+
+    client.concurrent_map(lambda load: load(), [_ports, _rules],
+                          max_workers)
+    return fanout
@@ -0,0 +1,278 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Evaluation of the security group policy in effect on a port."""
+
+import bisect
+
+import netaddr
+import six
+
+from neutronclient.i18n import _
+
+INGRESS = 'ingress'
+EGRESS = 'egress'
+DIRECTIONS = (INGRESS, EGRESS)
+
+COLUMNS = ['direction', 'protocol', 'remote_ip', 'port', 'allowed']
+
+PORT_FIELDS = ['id', 'tenant_id', 'security_groups', 'fixed_ips',
+               'port_security_enabled']
+
+_PROTOCOL_NAMES = {'1': 'icmp', '6': 'tcp', '17': 'udp', '58': 'icmp',
+                   'icmpv6': 'icmp', 'ipv6-icmp': 'icmp'}
+
+# Ports, or ICMP type * 256 + code, range from 0 to _MAX_PORT
+_PORT_PROTOCOLS = ('tcp', 'udp', 'icmp')
+_MAX_PORT = 65535
+_MAX_IP = {4: 2 ** 32 - 1, 6: 2 ** 128 - 1}
+
+
+def normalize_protocol(protocol):
+    """Return the lower case name of a protocol given by name or number."""
+    if protocol is None:
+        return None
+    protocol = str(protocol).lower()
+    return _PROTOCOL_NAMES.get(protocol, protocol)
+
+
+def _port_interval(protocol, port_min, port_max):
+    """Return the interval of flow ports matched by a rule.
+
+    The type and code of an ICMP rule are stored in its port_range_min
+    and port_range_max; an ICMP flow is matched on type * 256 + code.
+    """
+    if protocol == 'icmp':
+        if port_min is None:
+            return 0, _MAX_PORT
+        if port_max is None:
+            return int(port_min) * 256, int(port_min) * 256 + 255
+        return (int(port_min) * 256 + int(port_max),) * 2
+    if protocol not in ('tcp', 'udp') or port_min is None:
+        return 0, _MAX_PORT
+    if port_max is None:
+        port_max = port_min
+    return int(port_min), int(port_max)
+
+
+def _flow_port(protocol, port, icmp_code=None):
+    # A tcp, udp or icmp packet always has a port or type: guessing one
+    # would answer for a flow the caller did not ask about.
+    if port is None:
+        if protocol in _PORT_PROTOCOLS:
+            raise ValueError(_("A %s flow requires a port or ICMP type")
+                             % protocol)
+        return 0
+    if protocol == 'icmp':
+        return int(port) * 256 + int(icmp_code or 0)
+    return int(port)
+
+
+class _RuleSet(object):
+    """The rules of a direction, IP version and protocol.
+
+    The port axis is cut at every rule bound into elementary segments,
+    each holding the merged, sorted IP intervals allowed on it, so that a
+    flow is checked with two bisections.
+    """
+
+    def __init__(self, rules):
+        # rules: list of (port min, port max, first IP, last IP)
+        bounds = set()
+        for port_min, port_max, first, last in rules:
+            bounds.add(port_min)
+            bounds.add(port_max + 1)
+        self.bounds = sorted(bounds)
+        self.segments = []
+        for start in self.bounds[:-1]:
+            intervals = sorted((first, last)
+                               for port_min, port_max, first, last in rules
+                               if port_min <= start <= port_max)
+            firsts = []
+            lasts = []
+            for first, last in intervals:
+                if lasts and first <= lasts[-1] + 1:
+                    lasts[-1] = max(lasts[-1], last)
+                else:
+                    firsts.append(first)
+                    lasts.append(last)
+            self.segments.append((firsts, lasts))
+
+    def allows(self, port, ip):
+        segment = bisect.bisect_right(self.bounds, port) - 1
+        if segment < 0 or segment >= len(self.segments):
+            return False
+        firsts, lasts = self.segments[segment]
+        i = bisect.bisect_right(firsts, ip) - 1
+        return i >= 0 and lasts[i] >= ip
+
+
+class PortPolicy(object):
+    """The union of the security group rules applied to a port.
+
+    Rules are compiled once into a _RuleSet per direction, IP version and
+    protocol, a rule of any protocol going into the None protocol set, so
+    that checking a flow costs a few bisections whatever the number of
+    rules.
+
+    :param rules: the security group rules of the port
+    :param group_ips: dict of the IPs of the ports of each remote group
+    :param enabled: False when port security is disabled on the port,
+        in which case all the traffic is allowed
+    """
+
+    def __init__(self, rules, group_ips=None, enabled=True):
+        self.rules = list(rules)
+        self.group_ips = group_ips or {}
+        self.enabled = enabled
+        self._entries = [list(self._compile(rule)) for rule in self.rules]
+        compiled = {}
+        for entries in self._entries:
+            for key, entry in entries:
+                compiled.setdefault(key, []).append(entry)
+        self._sets = dict((key, _RuleSet(entries))
+                          for key, entries in six.iteritems(compiled))
+
+    def _remote_ranges(self, rule, version):
+        if rule.get('remote_group_id'):
+            for ip in self.group_ips.get(rule['remote_group_id'], []):
+                ip = netaddr.IPAddress(ip)
+                if ip.version == version:
+                    yield int(ip), int(ip)
+        elif rule.get('remote_ip_prefix'):
+            net = netaddr.IPNetwork(rule['remote_ip_prefix'])
+            if net.version == version:
+                yield net.first, net.last
+        else:
+            yield 0, _MAX_IP[version]
+
+    def _compile(self, rule):
+        version = 6 if rule.get('ethertype') == 'IPv6' else 4
+        protocol = normalize_protocol(rule.get('protocol'))
+        port_min, port_max = _port_interval(protocol,
+                                            rule.get('port_range_min'),
+                                            rule.get('port_range_max'))
+        key = (rule['direction'], version, protocol)
+        for first, last in self._remote_ranges(rule, version):
+            yield key, (port_min, port_max, first, last)
+
+    def _flow(self, direction, remote_ip, protocol, port, icmp_code):
+        if direction not in DIRECTIONS:
+            raise ValueError(_("Invalid direction %s") % direction)
+        ip = netaddr.IPAddress(remote_ip)
+        protocol = normalize_protocol(protocol)
+        return (direction, ip, protocol,
+                _flow_port(protocol, port, icmp_code))
+
+    def allows(self, direction, remote_ip, protocol=None, port=None,
+               icmp_code=None):
+        """Tell whether a flow is allowed by the policy.
+
+        :param direction: ingress for traffic from remote_ip to the port,
+            egress for traffic from the port to remote_ip
+        :param protocol: tcp, udp, icmp or an IP protocol number
+        :param port: the destination port, or the ICMP type, required
+            for tcp, udp and icmp flows
+        :raises: ValueError on an invalid direction or IP address, or a
+            tcp, udp or icmp flow without a port
+        """
+        if not self.enabled:
+            return True
+        direction, ip, protocol, port = self._flow(direction, remote_ip,
+                                                   protocol, port, icmp_code)
+        for key in ((direction, ip.version, protocol),
+                    (direction, ip.version, None)):
+            rule_set = self._sets.get(key)
+            if rule_set and rule_set.allows(port, int(ip)):
+                return True
+        return False
+
+    def matching_rules(self, direction, remote_ip, protocol=None, port=None,
+                       icmp_code=None):
+        """Return the rules allowing a flow, checking them one by one."""
+        direction, ip, protocol, port = self._flow(direction, remote_ip,
+                                                   protocol, port, icmp_code)
+        found = []
+        for rule, entries in zip(self.rules, self._entries):
+            for key, entry in entries:
+                if (key[:2] == (direction, ip.version) and
+                        key[2] in (protocol, None) and
+                        entry[0] <= port <= entry[1] and
+                        entry[2] <= int(ip) <= entry[3]):
+                    found.append(rule)
+                    break
+        return found
+
+
+def parse_flow(flow):
+    """Parse a DIRECTION,PROTOCOL,REMOTE_IP[,PORT] flow.
+
+    PROTOCOL may be "any", and the PORT of an ICMP flow is TYPE[/CODE].
+    PORT is required for tcp, udp and icmp flows.
+
+    :returns: dict of the keyword arguments of PortPolicy.allows
+    :raises: ValueError if flow is malformed
+    """
+    parts = flow.strip().split(',')
+    if len(parts) not in (3, 4) or parts[0] not in DIRECTIONS:
+        raise ValueError(_("Invalid flow %s, expected "
+                           "DIRECTION,PROTOCOL,REMOTE_IP[,PORT]") % flow)
+    try:
+        remote_ip = str(netaddr.IPAddress(parts[2]))
+    except netaddr.AddrFormatError:
+        raise ValueError(_("Invalid IP address %s") % parts[2])
+    protocol = normalize_protocol(parts[1])
+    parsed = {'direction': parts[0],
+              'protocol': None if protocol == 'any' else protocol,
+              'remote_ip': remote_ip, 'port': None, 'icmp_code': None}
+    if len(parts) == 4:
+        port, _sep, code = parts[3].partition('/')
+        parsed['port'] = int(port)
+        if code:
+            parsed['icmp_code'] = int(code)
+    _flow_port(parsed['protocol'], parsed['port'])
+    return parsed
+
+
+def load_port_policy(client, port_id):
+    """Load the PortPolicy of a port.
+
+    The rules of all the security groups of the port are fetched with a
+    single list request. When rules reference remote groups, the ports of
+    the tenant are then listed once to resolve the members of all of them.
+    """
+    port = client.show_port(port_id, fields=PORT_FIELDS)['port']
+    group_ids = port.get('security_groups') or []
+    rules = []
+    if group_ids:
+        rules = client.list_security_group_rules(
+            security_group_id=group_ids)['security_group_rules']
+    remote_groups = set(rule['remote_group_id'] for rule in rules
+                        if rule.get('remote_group_id'))
+    group_ips = {}
+    if remote_groups:
+        filters = {}
+        if port.get('tenant_id'):
+            filters['tenant_id'] = port['tenant_id']
+        for member in client.list_ports(
+                fields=['fixed_ips', 'security_groups'], **filters)['ports']:
+            for group_id in member.get('security_groups') or []:
+                if group_id in remote_groups:
+                    group_ips.setdefault(group_id, []).extend(
+                        fixed_ip['ip_address']
+                        for fixed_ip in member.get('fixed_ips') or [])
+    return PortPolicy(rules, group_ips,
+                      enabled=port.get('port_security_enabled') is not False)
@@ -0,0 +1,122 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+
+"""Client-side sort of resources, spilling large lists to disk."""
+
+import heapq
+import itertools
+import tempfile
+
+from oslo.serialization import jsonutils
+import six
+
+from neutronclient.v2_0 import topology
+
+# number of resources sorted in memory, larger lists being sorted by
+# chunks of this size merged from temporary files
+SORT_CHUNK_SIZE = 50000
+
+
+def value_key(value):
+    """Return a key ordering any field values, None first.
+
+    Values are grouped by type so that Python 3 never compares a string
+    with a number, and lists and dicts are compared as JSON.
+    """
+    if isinstance(value, (dict, list)):
+        value = jsonutils.dumps(value, sort_keys=True)
+    return (value is not None, isinstance(value, six.string_types), value)
+
+
+class SortKey(object):
+    """Key ordering resources on several fields, each in its direction.
+
+    A dotted field is sorted on its first value. Resources with equal
+    fields keep the order of their sequence numbers.
+    """
+
+    def __init__(self, item, keys, descending, seq=0):
+        self.values = []
+        for key in keys:
+            values = topology.field_values(item, key)
+            self.values.append(value_key(values[0] if values else None))
+        self.descending = descending
+        self.seq = seq
+
+    def __lt__(self, other):
+        for mine, theirs, desc in zip(self.values, other.values,
+                                      self.descending):
+            if mine != theirs:
+                return theirs < mine if desc else mine < theirs
+        return self.seq < other.seq
+
+
+def _spill(keyed):
+    spilled = tempfile.TemporaryFile(mode='w+')
+    for key, item in sorted(keyed, key=lambda keyed_item: keyed_item[0]):
+        spilled.write(jsonutils.dumps([key.seq, item]))
+        spilled.write('\n')
+    spilled.seek(0)
+    return spilled
+
+
+def _read(spilled, keys, descending):
+    for line in spilled:
+        seq, item = jsonutils.loads(line)
+        yield SortKey(item, keys, descending, seq), item
+
+
+def _external_sort(keyed, keys, descending, chunk_size):
+    spilled = []
+    try:
+        chunk = list(itertools.islice(keyed, chunk_size))
+        while chunk:
+            spilled.append(_spill(chunk))
+            chunk = list(itertools.islice(keyed, chunk_size))
+        for _key, item in heapq.merge(*[_read(f, keys, descending)
+                                        for f in spilled]):
+            yield item
+    finally:
+        for f in spilled:
+            f.close()
+
+
+def sort_items(items, keys, dirs=(), chunk_size=SORT_CHUNK_SIZE):
+    """Sort resources on several fields, in bounded memory.
+
+    Up to chunk_size resources are sorted in memory. Beyond that, the
+    resources are sorted by chunks of chunk_size which are written to
+    temporary files, and the files are merged as the result is consumed,
+    so that only a chunk and one resource per file are held at a time.
+    The sort is stable.
+
+    :param items: iterable of resources, e.g. a generator of a listing
+    :param keys: fields to sort on, possibly dotted
+    :param dirs: 'asc' or 'desc' for each key, missing ones being 'asc'
+    :param chunk_size: None to always sort in memory
+    :returns: an iterable of the sorted resources
+    """
+    descending = [d == 'desc' for d in dirs][:len(keys)]
+    descending += [False] * (len(keys) - len(descending))
+    keyed = ((SortKey(item, keys, descending, seq), item)
+             for seq, item in enumerate(items))
+    chunk = list(itertools.islice(keyed, chunk_size))
+    if chunk_size is None or len(chunk) < chunk_size:
+        chunk.sort(key=lambda keyed_item: keyed_item[0])
+        return [item for _key, item in chunk]
+    return _external_sort(itertools.chain(chunk, keyed), keys, descending,
+                          chunk_size)
@@ -0,0 +1,248 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""In-memory graph of the Neutron topology."""
+
+from oslo.serialization import jsonutils
+import six
+
+from neutronclient.common import exceptions
+from neutronclient.i18n import _
+from neutronclient.v2_0 import inventory
+
+COLLECTIONS = ['networks', 'subnets', 'ports', 'routers', 'floatingips',
+               'security_groups']
+
+# resource type: (collection, [(reference field, referenced type)])
+# A dotted field walks into dicts and lists, e.g. fixed_ips.subnet_id is
+# the subnet_id of every fixed IP of a port.
+SCHEMA = {
+    'network': ('networks', []),
+    'subnet': ('subnets', [('network_id', 'network')]),
+    'port': ('ports', [('network_id', 'network'),
+                       ('fixed_ips.subnet_id', 'subnet'),
+                       ('device_id', 'router'),
+                       ('security_groups', 'security_group')]),
+    'router': ('routers', [('external_gateway_info.network_id',
+                            'network')]),
+    'floatingip': ('floatingips', [('floating_network_id', 'network'),
+                                   ('port_id', 'port'),
+                                   ('router_id', 'router')]),
+    'security_group': ('security_groups', []),
+}
+
+ROUTER_GATEWAY = 'network:router_gateway'
+
+
+def field_values(item, field):
+    """Return the values of a possibly dotted field of a resource."""
+    values = [item]
+    for key in field.split('.'):
+        found = []
+        for value in values:
+            if isinstance(value, dict):
+                value = value.get(key)
+                if isinstance(value, list):
+                    found.extend(value)
+                elif value is not None:
+                    found.append(value)
+            elif isinstance(value, list):
+                found.extend(v.get(key) for v in value
+                             if isinstance(v, dict) and v.get(key))
+        values = found
+    return values
+
+
+class Topology(object):
+    """Networks, subnets, ports, routers, floating IPs and security groups.
+
+    Every reference field of SCHEMA is indexed in a dict mapping each
+    referenced id to the ids of the referencing resources, so that the
+    traversal queries are dict lookups.
+
+    :param resources: dict of the resources keyed by collection
+    """
+
+    def __init__(self, resources):
+        self.resources = {}
+        self.types = {}
+        self.indexes = {}
+        for rtype, (collection, references) in six.iteritems(SCHEMA):
+            items = dict((item['id'], item)
+                         for item in resources.get(collection, []))
+            self.resources[rtype] = items
+            for _id in items:
+                self.types[_id] = rtype
+        for rtype, (collection, references) in six.iteritems(SCHEMA):
+            for field, target in references:
+                index = self.indexes.setdefault((rtype, field), {})
+                for _id, item in six.iteritems(self.resources[rtype]):
+                    for value in field_values(item, field):
+                        index.setdefault(value, []).append(_id)
+
+    def get(self, _id):
+        """Return the resource having the given id, or None."""
+        rtype = self.types.get(_id)
+        return rtype and self.resources[rtype][_id]
+
+    def find(self, rtype, name_or_id):
+        """Return the resource of a type having the given id or name."""
+        items = self.resources[rtype]
+        if name_or_id in items:
+            return items[name_or_id]
+        found = [item for item in six.itervalues(items)
+                 if item.get('name') == name_or_id]
+        if len(found) > 1:
+            raise exceptions.NeutronClientNoUniqueMatch(resource=rtype,
+                                                        name=name_or_id)
+        if not found:
+            raise exceptions.NotFound(
+                message=_("Unable to find %(resource)s with name or id "
+                          "'%(name)s'") % {'resource': rtype,
+                                           'name': name_or_id})
+        return found[0]
+
+    def lookup(self, rtype, field, value):
+        """Return the resources of a type whose field references value."""
+        items = self.resources[rtype]
+        return [items[_id]
+                for _id in self.indexes[(rtype, field)].get(value, [])]
+
+    def edges(self):
+        """Yield (source id, target id, field) for every known reference."""
+        for (rtype, field), index in sorted(six.iteritems(self.indexes)):
+            target = dict(SCHEMA[rtype][1])[field]
+            for value in sorted(index):
+                if value not in self.resources[target]:
+                    continue
+                for _id in index[value]:
+                    yield _id, value, field
+
+    def neighbors(self, _id):
+        """Return the resources referencing or referenced by _id."""
+        rtype = self.types.get(_id)
+        if not rtype:
+            return []
+        found = []
+        for field, target in SCHEMA[rtype][1]:
+            for value in field_values(self.resources[rtype][_id], field):
+                if value in self.resources[target]:
+                    found.append(self.resources[target][value])
+        for (source, field), index in sorted(six.iteritems(self.indexes)):
+            if dict(SCHEMA[source][1])[field] == rtype:
+                found.extend(self.resources[source][ref]
+                             for ref in index.get(_id, []))
+        return found
+
+    def router_ports(self, router_id):
+        """Return the interface ports of a router, gateway excluded."""
+        return [port for port in self.lookup('port', 'device_id', router_id)
+                if port.get('device_owner') != ROUTER_GATEWAY]
+
+    def router_subnets(self, router_id):
+        """Return the subnets a router has an interface on."""
+        subnet_ids = []
+        for port in self.router_ports(router_id):
+            for subnet_id in field_values(port, 'fixed_ips.subnet_id'):
+                if (subnet_id in self.resources['subnet'] and
+                        subnet_id not in subnet_ids):
+                    subnet_ids.append(subnet_id)
+        return [self.resources['subnet'][_id] for _id in subnet_ids]
+
+    def ports_behind_router(self, router_id):
+        """Return the ports on the subnets behind a router.
+
+        The interface ports of the router itself are not included.
+        """
+        seen = set(port['id'] for port in self.router_ports(router_id))
+        ports = []
+        for subnet in self.router_subnets(router_id):
+            for port in self.lookup('port', 'fixed_ips.subnet_id',
+                                    subnet['id']):
+                if port['id'] not in seen:
+                    seen.add(port['id'])
+                    ports.append(port)
+        return ports
+
+    def trace_floatingip(self, floatingip_id):
+        """Return the path reached by a floating IP.
+
+        The path is a list of (resource type, resource) pairs going from
+        the floating IP to its external network and router, then to the
+        associated port with its subnets and network. The device of the
+        port, e.g. an instance, is given by the port device_id.
+        """
+        fip = self.resources['floatingip'][floatingip_id]
+        path = [('floatingip', fip)]
+        for field, rtype in (('floating_network_id', 'network'),
+                             ('router_id', 'router'),
+                             ('port_id', 'port')):
+            item = self.resources[rtype].get(fip.get(field))
+            if item:
+                path.append((rtype, item))
+        port = self.resources['port'].get(fip.get('port_id'))
+        if port:
+            for subnet_id in field_values(port, 'fixed_ips.subnet_id'):
+                subnet = self.resources['subnet'].get(subnet_id)
+                if subnet:
+                    path.append(('subnet', subnet))
+            network = self.resources['network'].get(port.get('network_id'))
+            if network:
+                path.append(('network', network))
+        return path
+
+    def to_dict(self):
+        """Return the graph as a dict of nodes and edges."""
+        nodes = []
+        for rtype in sorted(self.resources):
+            for _id in sorted(self.resources[rtype]):
+                nodes.append({'id': _id, 'type': rtype,
+                              'name': self.resources[rtype][_id].get('name')})
+        edges = [{'source': source, 'target': target, 'field': field}
+                 for source, target, field in self.edges()]
+        return {'nodes': nodes, 'edges': edges}
+
+    def to_json(self):
+        return jsonutils.dumps(self.to_dict(), indent=2, sort_keys=True)
+
+    def to_dot(self):
+        """Return the graph in the Graphviz DOT language."""
+        def _quote(value):
+            return '"%s"' % six.text_type(value).replace('"', '\\"')
+
+        graph = self.to_dict()
+        lines = ['digraph neutron {']
+        for node in graph['nodes']:
+            label = '%s\\n%s' % (node['type'], node['name'] or node['id'])
+            lines.append('  %s [label=%s];' % (_quote(node['id']),
+                                               _quote(label)))
+        for edge in graph['edges']:
+            lines.append('  %s -> %s [label=%s];' % (
+                _quote(edge['source']), _quote(edge['target']),
+                _quote(edge['field'])))
+        lines.append('}')
+        return '\n'.join(lines) + '\n'
+
+
+def load_topology(client, max_workers=None, **_params):
+    """Build a Topology from concurrent list requests.
+
+    :param client: a neutronclient.v2_0.client.Client
+    :param max_workers: maximum number of concurrent requests
+    :param _params: filters passed to every list request, e.g. tenant_id
+    """
+    return Topology(inventory.fetch_collections(client, COLLECTIONS,
+                                                max_workers, **_params))
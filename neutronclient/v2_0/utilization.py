@@ -0,0 +1,131 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""IP address utilization of subnets and networks."""
+
+import bisect
+
+import netaddr
+
+SUBNET_FIELDS = ['id', 'name', 'network_id', 'cidr', 'ip_version',
+                 'allocation_pools']
+
+SUBNET_COLUMNS = ['id', 'name', 'network_id', 'cidr', 'size', 'used', 'free',
+                  'percent']
+NETWORK_COLUMNS = ['network_id', 'subnets', 'size', 'used', 'free',
+                   'percent']
+
+
+class _Pools(object):
+    """The allocation pools of a subnet as sorted integer ranges."""
+
+    def __init__(self, allocation_pools):
+        ranges = sorted((int(netaddr.IPAddress(pool['start'])),
+                         int(netaddr.IPAddress(pool['end'])))
+                        for pool in allocation_pools or [])
+        self.starts = [first for first, last in ranges]
+        self.lasts = [last for first, last in ranges]
+        self.size = sum(last - first + 1 for first, last in ranges)
+
+    def __contains__(self, value):
+        i = bisect.bisect_right(self.starts, value) - 1
+        return i >= 0 and value <= self.lasts[i]
+
+
+def _percent(used, size):
+    return round(100.0 * used / size, 2) if size else 0.0
+
+
+class Utilization(object):
+    """Count the allocated addresses of the allocation pools of subnets.
+
+    Only one counter per subnet is kept, so memory does not depend on the
+    number of ports fed to add_ports.
+
+    :param subnets: subnets having at least the SUBNET_FIELDS
+    """
+
+    def __init__(self, subnets):
+        self.subnets = dict((subnet['id'], subnet) for subnet in subnets)
+        self.pools = dict((subnet['id'],
+                           _Pools(subnet.get('allocation_pools')))
+                          for subnet in subnets)
+        self.used = dict.fromkeys(self.subnets, 0)
+
+    def add_ports(self, ports):
+        """Count the fixed IPs of ports falling in allocation pools."""
+        for port in ports:
+            for fixed_ip in port.get('fixed_ips') or []:
+                pools = self.pools.get(fixed_ip.get('subnet_id'))
+                if (pools is not None and
+                        int(netaddr.IPAddress(fixed_ip['ip_address']))
+                        in pools):
+                    self.used[fixed_ip['subnet_id']] += 1
+
+    def by_subnet(self):
+        """Return a row with the SUBNET_COLUMNS keys for each subnet."""
+        rows = []
+        for _id, subnet in sorted(self.subnets.items()):
+            size = self.pools[_id].size
+            used = self.used[_id]
+            rows.append({'id': _id, 'name': subnet.get('name'),
+                         'network_id': subnet.get('network_id'),
+                         'cidr': subnet.get('cidr'), 'size': size,
+                         'used': used, 'free': size - used,
+                         'percent': _percent(used, size)})
+        return rows
+
+    def by_network(self):
+        """Return a row with the NETWORK_COLUMNS keys for each network."""
+        networks = {}
+        for row in self.by_subnet():
+            total = networks.setdefault(row['network_id'], {
+                'network_id': row['network_id'], 'subnets': 0, 'size': 0,
+                'used': 0, 'free': 0})
+            total['subnets'] += 1
+            for key in ('size', 'used', 'free'):
+                total[key] += row[key]
+        for total in networks.values():
+            total['percent'] = _percent(total['used'], total['size'])
+        return list(networks.values())
+
+
+def sort_rows(rows, threshold=None):
+    """Sort rows by decreasing percent, keeping those above threshold."""
+    if threshold is not None:
+        rows = [row for row in rows if row['percent'] >= threshold]
+    return sorted(rows, key=lambda row: (-row['percent'], -row['used']))
+
+
+def load_utilization(client, **_params):
+    """Compute the utilization of the subnets matching the filters.
+
+    The subnets are listed first, then the ports are streamed page by
+    page with only their fixed_ips field. Ports of any tenant are counted
+    since a shared subnet hosts ports of other tenants.
+
+    :param _params: subnet filters, e.g. tenant_id; a network_id filter
+        also applies to the ports
+    """
+    subnets = client.list_subnets(fields=SUBNET_FIELDS, **_params)['subnets']
+    utilization = Utilization(subnets)
+    port_filters = {}
+    if 'network_id' in _params:
+        port_filters['network_id'] = _params['network_id']
+    for page in client.list_ports(retrieve_all=False, fields='fixed_ips',
+                                  **port_filters):
+        utilization.add_ports(page['ports'])
+    return utilization
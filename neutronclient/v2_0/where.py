@@ -0,0 +1,307 @@
+# Copyright 2014 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+
+"""Filter expressions evaluated on resources as they are listed."""
+
+import re
+
+import netaddr
+import six
+
+from neutronclient.i18n import _
+from neutronclient.v2_0 import topology
+
+# operators of the terms, the negated ones matching when no value does
+OPERATORS = ('=', '!=', '~', '!~', '<', '<=', '>', '>=', 'in', 'within')
+_NEGATED = {'!=': '=', '!~': '~'}
+# terms which Neutron can evaluate as list filters
+_SERVER_OPERATORS = ('=', 'in')
+_KEYWORDS = ('and', 'or', 'not', 'in', 'within')
+
+_TOKEN_RE = re.compile(r"""\s*(?:
+    (?P<punct>[(),]) |
+    (?P<op>!=|!~|<=|>=|=|~|<|>) |
+    '(?P<squoted>[^']*)' |
+    "(?P<dquoted>[^"]*)" |
+    (?P<word>[^\s(),'"=!~<>]+))""", re.VERBOSE)
+
+
+def _tokenize(text):
+    """Return the (kind, value) tuples of text.
+
+    kind is one of 'punct', 'op', 'keyword' or 'word', quoted strings
+    being words which are never keywords.
+    """
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match:
+            raise ValueError(_("Unexpected character %(char)r at position "
+                               "%(pos)d of the expression") %
+                             {'char': text[pos:].lstrip()[:1], 'pos': pos})
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind in ('squoted', 'dquoted'):
+            kind = 'word'
+        elif kind == 'word' and value.lower() in _KEYWORDS:
+            kind, value = 'keyword', value.lower()
+        tokens.append((kind, value))
+    return tokens
+
+
+class _Parser(object):
+    """Recursive descent parser of the expression grammar::
+
+        expression := conjunction ('or' conjunction)*
+        conjunction := negation ('and' negation)*
+        negation := 'not' negation | '(' expression ')' | term
+        term := FIELD OPERATOR VALUE | FIELD 'in' '(' VALUE (',' VALUE)* ')'
+
+    Nodes are ('or', [nodes]), ('and', [nodes]), ('not', node) and
+    ('term', field, operator, value) tuples.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def _peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return (None, None)
+
+    def _next(self, expected):
+        kind, value = self._peek()
+        if kind is None:
+            raise ValueError(_("Unexpected end of the expression, expected "
+                               "%s") % expected)
+        self.pos += 1
+        return kind, value
+
+    def _expect(self, kind, value, expected):
+        if self._next(expected) != (kind, value):
+            raise ValueError(_("Expected %(expected)s, found %(found)r") %
+                             {'expected': expected,
+                              'found': self.tokens[self.pos - 1][1]})
+
+    def parse(self):
+        node = self._expression()
+        if self._peek()[0] is not None:
+            raise ValueError(_("Unexpected %r after the expression") %
+                             self._peek()[1])
+        return node
+
+    def _expression(self):
+        nodes = [self._conjunction()]
+        while self._peek() == ('keyword', 'or'):
+            self.pos += 1
+            nodes.append(self._conjunction())
+        return nodes[0] if len(nodes) == 1 else ('or', nodes)
+
+    def _conjunction(self):
+        nodes = [self._negation()]
+        while self._peek() == ('keyword', 'and'):
+            self.pos += 1
+            nodes.append(self._negation())
+        return nodes[0] if len(nodes) == 1 else ('and', nodes)
+
+    def _negation(self):
+        token = self._peek()
+        if token == ('keyword', 'not'):
+            self.pos += 1
+            return ('not', self._negation())
+        if token == ('punct', '('):
+            self.pos += 1
+            node = self._expression()
+            self._expect('punct', ')', "')'")
+            return node
+        return self._term()
+
+    def _word(self, expected):
+        kind, value = self._next(expected)
+        if kind != 'word':
+            raise ValueError(_("Expected %(expected)s, found %(found)r") %
+                             {'expected': expected, 'found': value})
+        return value
+
+    def _term(self):
+        field = self._word(_('a field'))
+        kind, operator = self._next(_('an operator'))
+        if kind not in ('op', 'keyword') or operator not in OPERATORS:
+            raise ValueError(_("Expected an operator after %(field)s, found "
+                               "%(found)r") %
+                             {'field': field, 'found': operator})
+        if operator != 'in':
+            return ('term', field, operator, self._word(_('a value')))
+        self._expect('punct', '(', "'('")
+        values = [self._word(_('a value'))]
+        while self._peek() == ('punct', ','):
+            self.pos += 1
+            values.append(self._word(_('a value')))
+        self._expect('punct', ')', "')'")
+        return ('term', field, operator, values)
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _equal(value, literal):
+    if isinstance(value, bool):
+        return literal.lower() == str(value).lower()
+    if isinstance(value, six.integer_types + (float,)):
+        return value == _number(literal)
+    return six.text_type(value) == literal
+
+
+def _ordered(operator, literal):
+    number = _number(literal)
+
+    def _pred(value):
+        # numbers are compared as numbers, anything else as strings
+        # which orders the ISO 8601 timestamps
+        left = _number(value)
+        right = number
+        if left is None or right is None:
+            left, right = six.text_type(value), literal
+        if operator == '<':
+            return left < right
+        if operator == '<=':
+            return left <= right
+        if operator == '>':
+            return left > right
+        return left >= right
+    return _pred
+
+
+def _within(literal):
+    try:
+        network = netaddr.IPNetwork(literal)
+    except (netaddr.AddrFormatError, ValueError):
+        raise ValueError(_("%s is not a CIDR") % literal)
+
+    def _pred(value):
+        try:
+            address = netaddr.IPNetwork(value)
+        except (netaddr.AddrFormatError, ValueError, TypeError):
+            return False
+        return address.version == network.version and address in network
+    return _pred
+
+
+def _value_predicate(operator, literal):
+    if operator == '=':
+        return lambda value: _equal(value, literal)
+    if operator == 'in':
+        return lambda value: any(_equal(value, x) for x in literal)
+    if operator == '~':
+        try:
+            regex = re.compile(literal)
+        except re.error as e:
+            raise ValueError(_("Invalid regular expression %(regex)r: "
+                               "%(error)s") % {'regex': literal, 'error': e})
+        return lambda value: regex.search(six.text_type(value)) is not None
+    if operator == 'within':
+        return _within(literal)
+    return _ordered(operator, literal)
+
+
+def _compile(node):
+    """Return a function of a resource evaluating node on it."""
+    if node[0] == 'and':
+        preds = [_compile(child) for child in node[1]]
+        return lambda item: all(pred(item) for pred in preds)
+    if node[0] == 'or':
+        preds = [_compile(child) for child in node[1]]
+        return lambda item: any(pred(item) for pred in preds)
+    if node[0] == 'not':
+        pred = _compile(node[1])
+        return lambda item: not pred(item)
+    _term, field, operator, literal = node
+    negated = operator in _NEGATED
+    pred = _value_predicate(_NEGATED.get(operator, operator), literal)
+
+    def _match(item):
+        found = any(pred(value)
+                    for value in topology.field_values(item, field))
+        return found is not negated
+    return _match
+
+
+def _terms(node):
+    if node[0] == 'term':
+        return [node]
+    if node[0] == 'not':
+        return _terms(node[1])
+    terms = []
+    for child in node[1]:
+        terms.extend(_terms(child))
+    return terms
+
+
+class Expression(object):
+    """A compiled filter expression.
+
+    Terms compare a field, possibly dotted as in fixed_ips.ip_address,
+    with a value: = and != for equality, ~ and !~ for a regular
+    expression search, <, <=, > and >= for an order, numeric when both
+    sides are numbers, 'in (a, b)' for any of several values and
+    'within CIDR' for IP addresses or CIDRs inside a CIDR. Terms are
+    combined with and, or, not and parentheses, and values containing
+    spaces or operator characters are quoted. A term on a multi-valued
+    field matches when any value does, and != and !~ when none does.
+
+    Terms of the top-level conjunction testing equality to one or more
+    values are also given as server filters in server_filters, and fields
+    lists the fields the expression reads.
+
+    :param text: the expression, e.g. "name ~ ^web- and status != ACTIVE"
+    :raises: ValueError if text is not a valid expression
+    """
+
+    def __init__(self, text):
+        self.text = text
+        tree = _Parser(_tokenize(text)).parse()
+        self._match = _compile(tree)
+        self.fields = []
+        for _term, field, _operator, _value in _terms(tree):
+            root = field.split('.')[0]
+            if root not in self.fields:
+                self.fields.append(root)
+        self.server_filters = {}
+        conjuncts = tree[1] if tree[0] == 'and' else [tree]
+        for node in conjuncts:
+            if (node[0] == 'term' and node[2] in _SERVER_OPERATORS and
+                    '.' not in node[1] and
+                    node[1] not in self.server_filters):
+                values = node[3] if node[2] == 'in' else [node[3]]
+                self.server_filters[node[1]] = values
+
+    def matches(self, item):
+        return self._match(item)
+
+    def filter(self, items):
+        """Return the items matching the expression."""
+        return [item for item in items if self._match(item)]